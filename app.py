@@ -6,11 +6,24 @@ ESI 2025-2026
 """
 
 import streamlit as st
+import threading
 import time
 import numpy as np
-import psycopg2
-from sentence_transformers import SentenceTransformer
 from config import Config, Model1Config, Model2Config
+from src.numpy_backend import NumpyBackend
+from src.embedding_cache import get_embedding_cache
+from src.db_pool import ConnectionPool, default_connection_params
+from src.vector_index import apply_search_params, shortlist_search_params
+from src.document_store import DocumentStore
+from src.concurrent_search import ConcurrentComparer
+from src.model_registry import get_model_registry
+from src.hybrid_search import FUSIONS, components, hybrid_hits_params, hybrid_hits_sql
+from src.passage_index import AGGREGATIONS, passage_hits_params, passage_hits_sql, passage_table_for
+from src.search_engine import semantic_hits_params, semantic_hits_sql
+from src.quantized_index import (
+    QUANTIZATIONS, quantized_hits_params, quantized_hits_sql, quantized_index_for, quantized_table_for
+)
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import plotly.graph_objects as go
 
 # ==================== PAGE CONFIG ====================
@@ -662,99 +675,247 @@ st.markdown("""
 # ==================== CACHE FUNCTIONS ====================
 
 @st.cache_resource
-def load_models():
-    model1 = SentenceTransformer(Model1Config.NAME)
-    model2 = SentenceTransformer(Model2Config.NAME)
-    return model1, model2
+def get_models():
+    # Chaque encodeur est chargé à sa première utilisation (le mode mots-clés n'en charge aucun)
+    registry = get_model_registry()
+    if Config.MODEL_WARMUP:
+        registry.warm_up([Model1Config, Model2Config])
+    return registry
 
 
-@st.cache_resource
-def get_db_connection():
+def get_db_params():
     try:
         if "database" in st.secrets:
-            return psycopg2.connect(
-                host=st.secrets["database"]["DB_HOST"],
-                port=int(st.secrets["database"]["DB_PORT"]),
-                dbname=st.secrets["database"]["DB_NAME"],
-                user=st.secrets["database"]["DB_USER"],
-                password=st.secrets["database"]["DB_PASSWORD"]
-            )
+            return {
+                'host': st.secrets["database"]["DB_HOST"],
+                'port': int(st.secrets["database"]["DB_PORT"]),
+                'dbname': st.secrets["database"]["DB_NAME"],
+                'user': st.secrets["database"]["DB_USER"],
+                'password': st.secrets["database"]["DB_PASSWORD"]
+            }
     except:
         pass
     
-    return psycopg2.connect(
-        host=Config.DB_HOST,
-        port=Config.DB_PORT,
-        dbname=Config.DB_NAME,
-        user=Config.DB_USER,
-        password=Config.DB_PASSWORD
-    )
+    return default_connection_params()
+
+
+@st.cache_resource
+def get_db_pool():
+    # Partagé par toutes les sessions: chaque requête emprunte sa propre connexion
+    return ConnectionPool(**get_db_params())
+
+
+@st.cache_resource
+def get_document_store():
+    # Cache des documents partagé par les sessions (extraits + réponses ouvertes)
+    return DocumentStore(get_db_pool())
+
+
+# Méthodes lancées par comparaison (compare_semantic, compare_keyword)
+COMPARE_METHODS = 2
+
+
+@st.cache_resource
+def get_comparer():
+    # Threads partagés par les sessions pour les modes de comparaison.
+    # Chaque méthode emprunte une connexion: au-delà de maxconn threads, les
+    # suivants attendraient le pool. On dimensionne donc sur maxconn, arrondi
+    # à des comparaisons entières: maxconn // COMPARE_METHODS sessions comparent
+    # en même temps, les suivantes attendent un thread libre (temps mural inclus).
+    comparisons = max(1, get_db_pool().maxconn // COMPARE_METHODS)
+    return ConcurrentComparer(max_workers=comparisons * COMPARE_METHODS)
+
+
+def with_script_context(task):
+    """Rattache la session Streamlit au thread qui exécutera la tâche (accès aux caches)"""
+    ctx = get_script_run_ctx()
+    
+    def run():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return task()
+    return run
+
+
+def format_wall_clock(timings):
+    wall = timings['wall'] * 1000
+    sequential = timings['sequential'] * 1000
+    return (f"Wall-clock: {wall:.0f}ms (en parallèle) • "
+            f"séquentiel: {sequential:.0f}ms • gain x{sequential / max(wall, 1e-3):.1f}")
+
+
+@st.cache_resource
+def get_numpy_backend(model_name, _model_config):
+    """Artefact Arrow s'il contient le modèle, sinon .npy + CSV prétraité"""
+    return NumpyBackend.from_model_config(_model_config)
+
+
+@st.cache_data(ttl=60)
+def get_passage_tables():
+    """Tables de passages présentes en base (src/passage_index.py)"""
+    tables = [passage_table_for(model_config) for model_config in (Model1Config, Model2Config)]
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT t FROM unnest(%s::text[]) AS t WHERE to_regclass(t) IS NOT NULL;", (tables,))
+        existing = tuple(row[0] for row in cursor.fetchall())
+        cursor.close()
+    return existing
+
+
+@st.cache_data(ttl=60)
+def get_quantized_tables():
+    """Tables de vecteurs quantifiés présentes en base (src/quantized_index.py)"""
+    tables = [quantized_table_for(model_config) for model_config in (Model1Config, Model2Config)]
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT t FROM unnest(%s::text[]) AS t WHERE to_regclass(t) IS NOT NULL;", (tables,))
+        existing = tuple(row[0] for row in cursor.fetchall())
+        cursor.close()
+    return existing
+
+
+def get_search_backend(model_config):
+    """Backend vectoriel en mémoire si SEARCH_BACKEND=numpy, sinon None (pgvector)"""
+    if Config.SEARCH_BACKEND == 'numpy':
+        return get_numpy_backend(model_config.NAME, model_config)
+    return None
 
 
 # ==================== SEARCH FUNCTIONS ====================
 
-def semantic_search(query, model, table_name, top_k=5):
+def semantic_search(query, model, model_config, top_k=5, backend=None,
+                    probes=None, ef_search=None, passages=None, quantization=None):
     start = time.time()
-    embedding = model.encode(query, convert_to_numpy=True)
-    embedding = embedding / np.linalg.norm(embedding)
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute(f"""
-        SELECT id, question, answer, category, qtype,
-               1 - (embedding <=> %s::vector) as similarity
-        FROM {table_name}
-        ORDER BY embedding <=> %s::vector
-        LIMIT %s;
-    """, (embedding.tolist(), embedding.tolist(), top_k))
+    embedding = get_embedding_cache().encode(model, model_config.NAME, query)
+    
+    if backend is not None:
+        results = backend.search(embedding, top_k)
+        return results, (time.time() - start) * 1000
+    
+    # Index par passages seulement s'il a été construit pour ce modèle
+    if passages is not None and passage_table_for(model_config) not in get_passage_tables():
+        passages = None
+    # Idem pour les vecteurs quantifiés
+    if quantization is not None and quantized_table_for(model_config) not in get_quantized_tables():
+        quantization = None
+    
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        apply_search_params(cursor, probes, ef_search)
+        if passages is not None:
+            # Phase 1: passages agrégés par document dans la requête
+            cursor.execute(
+                passage_hits_sql(passage_table_for(model_config), passages['aggregation']),
+                passage_hits_params(embedding, top_k, top_n=passages['top_n'])
+            )
+            hits = cursor.fetchall()
+            cursor.close()
+            return get_document_store().hydrate(hits), (time.time() - start) * 1000
+        
+        if quantization is not None:
+            # Phase 1: candidats de l'index quantifié, recalculés en float32
+            params = quantized_hits_params(embedding, top_k)
+            # ef_search (HNSW) et probes (IVFFlat) élargis: l'index doit fournir tous les candidats
+            apply_search_params(cursor, **shortlist_search_params(
+                cursor, quantized_index_for(model_config, quantization), params['candidates'], probes, ef_search
+            ))
+            cursor.execute(quantized_hits_sql(model_config, quantization), params)
+            hits = cursor.fetchall()
+            cursor.close()
+            return get_document_store().hydrate(hits), (time.time() - start) * 1000
+        
+        # Phase 1: (id, score) seulement, le scan ANN ne lit aucun texte
+        # (même requête que SemanticSearchEngine, vecteur lié une seule fois)
+        cursor.execute(semantic_hits_sql(model_config.TABLE_NAME), semantic_hits_params(embedding, top_k))
+        hits = cursor.fetchall()
+        cursor.close()
     
-    results = cursor.fetchall()
-    cursor.close()
+    # Phase 2: champs d'affichage (extrait) en une requête ou depuis le cache
+    results = get_document_store().hydrate(hits)
     
     return results, (time.time() - start) * 1000
 
 
-def keyword_search(query, table_name, top_k=5):
-    conn = get_db_connection()
-    cursor = conn.cursor()
+def keyword_search(query, top_k=5):
     start = time.time()
     
-    cursor.execute(f"""
-        SELECT id, question, answer, category, qtype,
-               ts_rank(to_tsvector('english', combined_text),
-                      plainto_tsquery('english', %s)) as rank
-        FROM {table_name}
-        WHERE to_tsvector('english', combined_text) @@ 
-              plainto_tsquery('english', %s)
-        ORDER BY rank DESC
-        LIMIT %s;
-    """, (query, query, top_k))
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT id, ts_rank(search_vector, tsquery) as rank
+            FROM {Config.DOCUMENTS_TABLE}, plainto_tsquery('english', %s) tsquery
+            WHERE search_vector @@ tsquery
+            ORDER BY rank DESC
+            LIMIT %s;
+        """, (query, top_k))
+        hits = cursor.fetchall()
+        cursor.close()
     
-    results = cursor.fetchall()
-    cursor.close()
+    results = get_document_store().hydrate(hits)
     
     return results, (time.time() - start) * 1000
 
 
+def hybrid_search(query, model, model_config, top_k=5, fusion=None, semantic_weight=None,
+                  probes=None, ef_search=None):
+    """Scan ANN + scan plein texte fusionnés dans une seule requête (src/hybrid_search.py)"""
+    start = time.time()
+    embedding = get_embedding_cache().encode(model, model_config.NAME, query)
+    
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        apply_search_params(cursor, probes, ef_search)
+        cursor.execute(
+            hybrid_hits_sql(model_config.TABLE_NAME, fusion or Config.HYBRID_FUSION),
+            hybrid_hits_params(embedding, query, top_k, semantic_weight)
+        )
+        hits = cursor.fetchall()
+        cursor.close()
+    
+    results = get_document_store().hydrate([(row[0], row[1]) for row in hits])
+    details = {row[0]: components(row) for row in hits}
+    
+    return results, details, (time.time() - start) * 1000
+
+
+def format_components(details):
+    """Composantes d'un résultat hybride (rang et score de chaque branche)"""
+    parts = []
+    if details['semantic_position'] is not None:
+        parts.append(f"Sémantique #{details['semantic_position']} ({details['semantic_similarity']:.0%})")
+    if details['keyword_position'] is not None:
+        parts.append(f"Mots-clés #{details['keyword_position']} (rank {details['keyword_rank']:.3f})")
+    return " • ".join(parts)
+
+
 def get_stats():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT COUNT(*) FROM {Model1Config.TABLE_NAME};")
-    total = cursor.fetchone()[0]
-    cursor.execute(f"SELECT COUNT(DISTINCT category) FROM {Model1Config.TABLE_NAME};")
-    categories = cursor.fetchone()[0]
-    cursor.close()
+    with get_db_pool().connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {Config.DOCUMENTS_TABLE};")
+        total = cursor.fetchone()[0]
+        cursor.execute(f"SELECT COUNT(DISTINCT category) FROM {Config.DOCUMENTS_TABLE};")
+        categories = cursor.fetchone()[0]
+        cursor.close()
     return total, categories
 
 
 # ==================== DISPLAY FUNCTIONS ====================
 
-def display_result(result, index, search_type="semantic", highlight=False):
-    doc_id, question, answer, category, qtype, score = result
-    
-    answer_preview = answer[:280] + "..." if len(answer) > 280 else answer
-    score_display = f"{score:.0%}" if search_type == "semantic" else f"{score:.3f}"
+def display_result(result, index, search_type="semantic", highlight=False, key_prefix="", caption=None):
+    doc_id, question, answer, category, qtype, score = result[:6]
+    
+    if len(result) > 6:
+        # Résultat hydraté: `answer` est déjà l'extrait précalculé
+        truncated = result[6]
+        answer_preview = answer + "..." if truncated else answer
+    else:
+        truncated = len(answer) > Config.ANSWER_PREVIEW_CHARS
+        answer_preview = answer[:Config.ANSWER_PREVIEW_CHARS] + "..." if truncated else answer
+    if search_type == "semantic":
+        score_display = f"{score:.0%}"
+    elif search_type == "hybrid":
+        score_display = f"{score:.4f}"
+    else:
+        score_display = f"{score:.3f}"
     
     card_class = 'result-card'
     badge = ''
@@ -778,10 +939,13 @@ def display_result(result, index, search_type="semantic", highlight=False):
         f'<div class="footer-item">ID: {doc_id}</div>'
         f'</div></div>',
         unsafe_allow_html=True)
+    if caption:
+        st.caption(caption)
     
-    if len(answer) > 280:
-        with st.expander("Read full answer"):
-            st.write(answer)
+    # La réponse complète n'est lue que si l'utilisateur la demande
+    if truncated and st.checkbox("Read full answer", key=f"full_{key_prefix}{search_type}_{index}_{doc_id}"):
+        full_answer = get_document_store().get_answer(doc_id) if len(result) > 6 else answer
+        st.write(full_answer)
 
 
 def create_performance_chart(data_dict):
@@ -913,6 +1077,53 @@ def main():
         """, unsafe_allow_html=True)
         
         top_k = st.slider("Nombre de résultats", 1, 10, 5)
+        
+        with st.expander("Index vectoriel"):
+            probes = st.number_input("ivfflat.probes", 1, 100, Config.IVFFLAT_PROBES or 1)
+            ef_search = st.number_input("hnsw.ef_search", 10, 1000, Config.HNSW_EF_SEARCH or 40)
+        
+        with st.expander("Passages (réponses longues)"):
+            passage_tables = get_passage_tables()
+            use_passages = st.checkbox("Rechercher par passages", value=False, disabled=not passage_tables)
+            aggregation = st.selectbox(
+                "Agrégation", AGGREGATIONS, index=AGGREGATIONS.index(Config.PASSAGE_AGGREGATION),
+                format_func=lambda name: {'max': "Meilleur passage", 'sum': "Somme des top-n"}[name]
+            )
+            top_n = st.number_input("top-n", 1, 10, Config.PASSAGE_TOP_N)
+            if not passage_tables:
+                st.caption("Index absent: python src/passage_index.py")
+            passages = {'aggregation': aggregation, 'top_n': top_n} if use_passages else None
+        
+        with st.expander("Vecteurs quantifiés (rerank float32)"):
+            quantized_tables = get_quantized_tables()
+            use_quantized = st.checkbox("Rechercher sur l'index quantifié", value=False, disabled=not quantized_tables)
+            quantization = st.selectbox(
+                "Quantification", QUANTIZATIONS, index=QUANTIZATIONS.index(Config.VECTOR_QUANTIZATION),
+                format_func=lambda name: {'halfvec': "halfvec (float16)", 'bit': "bit (Hamming)"}[name]
+            )
+            if not quantized_tables:
+                st.caption("Index absent: python src/quantized_index.py")
+            quantization = quantization if use_quantized else None
+        
+        with st.expander("Hybride (mots-clés + sémantique)"):
+            fusion = st.selectbox(
+                "Fusion", FUSIONS, index=FUSIONS.index(Config.HYBRID_FUSION),
+                format_func=lambda name: {'rrf': "Reciprocal rank fusion", 'weighted': "Scores pondérés"}[name]
+            )
+            semantic_weight = st.slider("Poids sémantique", 0.0, 1.0, Config.HYBRID_SEMANTIC_WEIGHT, 0.05)
+        
+        cache_stats = get_embedding_cache().stats()
+        st.caption(
+            f"Cache embeddings: {cache_stats['hits']} hits / {cache_stats['misses']} misses "
+            f"({cache_stats['hit_rate']:.0%})"
+        )
+        st.caption(f"Modèles chargés: {', '.join(get_models().loaded()) or 'aucun'}")
+        for name, batch_stats in get_models().batcher_stats().items():
+            st.caption(
+                f"Micro-lots {name.split('/')[-1]}: {batch_stats['requests']} requêtes / "
+                f"{batch_stats['batches']} lots (moy. {batch_stats['mean_batch_size']:.1f}, "
+                f"file: {batch_stats['queue_depth']})"
+            )
     
     
     # Search input
@@ -930,7 +1141,7 @@ def main():
     if 'mode' not in st.session_state:
         st.session_state.mode = None
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         if st.button("Recherche Sémantique\nMiniLM-L6-v2 (384D)"):
@@ -944,6 +1155,10 @@ def main():
         if st.button("Recherche par Mots-Clés\nFull-Text"):
             st.session_state.mode = 'keyword'
     
+    with col4:
+        if st.button("Recherche Hybride\nMots-Clés + PubMedBert"):
+            st.session_state.mode = 'hybrid'
+    
     
     
     # Comparison section
@@ -973,9 +1188,12 @@ def main():
         # Fast semantic
         if mode == 'fast':
             with st.spinner("Loading AI model..."):
-                model1, model2 = load_models()
+                model1 = get_models().get_batcher(Model1Config)
             
-            results, search_time = semantic_search(query, model1, Model1Config.TABLE_NAME, top_k)
+            results, search_time = semantic_search(
+                query, model1, Model1Config, top_k,
+                backend=get_search_backend(Model1Config),
+                probes=probes, ef_search=ef_search, passages=passages, quantization=quantization)
             
             if results:
                 avg_score = np.mean([r[5] for r in results])
@@ -999,9 +1217,12 @@ def main():
         # Medical semantic
         elif mode == 'medical':
             with st.spinner("Loading medical AI..."):
-                model1, model2 = load_models()
+                model2 = get_models().get_batcher(Model2Config)
             
-            results, search_time = semantic_search(query, model2, Model2Config.TABLE_NAME, top_k)
+            results, search_time = semantic_search(
+                query, model2, Model2Config, top_k,
+                backend=get_search_backend(Model2Config),
+                probes=probes, ef_search=ef_search, passages=passages, quantization=quantization)
             
             if results:
                 avg_score = np.mean([r[5] for r in results])
@@ -1024,7 +1245,7 @@ def main():
         
         # Keyword search
         elif mode == 'keyword':
-            results, search_time = keyword_search(query, Model1Config.TABLE_NAME, top_k)
+            results, search_time = keyword_search(query, top_k)
             
             if results:
                 avg_rank = np.mean([r[5] for r in results])
@@ -1045,12 +1266,53 @@ def main():
             else:
                 st.info("No keyword results found")
         
+        # Hybrid: une seule requête SQL, un seul encodage
+        elif mode == 'hybrid':
+            with st.spinner("Loading medical AI..."):
+                model2 = get_models().get_batcher(Model2Config)
+            
+            results, details, search_time = hybrid_search(
+                query, model2, Model2Config, top_k, fusion, semantic_weight,
+                probes=probes, ef_search=ef_search)
+            
+            if results:
+                both = sum(1 for r in results
+                           if None not in (details[r[0]]['semantic_position'], details[r[0]]['keyword_position']))
+                st.markdown(
+                    '<div class="results-container">'
+                    '<div class="results-header">'
+                    f'<div class="results-info">{len(results)} results ({search_time:.0f}ms) • '
+                    f'{both} trouvés par les 2 branches</div>'
+                    f'<div class="method-badge">Hybrid ({fusion})</div>'
+                    '</div>',
+                    unsafe_allow_html=True
+                )
+                
+                for i, result in enumerate(results, 1):
+                    display_result(result, i, "hybrid", caption=format_components(details[result[0]]))
+                
+                st.markdown('</div>', unsafe_allow_html=True)
+            else:
+                st.info("No results found")
+        
         # Compare semantic
         elif mode == 'compare_semantic':
             with st.spinner("Comparing models..."):
-                model1, model2 = load_models()
-                results1, time1 = semantic_search(query, model1, Model1Config.TABLE_NAME, top_k)
-                results2, time2 = semantic_search(query, model2, Model2Config.TABLE_NAME, top_k)
+                models = get_models()
+                backend1 = get_search_backend(Model1Config)
+                backend2 = get_search_backend(Model2Config)
+                # Les 2 modèles se chargent (au besoin), encodent et interrogent la base en même temps
+                outputs, timings = get_comparer().run({
+                    'fast': with_script_context(lambda: semantic_search(
+                        query, models.get_batcher(Model1Config), Model1Config, top_k, backend=backend1,
+                        probes=probes, ef_search=ef_search, passages=passages, quantization=quantization)),
+                    'medical': with_script_context(lambda: semantic_search(
+                        query, models.get_batcher(Model2Config), Model2Config, top_k, backend=backend2,
+                        probes=probes, ef_search=ef_search, passages=passages, quantization=quantization))
+                })
+                results1, time1 = outputs['fast']
+                results2, time2 = outputs['medical']
+            st.caption(format_wall_clock(timings))
             
             # Metrics + chevauchement
             ids1 = {r[0] for r in results1} if results1 else set()
@@ -1129,7 +1391,7 @@ def main():
                 if results1:
                     for i, result in enumerate(results1, 1):
                         is_overlap = result[0] in overlap
-                        display_result(result, i, "semantic", highlight=is_overlap)
+                        display_result(result, i, "semantic", highlight=is_overlap, key_prefix="fast_")
                 st.markdown('</div>', unsafe_allow_html=True)
             
             with col2:
@@ -1138,7 +1400,7 @@ def main():
                 if results2:
                     for i, result in enumerate(results2, 1):
                         is_overlap = result[0] in overlap
-                        display_result(result, i, "semantic", highlight=is_overlap)
+                        display_result(result, i, "semantic", highlight=is_overlap, key_prefix="medical_")
                 st.markdown('</div>', unsafe_allow_html=True)
             
             st.markdown('</div>', unsafe_allow_html=True)
@@ -1146,9 +1408,17 @@ def main():
         # Compare keyword vs medical
         elif mode == 'compare_keyword':
             with st.spinner("Comparing..."):
-                model1, model2 = load_models()
-                results_kw, time_kw = keyword_search(query, Model1Config.TABLE_NAME, top_k)
-                results_med, time_med = semantic_search(query, model2, Model2Config.TABLE_NAME, top_k)
+                model2 = get_models().get_batcher(Model2Config)
+                backend2 = get_search_backend(Model2Config)
+                outputs, timings = get_comparer().run({
+                    'keyword': with_script_context(lambda: keyword_search(query, top_k)),
+                    'medical': with_script_context(lambda: semantic_search(
+                        query, model2, Model2Config, top_k, backend=backend2,
+                        probes=probes, ef_search=ef_search, passages=passages, quantization=quantization))
+                })
+                results_kw, time_kw = outputs['keyword']
+                results_med, time_med = outputs['medical']
+            st.caption(format_wall_clock(timings))
             
             # Metrics + chevauchement
             ids_kw = {r[0] for r in results_kw} if results_kw else set()
@@ -11,30 +11,96 @@ class Config:
     DB_USER = os.getenv('DB_USER', 'postgres')
     DB_PASSWORD = os.getenv('DB_PASSWORD', 'postgres')
     
+    # Pool de connexions
+    DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '1'))
+    DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+    DB_POOL_HEALTHCHECK_INTERVAL = 30  # secondes d'inactivité avant un SELECT 1
+    
     # Embedding Model
     EMBEDDING_MODEL = 'all-MiniLM-L6-v2'
     EMBEDDING_DIM = 384
+    # Précharger les encodeurs en arrière-plan au démarrage de l'app (sinon: au premier usage)
+    MODEL_WARMUP = os.getenv('MODEL_WARMUP', '').lower() in ('1', 'true', 'yes')
+    # Encodage des requêtes: 'torch' (SentenceTransformer), 'onnx' ou 'onnx-int8' (ONNX Runtime)
+    ENCODER_BACKEND = os.getenv('ENCODER_BACKEND', 'torch')
+    ONNX_DIR = os.getenv('ONNX_DIR', 'models/onnx')
+    ONNX_INTRA_OP_THREADS = int(os.getenv('ONNX_INTRA_OP_THREADS')) if os.getenv('ONNX_INTRA_OP_THREADS') else None
+    # Micro-batching des requêtes concurrentes (un seul encode() par lot)
+    MICROBATCH_MAX_SIZE = int(os.getenv('MICROBATCH_MAX_SIZE', '32'))
+    MICROBATCH_MAX_WAIT_MS = float(os.getenv('MICROBATCH_MAX_WAIT_MS', '5'))
+    
+    # Schéma: une table de documents partagée + une table d'embeddings par modèle
+    DOCUMENTS_TABLE = 'medical_documents'
+    ANSWER_PREVIEW_CHARS = 280  # colonne answer_preview (extrait affiché dans les résultats), reprise en dur dans sql/setup.sql
+    DOCUMENT_CACHE_SIZE = int(os.getenv('DOCUMENT_CACHE_SIZE', '5000'))  # documents hydratés en cache
     
     # Search
     TOP_K_RESULTS = 5
+    # Backend vectoriel: 'pgvector' (PostgreSQL) ou 'numpy' (fichiers .npy en mémoire)
+    SEARCH_BACKEND = os.getenv('SEARCH_BACKEND', 'pgvector')
+    
+    # Index vectoriel (construit après le chargement des données)
+    VECTOR_INDEX_METHOD = os.getenv('VECTOR_INDEX_METHOD', 'ivfflat')  # 'ivfflat' ou 'hnsw'
+    # Paramètres de recherche par défaut (None = valeur par défaut de pgvector)
+    IVFFLAT_PROBES = int(os.getenv('IVFFLAT_PROBES')) if os.getenv('IVFFLAT_PROBES') else None
+    HNSW_EF_SEARCH = int(os.getenv('HNSW_EF_SEARCH')) if os.getenv('HNSW_EF_SEARCH') else None
+    
+    # Cache des embeddings de requêtes
+    EMBEDDING_CACHE_MAX_MB = float(os.getenv('EMBEDDING_CACHE_MAX_MB', '64'))
+    EMBEDDING_CACHE_TTL = int(os.getenv('EMBEDDING_CACHE_TTL', '3600'))  # secondes, 0 = illimité
+    EMBEDDING_CACHE_DIR = os.getenv('EMBEDDING_CACHE_DIR')  # tier disque optionnel
     
     # Paths
     DATA_DIR = 'data'
     RAW_DATA_DIR = 'data/raw'
     PROCESSED_DATA_DIR = 'data/processed'
     EMBEDDINGS_DIR = 'embeddings'
+    # Artefact colonnaire (textes + une colonne d'embeddings par modèle), voir src/artifacts.py
+    ARTIFACT_FILE = 'data/processed/medquad.arrow'
 
      # Batch sizes (ADD THESE LINES)
     DB_INSERT_BATCH_SIZE = 100  # For database insertion
     EMBEDDING_BATCH_SIZE = 32   # For embedding generation
+    EMBEDDING_CHUNK_SIZE = 4096  # Lignes encodées puis écrites sur disque à la fois (reprise possible)
+    EMBEDDING_WORKERS = int(os.getenv('EMBEDDING_WORKERS', '4'))  # Processus de --mode parallel
+    EMBEDDING_SHARD_SIZE = 512  # Lignes envoyées à un processus à la fois (--mode parallel)
+    EMBEDDING_TOKEN_BUDGET = 16384  # Tokens paddés par lot avec --token-budget (≈ 32 × 512)
+    EMBEDDING_MAX_BATCH_SIZE = 256  # Plafond de textes par lot sous budget de tokens
+    
+    # Index par passages (réponses longues découpées en fenêtres de tokens)
+    PASSAGE_OVERLAP_TOKENS = 64  # Recouvrement entre fenêtres consécutives
+    PASSAGE_CANDIDATES_PER_RESULT = 10  # Passages lus par l'index ANN pour chaque résultat demandé
+    PASSAGE_AGGREGATION = os.getenv('PASSAGE_AGGREGATION', 'max')  # 'max' ou 'sum' (somme des top-n)
+    PASSAGE_TOP_N = 3  # Passages sommés par document (agrégation 'sum')
+    
+    # Recherche hybride mots-clés + sémantique (une requête, src/hybrid_search.py)
+    HYBRID_FUSION = os.getenv('HYBRID_FUSION', 'rrf')  # 'rrf' ou 'weighted'
+    HYBRID_SEMANTIC_WEIGHT = float(os.getenv('HYBRID_SEMANTIC_WEIGHT', '0.5'))  # poids de la branche sémantique
+    HYBRID_RRF_K = 60  # Constante k de 1 / (k + rang)
+    HYBRID_CANDIDATES_PER_RESULT = 10  # Candidats lus par chaque branche pour chaque résultat demandé
+
+    # Recherche filtrée par catégorie (src/category_index.py)
+    CATEGORY_EXACT_MAX_ROWS = 2000  # En dessous: parcours exact des lignes de la catégorie
+    CATEGORY_INDEX_MIN_ROWS = 2000  # À partir de: index vectoriel partiel propre à la catégorie
+    CATEGORY_PLANNER_TTL = 300  # Secondes avant relecture des effectifs par catégorie
+
+    # Vecteurs quantifiés + rerank float32 (src/quantized_index.py)
+    VECTOR_QUANTIZATION = os.getenv('VECTOR_QUANTIZATION', 'halfvec')  # 'halfvec' ou 'bit'
+    QUANTIZED_RERANK_CANDIDATES = int(os.getenv('QUANTIZED_RERANK_CANDIDATES', '200'))  # Candidats relus en float32
+
+    # Variantes ACP réduites + rerank en pleine dimension (src/reduced_index.py)
+    REDUCED_DIMENSIONS = (128, 256)  # Variantes construites par défaut
+    REDUCED_SEARCH_DIMENSIONS = int(os.getenv('REDUCED_SEARCH_DIMENSIONS', '256'))  # Variante interrogée
+    REDUCED_RERANK_CANDIDATES = int(os.getenv('REDUCED_RERANK_CANDIDATES', '200'))  # Candidats recalculés
 
 
 class Model1Config:
     """Modèle 1: MiniLM (général, rapide)"""
     NAME = 'all-MiniLM-L6-v2'
     DIMENSIONS = 384
-    TABLE_NAME = 'medical_documents_minilm'
+    TABLE_NAME = 'medical_embeddings_minilm'
     EMBEDDINGS_FILE = 'embeddings/medquad_embeddings_minilm.npy'
+    ARTIFACT_COLUMN = 'embedding_minilm'
     DESCRIPTION = 'Modèle général rapide'
 
 
@@ -42,6 +108,7 @@ class Model2Config:
     """Modèle 2: PubMedBert (spécialisé médical)"""
     NAME = 'pritamdeka/S-PubMedBert-MS-MARCO'
     DIMENSIONS = 768  # Plus de dimensions!
-    TABLE_NAME = 'medical_documents_pubmed'
+    TABLE_NAME = 'medical_embeddings_pubmed'
     EMBEDDINGS_FILE = 'embeddings/medquad_embeddings_pubmed.npy'
+    ARTIFACT_COLUMN = 'embedding_pubmed'
     DESCRIPTION = 'Modèle spécialisé médical'
\ No newline at end of file
@@ -1,28 +1,78 @@
 -- Enable pgvector extension
 CREATE EXTENSION IF NOT EXISTS vector;
 
--- Create main table for medical documents
+-- Shared table for medical documents: text and metadata are stored once,
+-- whatever the number of embedding models
 CREATE TABLE medical_documents (
-    id SERIAL PRIMARY KEY,
+    id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
     question TEXT NOT NULL,
     answer TEXT NOT NULL,
-    embedding VECTOR(384),
-    category TEXT,
-    source TEXT,
+    combined_text TEXT,
+    category VARCHAR(100),
+    qtype VARCHAR(50),
+    source VARCHAR(200) DEFAULT 'MedQuAD',
+    search_vector TSVECTOR
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(combined_text, question || ' ' || answer))) STORED,
+    -- Snippet shown in result cards: the full answer is only read when a card is expanded.
+    -- 280 = Config.ANSWER_PREVIEW_CHARS (config.py), used by src/insert_dual_models.py: keep both in sync
+    answer_preview TEXT GENERATED ALWAYS AS (left(answer, 280)) STORED,
+    -- md5 of the encoded text: src/incremental_update.py re-embeds only rows whose hash changed
+    content_hash TEXT GENERATED ALWAYS AS (md5(coalesce(combined_text, question || ' ' || answer))) STORED,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
--- Create vector index for similarity search
-CREATE INDEX ON medical_documents 
-USING ivfflat (embedding vector_cosine_ops)
-WITH (lists = 100);
+-- Full-text index on the stored tsvector (keyword search never re-parses documents)
+CREATE INDEX idx_search_vector ON medical_documents 
+USING GIN(search_vector);
 
--- Create text search indexes for comparison
-CREATE INDEX idx_question_text ON medical_documents 
-USING GIN(to_tsvector('english', question));
+-- Create category index
+CREATE INDEX idx_category ON medical_documents(category);
+
+-- One narrow embedding table per model, keyed by document id.
+-- category is denormalized so filtered vector searches need no join.
+-- Adding a model only adds a table like this one.
+-- content_hash = hash of the document text this vector was computed from
+-- (src/incremental_update.py diffs each model against the CSV separately).
+CREATE TABLE medical_embeddings_minilm (
+    doc_id INTEGER PRIMARY KEY REFERENCES medical_documents(id) ON DELETE CASCADE,
+    category VARCHAR(100),
+    embedding VECTOR(384) NOT NULL,
+    content_hash TEXT
+);
 
-CREATE INDEX idx_answer_text ON medical_documents 
-USING GIN(to_tsvector('english', answer));
+CREATE INDEX idx_medical_embeddings_minilm_category ON medical_embeddings_minilm(category);
 
--- Create category index
-CREATE INDEX idx_category ON medical_documents(category);
\ No newline at end of file
+CREATE TABLE medical_embeddings_pubmed (
+    doc_id INTEGER PRIMARY KEY REFERENCES medical_documents(id) ON DELETE CASCADE,
+    category VARCHAR(100),
+    embedding VECTOR(768) NOT NULL,
+    content_hash TEXT
+);
+
+CREATE INDEX idx_medical_embeddings_pubmed_category ON medical_embeddings_pubmed(category);
+
+-- The vector indexes are built AFTER the data is loaded, so that IVFFlat
+-- centroids are trained on real rows and inserts skip index maintenance:
+--   python src/vector_index.py --method ivfflat|hnsw
+
+-- Optional passage index (python src/passage_index.py): long answers split into
+-- overlapping token windows, one row per window, text read from the parent document.
+CREATE TABLE medical_embeddings_minilm_passages (
+    doc_id INTEGER NOT NULL REFERENCES medical_documents(id) ON DELETE CASCADE,
+    passage_idx INTEGER NOT NULL,
+    category VARCHAR(100),
+    embedding VECTOR(384) NOT NULL,
+    PRIMARY KEY (doc_id, passage_idx)
+);
+
+CREATE INDEX idx_medical_embeddings_minilm_passages_category ON medical_embeddings_minilm_passages(category);
+
+CREATE TABLE medical_embeddings_pubmed_passages (
+    doc_id INTEGER NOT NULL REFERENCES medical_documents(id) ON DELETE CASCADE,
+    passage_idx INTEGER NOT NULL,
+    category VARCHAR(100),
+    embedding VECTOR(768) NOT NULL,
+    PRIMARY KEY (doc_id, passage_idx)
+);
+
+CREATE INDEX idx_medical_embeddings_pubmed_passages_category ON medical_embeddings_pubmed_passages(category);
@@ -0,0 +1,335 @@
+"""
+Artefact colonnaire du corpus (Arrow IPC, data/processed/medquad.arrow)
+
+Un seul fichier remplace le couple CSV prétraité + .npy alignés par
+position: colonnes texte et métadonnées, id stable du document, et une
+colonne d'embeddings par modèle (liste de taille fixe de float32).
+Le fichier est ouvert en mémoire mappée: une étape ne lit (et ne
+pagine) que les colonnes dont elle a besoin, et la matrice d'embeddings
+est une vue NumPy sur le fichier, sans copie ni parsing.
+
+Les embeddings ne sont ajoutés qu'en réécrivant le fichier
+(attach_embeddings), après vérification du nombre de lignes et des ids:
+un vecteur ne peut pas se retrouver à côté du mauvais texte. Une table
+renvoyée par open_table garde le fichier mappé: la libérer avant de
+réécrire l'artefact (Windows refuse de remplacer un fichier mappé).
+"""
+import argparse
+import hashlib
+import os
+import sys
+from typing import Iterator, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config, Model2Config
+
+
+MODELS = {'minilm': Model1Config, 'pubmed': Model2Config}
+
+DOCUMENT_SCHEMA = pa.schema([
+    ('id', pa.int64()),
+    ('question', pa.string()),
+    ('answer', pa.string()),
+    ('combined_text', pa.string()),
+    ('category', pa.string()),
+    ('source', pa.string())
+])
+
+DOCUMENT_COLUMNS = tuple(DOCUMENT_SCHEMA.names)
+
+
+def is_artifact(path: str) -> bool:
+    return path.endswith('.arrow')
+
+
+def default_input() -> str:
+    """Entrée des étapes suivant le prétraitement: l'artefact s'il existe, sinon le CSV"""
+    if os.path.exists(Config.ARTIFACT_FILE):
+        return Config.ARTIFACT_FILE
+    return os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+
+
+def embedding_field(model_config) -> pa.Field:
+    """Colonne d'embeddings d'un modèle (le nom du modèle est gardé dans ses métadonnées)"""
+    return pa.field(
+        model_config.ARTIFACT_COLUMN,
+        pa.list_(pa.float32(), model_config.DIMENSIONS),
+        nullable=False,
+        metadata={b'model': model_config.NAME.encode('utf-8')}
+    )
+
+
+def open_table(path: Optional[str] = None) -> pa.Table:
+    """
+    Table complète en mémoire mappée
+
+    Aucune donnée n'est lue à l'ouverture: les buffers des colonnes
+    pointent dans le fichier et ne sont paginés qu'à l'accès.
+    """
+    return pa.ipc.open_file(pa.memory_map(path or Config.ARTIFACT_FILE, 'r')).read_all()
+
+
+def count_rows(path: str) -> int:
+    """Nombre de documents (artefact: métadonnées seules; CSV: lecture par blocs)"""
+    if is_artifact(path):
+        return open_table(path).num_rows
+    return sum(len(chunk) for chunk in pd.read_csv(path, usecols=['combined_text'],
+                                                   chunksize=Config.EMBEDDING_CHUNK_SIZE))
+
+
+def fingerprint(path: str) -> str:
+    """
+    Empreinte md5 des ids et des textes encodés
+
+    Ne change pas quand des colonnes d'embeddings sont ajoutées: sert à
+    valider un checkpoint de génération sur l'artefact.
+    """
+    md5 = hashlib.md5()
+    table = open_table(path).select(['id', 'combined_text'])
+    for batch in table.to_batches():
+        texts = batch.column(1)
+        md5.update(batch.column(0).to_numpy(zero_copy_only=False).astype('<i8').tobytes())
+        # Longueurs + octets des textes: indépendant du découpage en lots
+        md5.update(pc.binary_length(texts).fill_null(-1).to_numpy().astype('<i8').tobytes())
+        offsets = np.frombuffer(texts.buffers()[1], dtype=np.int32)[texts.offset:texts.offset + len(texts) + 1]
+        if len(texts):
+            md5.update(memoryview(texts.buffers()[2])[offsets[0]:offsets[-1]])
+    return md5.hexdigest()
+
+
+def read_columns(columns: Sequence[str], path: Optional[str] = None) -> pd.DataFrame:
+    """DataFrame des seules colonnes demandées"""
+    return open_table(path).select(list(columns)).to_pandas()
+
+
+def read_documents(path: Optional[str] = None) -> pd.DataFrame:
+    """Colonnes des documents (mêmes colonnes que le CSV prétraité)"""
+    return read_columns(DOCUMENT_COLUMNS, path)
+
+
+def iter_texts(path: str, chunk_size: int, limit: Optional[int] = None,
+               column: str = 'combined_text') -> Iterator[Tuple[int, List[str]]]:
+    """
+    (première ligne, textes) par bloc de chunk_size lignes, depuis
+    l'artefact (tranches de la colonne mappée) ou un CSV (lecture par blocs)
+    """
+    if is_artifact(path):
+        texts = open_table(path).column(column)
+        total = len(texts) if limit is None else min(limit, len(texts))
+        for start in range(0, total, chunk_size):
+            chunk = texts.slice(start, min(chunk_size, total - start)).to_pylist()
+            yield start, ['' if text is None else text for text in chunk]
+        return
+
+    row = 0
+    for chunk in pd.read_csv(path, usecols=[column], chunksize=chunk_size, nrows=limit):
+        texts = chunk[column].fillna('').astype(str).tolist()
+        yield row, texts
+        row += len(texts)
+
+
+def read_texts(path: str, column: str = 'combined_text') -> List[str]:
+    """Tous les textes d'une colonne, dans l'ordre des lignes"""
+    return [text for _, chunk in iter_texts(path, Config.EMBEDDING_CHUNK_SIZE, column=column)
+            for text in chunk]
+
+
+def has_embeddings(model_config, path: Optional[str] = None) -> bool:
+    path = path or Config.ARTIFACT_FILE
+    return os.path.exists(path) and model_config.ARTIFACT_COLUMN in open_table(path).schema.names
+
+
+def read_embeddings(model_config, path: Optional[str] = None) -> np.ndarray:
+    """
+    Matrice (lignes, dimensions) float32 de la colonne d'un modèle
+
+    Vue en lecture seule sur le fichier mappé quand l'artefact tient en
+    un seul lot (prétraitement en mémoire, ou blocs plus grands que le
+    corpus); copie contiguë des lots sinon.
+    """
+    table = open_table(path)
+    field = table.schema.field(model_config.ARTIFACT_COLUMN)
+    if field.type.list_size != model_config.DIMENSIONS:
+        raise ValueError(f"{field.name}: {field.type.list_size} dimensions, "
+                         f"{model_config.DIMENSIONS} attendues")
+    model = (field.metadata or {}).get(b'model', b'').decode('utf-8')
+    if model != model_config.NAME:
+        raise ValueError(f"{field.name} a été calculée avec '{model}', pas {model_config.NAME}")
+
+    blocks = [
+        chunk.flatten().to_numpy(zero_copy_only=True).reshape(-1, model_config.DIMENSIONS)
+        for chunk in table.column(field.name).chunks
+        if len(chunk)
+    ]
+    if not blocks:
+        return np.empty((0, model_config.DIMENSIONS), dtype=np.float32)
+    return blocks[0] if len(blocks) == 1 else np.concatenate(blocks)
+
+
+class DocumentWriter:
+    """
+    Écriture des colonnes des documents lot par lot (prétraitement par blocs)
+
+    Fichier temporaire publié par renommage à la fermeture: l'artefact
+    précédent (et ses embeddings, qui ne correspondent plus) n'est
+    remplacé qu'une fois le nouveau complet.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.ARTIFACT_FILE
+        self.tmp_path = f"{self.path}.tmp"
+        self.rows = 0
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self._writer = pa.ipc.new_file(self.tmp_path, DOCUMENT_SCHEMA)
+
+    def write(self, df: pd.DataFrame):
+        table = pa.Table.from_pandas(df[list(DOCUMENT_COLUMNS)], schema=DOCUMENT_SCHEMA,
+                                     preserve_index=False)
+        self._writer.write_table(table)
+        self.rows += table.num_rows
+
+    def close(self) -> str:
+        self._writer.close()
+        os.replace(self.tmp_path, self.path)
+        return self.path
+
+    def abort(self):
+        self._writer.close()
+        os.remove(self.tmp_path)
+
+
+def write_documents(df: pd.DataFrame, path: Optional[str] = None) -> str:
+    """Écrit un artefact (sans embeddings) depuis le DataFrame prétraité"""
+    writer = DocumentWriter(path)
+    try:
+        writer.write(df)
+    except Exception:
+        writer.abort()
+        raise
+    return writer.close()
+
+
+def attach_embeddings(model_config, embeddings: np.ndarray, path: Optional[str] = None,
+                      ids: Optional[np.ndarray] = None) -> str:
+    """
+    Ajoute (ou remplace) la colonne d'embeddings d'un modèle
+
+    Les autres colonnes sont recopiées lot par lot depuis le fichier
+    mappé (mêmes lots qu'à l'écriture des documents). Publication atomique,
+    une fois le mapping de l'artefact libéré: Windows refuse de remplacer
+    un fichier encore mappé.
+
+    Args:
+        model_config: Modèle des vecteurs
+        embeddings: Matrice (lignes, dimensions), dans l'ordre des lignes de l'artefact
+        path: Artefact (défaut: Config.ARTIFACT_FILE)
+        ids: ids des documents des vecteurs (vérifiés contre la colonne id)
+    """
+    path = path or Config.ARTIFACT_FILE
+    tmp_path = f"{path}.tmp"
+    try:
+        _write_with_embeddings(path, tmp_path, model_config, embeddings, ids)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+    return path
+
+
+def _write_with_embeddings(path: str, tmp_path: str, model_config, embeddings: np.ndarray,
+                           ids: Optional[np.ndarray]):
+    """
+    Écrit dans tmp_path l'artefact avec la colonne du modèle
+
+    La table mappée ne vit que dans cette fonction: à son retour, plus
+    aucun buffer ne référence le fichier et le mapping est fermé.
+    """
+    with pa.memory_map(path, 'r') as source:
+        table = pa.ipc.open_file(source).read_all()
+        if embeddings.shape != (table.num_rows, model_config.DIMENSIONS):
+            raise ValueError(f"Embeddings {embeddings.shape}, artefact "
+                             f"({table.num_rows}, {model_config.DIMENSIONS}) attendu")
+        if ids is not None and not np.array_equal(np.asarray(ids, dtype=np.int64),
+                                                  table.column('id').to_numpy()):
+            raise ValueError("Les ids des embeddings ne correspondent pas aux lignes de l'artefact")
+
+        flat = pa.array(np.ascontiguousarray(embeddings, dtype=np.float32).reshape(-1))
+        column = pa.FixedSizeListArray.from_arrays(flat, model_config.DIMENSIONS)
+        field = embedding_field(model_config)
+        if field.name in table.schema.names:
+            table = table.set_column(table.schema.get_field_index(field.name), field, column)
+        else:
+            table = table.append_column(field, column)
+
+        with pa.ipc.new_file(tmp_path, table.schema) as writer:
+            writer.write_table(table)
+        del table
+
+
+def build_artifact(df: pd.DataFrame, path: Optional[str] = None, model_configs=None) -> str:
+    """
+    Artefact depuis le CSV prétraité et les .npy existants (migration)
+
+    Un .npy n'est repris que s'il a exactement une ligne par document.
+
+    Args:
+        df: CSV prétraité
+        path: Artefact (défaut: Config.ARTIFACT_FILE)
+        model_configs: Modèles dont reprendre les embeddings (défaut: tous)
+    """
+    path = write_documents(df, path)
+    print(f"   ✅ {len(df)} documents → {path}")
+    for model_config in MODELS.values() if model_configs is None else model_configs:
+        if not os.path.exists(model_config.EMBEDDINGS_FILE):
+            print(f"   ⏭️  {model_config.NAME}: pas de {model_config.EMBEDDINGS_FILE}")
+            continue
+        embeddings = np.load(model_config.EMBEDDINGS_FILE, mmap_mode='r')
+        if embeddings.shape != (len(df), model_config.DIMENSIONS):
+            print(f"   ⚠️  {model_config.EMBEDDINGS_FILE} {embeddings.shape} ne correspond pas au CSV: ignoré")
+            continue
+        attach_embeddings(model_config, embeddings, path)
+        print(f"   ✅ {model_config.ARTIFACT_COLUMN}: {embeddings.shape}")
+    return path
+
+
+def describe(path: Optional[str] = None):
+    """Colonnes, lots et taille de l'artefact"""
+    path = path or Config.ARTIFACT_FILE
+    table = open_table(path)
+    print(f"\n📦 {path}: {table.num_rows} documents, {table.column(0).num_chunks} lot(s), "
+          f"{os.path.getsize(path) / 1024**2:.1f} MB")
+    for field in table.schema:
+        model = (field.metadata or {}).get(b'model')
+        print(f"   - {field.name}: {field.type}" + (f" ({model.decode('utf-8')})" if model else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Artefact Arrow du corpus (textes + embeddings)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Créer l'artefact depuis le CSV prétraité et les .npy")
+    build.add_argument('--input', default=os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv'))
+    build.add_argument('--output', default=Config.ARTIFACT_FILE)
+    build.add_argument('--models', nargs='+', choices=sorted(MODELS), default=sorted(MODELS))
+
+    info = subparsers.add_parser('info', help="Afficher le schéma de l'artefact")
+    info.add_argument('--path', default=Config.ARTIFACT_FILE)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        if not os.path.exists(args.input):
+            print(f"❌ CSV non trouvé: {args.input}")
+            return
+        print(f"\n📂 {args.input}")
+        build_artifact(pd.read_csv(args.input), args.output, [MODELS[name] for name in args.models])
+        describe(args.output)
+    else:
+        describe(args.path)
+
+
+if __name__ == "__main__":
+    main()
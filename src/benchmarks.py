@@ -0,0 +1,985 @@
+"""
+Benchmarks de performance du moteur de recherche
+Usage: python src/benchmarks.py <benchmark> [options]
+"""
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from src.artifacts import default_input, iter_texts
+
+
+DEFAULT_QUERIES = [
+    "How to treat diabetes?",
+    "What are the symptoms of heart disease?",
+    "Is cancer hereditary?",
+    "What causes high blood pressure?",
+    "How is Alzheimer's diagnosed?"
+]
+
+
+def load_benchmark_queries(n_queries):
+    """
+    Charge des questions de test depuis le dataset prétraité
+
+    Args:
+        n_queries: Nombre de questions voulues
+
+    Returns:
+        Liste de questions (les requêtes par défaut si le CSV est absent)
+    """
+    csv_path = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    if not os.path.exists(csv_path):
+        return (DEFAULT_QUERIES * (n_queries // len(DEFAULT_QUERIES) + 1))[:n_queries]
+
+    questions = pd.read_csv(csv_path, usecols=['question'])['question']
+    n_queries = min(n_queries, len(questions))
+    return questions.sample(n=n_queries, random_state=42).tolist()
+
+
+def print_latency_stats(label, latencies):
+    """Affiche p50 / p99 / moyenne d'une liste de latences (secondes)"""
+    latencies_ms = np.array(latencies) * 1000
+    print(f"   {label:<28} p50: {np.percentile(latencies_ms, 50):8.2f}ms"
+          f"   p99: {np.percentile(latencies_ms, 99):8.2f}ms"
+          f"   moy: {latencies_ms.mean():8.2f}ms")
+
+
+def benchmark_batch_search(n_queries=1000, top_k=5):
+    """
+    Compare semantic_search en boucle et semantic_search_many
+
+    Args:
+        n_queries: Nombre de requêtes
+        top_k: Nombre de résultats par requête
+    """
+    from src.search_engine import SemanticSearchEngine
+
+    print("="*70)
+    print(f"⚡ BENCHMARK: BOUCLE vs LOT ({n_queries} requêtes, top_k={top_k})")
+    print("="*70)
+
+    queries = load_benchmark_queries(n_queries)
+    engine = SemanticSearchEngine()
+
+    try:
+        # Échauffement (chargement des poids, cache PostgreSQL)
+        engine.semantic_search(queries[0], top_k=top_k)
+
+        start = time.time()
+        loop_results = [engine.semantic_search(q, top_k=top_k)[0] for q in queries]
+        loop_time = time.time() - start
+
+        batch_results, timings = engine.semantic_search_many(queries, top_k=top_k)
+
+        same = sum(
+            [r['id'] for r in a] == [r['id'] for r in b]
+            for a, b in zip(loop_results, batch_results)
+        )
+
+        print(f"\n🔁 Boucle semantic_search:")
+        print(f"   Total: {loop_time:.2f}s ({len(queries) / loop_time:.1f} requêtes/sec)")
+        print(f"\n📦 semantic_search_many:")
+        print(f"   Encodage: {timings['encode']:.2f}s")
+        print(f"   SQL:      {timings['search']:.2f}s")
+        print(f"   Total:    {timings['total']:.2f}s ({len(queries) / timings['total']:.1f} requêtes/sec)")
+        print(f"\n🚀 Accélération: x{loop_time / timings['total']:.1f}")
+        print(f"✅ Résultats identiques: {same}/{len(queries)}")
+    finally:
+        engine.close()
+
+
+def benchmark_connection_pool(n_threads=8, n_queries=400, pool_sizes=(1, 4, 8)):
+    """
+    Latence de recherches concurrentes selon la taille du pool
+
+    Args:
+        n_threads: Nombre de threads clients simultanés
+        n_queries: Nombre total de requêtes
+        pool_sizes: Tailles de pool à comparer
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from src.db_pool import ConnectionPool
+
+    print("="*70)
+    print(f"🔌 BENCHMARK: POOL DE CONNEXIONS ({n_threads} threads, {n_queries} requêtes)")
+    print("="*70)
+
+    queries = load_benchmark_queries(n_queries)
+    sql = f"""
+        SELECT id, question, answer, category, qtype,
+               ts_rank(search_vector, tsquery) as rank
+        FROM {Config.DOCUMENTS_TABLE}, plainto_tsquery('english', %s) tsquery
+        WHERE search_vector @@ tsquery
+        ORDER BY rank DESC
+        LIMIT 5;
+    """
+
+    for pool_size in pool_sizes:
+        pool = ConnectionPool(minconn=1, maxconn=pool_size)
+
+        def run_query(query):
+            start = time.time()
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, (query,))
+                cursor.fetchall()
+                cursor.close()
+            return time.time() - start
+
+        try:
+            run_query(queries[0])
+            start = time.time()
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                latencies = list(executor.map(run_query, queries))
+            wall_time = time.time() - start
+        finally:
+            pool.close()
+
+        print(f"\n📦 Pool max={pool_size}: {len(queries) / wall_time:.1f} requêtes/sec")
+        print_latency_stats("latence", latencies)
+
+
+def benchmark_keyword_search(n_queries=200, top_k=5):
+    """
+    p50 / p99 de la recherche par mots-clés: to_tsvector calculé à la volée
+    (ancienne requête) vs colonne tsvector stockée + index GIN
+
+    Args:
+        n_queries: Nombre de requêtes
+        top_k: Nombre de résultats par requête
+    """
+    from src.db_pool import ConnectionPool
+
+    table = Config.DOCUMENTS_TABLE
+    on_the_fly_sql = f"""
+        SELECT id, question, answer, category, qtype,
+               ts_rank(to_tsvector('english', combined_text),
+                      plainto_tsquery('english', %(q)s)) as rank
+        FROM {table}
+        WHERE to_tsvector('english', combined_text) @@
+              plainto_tsquery('english', %(q)s)
+        ORDER BY rank DESC
+        LIMIT %(k)s;
+    """
+    stored_sql = f"""
+        SELECT id, question, answer, category, qtype,
+               ts_rank(search_vector, tsquery) as rank
+        FROM {table}, plainto_tsquery('english', %(q)s) tsquery
+        WHERE search_vector @@ tsquery
+        ORDER BY rank DESC
+        LIMIT %(k)s;
+    """
+
+    print("="*70)
+    print(f"🔤 BENCHMARK: MOTS-CLÉS ({n_queries} requêtes sur {table})")
+    print("="*70)
+
+    queries = load_benchmark_queries(n_queries)
+    pool = ConnectionPool(minconn=1, maxconn=1)
+
+    try:
+        for label, sql in (("to_tsvector à la volée", on_the_fly_sql),
+                           ("tsvector stocké + GIN", stored_sql)):
+            latencies = []
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, {'q': queries[0], 'k': top_k})
+                cursor.fetchall()
+                for query in queries:
+                    start = time.time()
+                    cursor.execute(sql, {'q': query, 'k': top_k})
+                    cursor.fetchall()
+                    latencies.append(time.time() - start)
+                cursor.close()
+            print_latency_stats(label, latencies)
+    finally:
+        pool.close()
+
+
+def benchmark_two_phase(n_queries=200, top_k=5):
+    """
+    Recherche en une requête (texte complet joint) vs deux phases
+    ((id, score) puis hydratation des extraits), cache de documents froid et chaud
+
+    Les vecteurs de requête sont pris dans la table (pas besoin du modèle).
+
+    Args:
+        n_queries: Nombre de requêtes
+        top_k: Nombre de résultats par requête
+    """
+    from config import Model1Config
+    from src.db_pool import ConnectionPool
+    from src.document_store import DocumentStore
+
+    table = Model1Config.TABLE_NAME
+    one_shot_sql = f"""
+        WITH nearest AS (
+            SELECT doc_id, 1 - (embedding <=> %(v)s::vector) as similarity
+            FROM {table}
+            ORDER BY embedding <=> %(v)s::vector
+            LIMIT %(k)s
+        )
+        SELECT d.id, d.question, d.answer, d.category, d.qtype, n.similarity
+        FROM nearest n
+        JOIN {Config.DOCUMENTS_TABLE} d ON d.id = n.doc_id
+        ORDER BY n.similarity DESC;
+    """
+    ids_sql = f"""
+        SELECT doc_id, 1 - (embedding <=> %(v)s::vector) as similarity
+        FROM {table}
+        ORDER BY embedding <=> %(v)s::vector
+        LIMIT %(k)s;
+    """
+
+    print("="*70)
+    print(f"🪶 BENCHMARK: UNE REQUÊTE vs DEUX PHASES ({n_queries} requêtes, top_k={top_k})")
+    print("="*70)
+
+    pool = ConnectionPool(minconn=1, maxconn=2)
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT embedding::text FROM {table} ORDER BY random() LIMIT %s;", (n_queries,))
+            vectors = [row[0] for row in cursor.fetchall()]
+            cursor.close()
+
+        def run_one_shot():
+            latencies, text_bytes = [], 0
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                for vector in vectors:
+                    start = time.time()
+                    cursor.execute(one_shot_sql, {'v': vector, 'k': top_k})
+                    rows = cursor.fetchall()
+                    latencies.append(time.time() - start)
+                    text_bytes += sum(len(row[1]) + len(row[2]) for row in rows)
+                cursor.close()
+            return latencies, text_bytes
+
+        def run_two_phase(store):
+            latencies, text_bytes = [], 0
+            for vector in vectors:
+                start = time.time()
+                with pool.connection() as conn:
+                    cursor = conn.cursor()
+                    cursor.execute(ids_sql, {'v': vector, 'k': top_k})
+                    hits = cursor.fetchall()
+                    cursor.close()
+                rows = store.hydrate(hits)
+                latencies.append(time.time() - start)
+                text_bytes += sum(len(row[1]) + len(row[2]) for row in rows)
+            return latencies, text_bytes
+
+        run_one_shot()  # échauffement
+        store = DocumentStore(pool)
+        for label, (latencies, text_bytes) in (
+            ("texte complet joint", run_one_shot()),
+            ("2 phases (cache froid)", run_two_phase(store)),
+            ("2 phases (cache chaud)", run_two_phase(store)),
+        ):
+            print_latency_stats(label, latencies)
+            print(f"   {'':<28} texte affiché: {text_bytes / len(vectors) / 1024:.1f} Ko/requête")
+        stats = store.stats()
+        print(f"\n📦 Cache documents: {stats['hits']} hits / {stats['misses']} misses")
+    finally:
+        pool.close()
+
+
+STARTUP_SCENARIOS = {
+    'eager (2 modèles)': ['Model1Config', 'Model2Config'],
+    'keyword': [],
+    'fast': ['Model1Config'],
+    'medical': ['Model2Config']
+}
+
+STARTUP_SCRIPT = """
+import json, resource, sys, time
+start = time.time()
+sys.path.insert(0, {root!r})
+import config
+from src.model_registry import get_model_registry
+from src import concurrent_search, document_store, embedding_cache, numpy_backend
+registry = get_model_registry()
+for name in {models!r}:
+    registry.get(getattr(config, name))
+print(json.dumps({{
+    'time': time.time() - start,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'torch': 'torch' in sys.modules
+}}))
+"""
+
+
+def benchmark_startup(scenarios=None):
+    """
+    Temps de démarrage et mémoire résidente (pic RSS) selon les modèles chargés
+
+    Chaque scénario tourne dans un processus neuf qui importe les modules
+    de l'app puis charge les encodeurs nécessaires au mode
+    ('eager' = ancien comportement: les 2 modèles au démarrage).
+
+    Args:
+        scenarios: Noms de scénarios (défaut: tous)
+    """
+    import json
+    import subprocess
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    print("="*70)
+    print("🚀 BENCHMARK: DÉMARRAGE ET MÉMOIRE PAR MODE")
+    print("="*70)
+
+    for name in scenarios or STARTUP_SCENARIOS:
+        script = STARTUP_SCRIPT.format(root=root, models=STARTUP_SCENARIOS[name])
+        completed = subprocess.run(
+            [sys.executable, '-c', script], cwd=root, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else '?'
+            print(f"   {name:<20} ❌ {error}")
+            continue
+        stats = json.loads(completed.stdout.strip().splitlines()[-1])
+        print(f"   {name:<20} démarrage: {stats['time']:6.2f}s   RSS: {stats['rss_mb']:7.1f} Mo"
+              f"   torch importé: {'oui' if stats['torch'] else 'non'}")
+
+
+def benchmark_encoders(model_name='pubmed', backends=('torch', 'onnx', 'onnx-int8'),
+                       n_queries=200, batch_size=32, intra_op_threads=None):
+    """
+    Latence d'encodage (requête seule) et débit (par lots) selon le backend
+
+    Args:
+        model_name: 'minilm' ou 'pubmed'
+        backends: Backends comparés ('torch', 'onnx', 'onnx-int8')
+        n_queries: Nombre de requêtes
+        batch_size: Taille des lots pour la mesure de débit
+        intra_op_threads: Threads ONNX Runtime (défaut: Config.ONNX_INTRA_OP_THREADS)
+    """
+    from src.onnx_encoder import MODELS, OnnxEncoder, load_encoder
+
+    model_config = MODELS[model_name]
+    queries = load_benchmark_queries(n_queries)
+
+    print("="*70)
+    print(f"🧠 BENCHMARK: ENCODEURS {model_config.NAME} ({n_queries} requêtes)")
+    print("="*70)
+
+    for backend in backends:
+        try:
+            if backend == 'torch':
+                encoder = load_encoder(model_config, 'torch')
+            else:
+                encoder = OnnxEncoder.from_model_config(
+                    model_config, quantized=backend == 'onnx-int8', intra_op_threads=intra_op_threads
+                )
+        except (ImportError, FileNotFoundError) as e:
+            print(f"\n⚠️  {backend}: indisponible ({e})")
+            continue
+
+        encoder.encode(queries[0])  # échauffement
+        latencies = []
+        for query in queries:
+            start = time.time()
+            encoder.encode(query)
+            latencies.append(time.time() - start)
+
+        start = time.time()
+        encoder.encode(queries, batch_size=batch_size)
+        batch_time = time.time() - start
+
+        print(f"\n🔹 {backend}")
+        print_latency_stats("requête seule", latencies)
+        print(f"   {'lots de ' + str(batch_size):<28} {len(queries) / batch_time:8.1f} requêtes/sec")
+
+
+def benchmark_microbatch(model_name='pubmed', n_threads=16, n_queries=400, max_wait_ms=None):
+    """
+    Requêtes isolées concurrentes: encode() direct vs encodeur à micro-lots
+
+    Args:
+        model_name: 'minilm' ou 'pubmed'
+        n_threads: Nombre de sessions simultanées
+        n_queries: Nombre total de requêtes
+        max_wait_ms: Échéance d'un lot (défaut: Config.MICROBATCH_MAX_WAIT_MS)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from src.micro_batcher import MicroBatchEncoder
+    from src.onnx_encoder import MODELS, load_encoder
+
+    model_config = MODELS[model_name]
+    queries = load_benchmark_queries(n_queries)
+    model = load_encoder(model_config)
+    batcher = MicroBatchEncoder(model, max_wait_ms=max_wait_ms, name=model_name)
+
+    print("="*70)
+    print(f"🧺 BENCHMARK: MICRO-LOTS {model_config.NAME} "
+          f"({n_threads} threads, {n_queries} requêtes, backend {Config.ENCODER_BACKEND})")
+    print("="*70)
+
+    try:
+        model.encode(queries[0])  # échauffement
+        for label, encoder in (("encode() direct", model), ("micro-lots", batcher)):
+            def run_query(query):
+                start = time.time()
+                encoder.encode(query)
+                return time.time() - start
+
+            start = time.time()
+            with ThreadPoolExecutor(max_workers=n_threads) as executor:
+                latencies = list(executor.map(run_query, queries))
+            wall_time = time.time() - start
+
+            print(f"\n🔹 {label}: {len(queries) / wall_time:.1f} requêtes/sec")
+            print_latency_stats("latence", latencies)
+
+        stats = batcher.stats()
+        print(f"\n📦 {stats['batches']} lots, taille moyenne {stats['mean_batch_size']:.1f}")
+        print(f"   Tailles de lot:      {stats['batch_size_histogram']}")
+        print(f"   Profondeur de file:  {stats['queue_depth_histogram']}")
+    finally:
+        batcher.close()
+
+
+def benchmark_generation(model_name='minilm', worker_counts=(1, 2, 4), n_docs=2048,
+                         threads_per_worker=None, backend='torch', batch_size=32):
+    """
+    Débit de génération des embeddings (docs/sec) selon le nombre de processus
+
+    Args:
+        model_name: 'minilm' ou 'pubmed'
+        worker_counts: Nombres de processus comparés
+        n_docs: Nombre de documents encodés à chaque mesure
+        threads_per_worker: Threads par processus (défaut: cœurs / processus)
+        backend: 'torch', 'onnx' ou 'onnx-int8'
+        batch_size: Taille de batch de model.encode
+    """
+    import tempfile
+    from src.onnx_encoder import MODELS
+    from src.parallel_embeddings import default_threads_per_worker, generate_embeddings_parallel
+
+    model_config = MODELS[model_name]
+    input_csv = default_input()
+
+    print("="*70)
+    print(f"🏭 BENCHMARK: GÉNÉRATION MULTI-PROCESSUS {model_config.NAME} "
+          f"({n_docs} documents, {os.cpu_count()} cœurs, {backend})")
+    print("="*70)
+
+    results = []
+    reference = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for workers in worker_counts:
+            output_file = os.path.join(tmp_dir, f'embeddings_{workers}.npy')
+            stats = generate_embeddings_parallel(
+                model_config, input_csv, workers, threads_per_worker, batch_size=batch_size,
+                backend=backend, limit=n_docs, output_file=output_file
+            )
+            embeddings = np.load(output_file)
+            if reference is None:
+                reference = embeddings
+            # Même ordre de lignes quel que soit le découpage
+            max_diff = float(np.abs(embeddings - reference).max())
+            results.append((workers, stats, max_diff))
+
+    print(f"\n{'Processus':>9} {'Threads':>8} {'docs/sec':>10} {'hors chargement':>16} {'écart max':>10}")
+    for workers, stats, max_diff in results:
+        threads = threads_per_worker or default_threads_per_worker(workers)
+        print(f"{workers:>9} {threads:>8} {stats['docs_per_sec']:>10.1f} "
+              f"{stats['encode_docs_per_sec']:>16.1f} {max_diff:>10.2e}")
+
+
+def benchmark_padding(model_name='pubmed', n_docs=2048, batch_size=32, token_budget=None, backend=None):
+    """
+    Génération: lots fixes de batch_size textes vs lots triés sous budget de tokens
+
+    Args:
+        model_name: 'minilm' ou 'pubmed'
+        n_docs: Nombre de documents (combined_text) encodés
+        batch_size: Taille des lots fixes
+        token_budget: Budget de tokens paddés par lot (défaut: Config.EMBEDDING_TOKEN_BUDGET)
+        backend: 'torch', 'onnx' ou 'onnx-int8' (défaut: Config.ENCODER_BACKEND)
+    """
+    from src.length_batching import encode_length_bucketed, print_padding_stats, token_lengths
+    from src.onnx_encoder import MODELS, load_encoder
+
+    model_config = MODELS[model_name]
+    texts = [text for _, chunk in iter_texts(default_input(), n_docs, limit=n_docs) for text in chunk]
+    model = load_encoder(model_config, backend)
+
+    print("="*70)
+    print(f"✂️  BENCHMARK: PADDING {model_config.NAME} ({len(texts)} documents)")
+    print("="*70)
+
+    model.encode(texts[:batch_size], batch_size=batch_size)  # échauffement
+    real_tokens = int(token_lengths(model, texts).sum())
+
+    start = time.time()
+    fixed = model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    fixed_time = time.time() - start
+    print(f"\n🔹 Lots fixes de {batch_size}: {fixed_time:.1f}s, "
+          f"{real_tokens / fixed_time:.0f} tokens/sec, {len(texts) / fixed_time:.1f} docs/sec")
+
+    bucketed, stats = encode_length_bucketed(model, texts, max_tokens=token_budget, batch_size=batch_size)
+    print(f"\n🔹 Budget de {token_budget or Config.EMBEDDING_TOKEN_BUDGET} tokens: {stats['seconds']:.1f}s")
+    print_padding_stats(stats)
+
+    cosines = (fixed * bucketed).sum(axis=1)
+    print(f"\n🎯 Cosinus min lots fixes / budget: {cosines.min():.6f}")
+    print(f"🚀 Accélération: {fixed_time / stats['seconds']:.2f}x")
+
+
+def benchmark_hybrid(n_queries=200, top_k=5, fusion=None):
+    """
+    Hybride: deux requêtes (sémantique puis mots-clés, ou en parallèle sur
+    deux connexions) fusionnées en Python vs une seule requête SQL
+
+    Requêtes = questions du corpus, vecteurs lus dans la table (pas besoin
+    du modèle). Vérifie que la fusion SQL donne le même classement que
+    la fusion RRF en Python sur les mêmes candidats.
+
+    Args:
+        n_queries: Nombre de requêtes
+        top_k: Nombre de résultats fusionnés
+        fusion: 'rrf' ou 'weighted' (défaut: Config.HYBRID_FUSION)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from config import Model2Config
+    from src.db_pool import ConnectionPool
+    from src.hybrid_search import hybrid_hits_params, hybrid_hits_sql
+
+    fusion = fusion or Config.HYBRID_FUSION
+    table = Model2Config.TABLE_NAME
+    semantic_sql = f"""
+        SELECT doc_id, 1 - distance AS similarity
+        FROM (
+            SELECT doc_id, embedding <=> %(query)s::vector AS distance
+            FROM {table}
+            ORDER BY distance
+            LIMIT %(candidates)s
+        ) nearest;
+    """
+    keyword_sql = f"""
+        SELECT id, ts_rank(search_vector, tsquery) AS rank
+        FROM {Config.DOCUMENTS_TABLE}, plainto_tsquery('english', %(text)s) tsquery
+        WHERE search_vector @@ tsquery
+        ORDER BY rank DESC, id
+        LIMIT %(candidates)s;
+    """
+    hybrid_sql = hybrid_hits_sql(table, fusion)
+
+    def fuse(semantic, keyword, params):
+        """Fusion côté client (même formule que hybrid_hits_sql)"""
+        weight, k = params['semantic_weight'], params['rrf_k']
+        scores = {}
+        best = max((rank for _, rank in keyword), default=0)
+        for position, (doc_id, similarity) in enumerate(semantic, 1):
+            scores[doc_id] = weight * (1 / (k + position) if fusion == 'rrf' else similarity)
+        for position, (doc_id, rank) in enumerate(keyword, 1):
+            score = 1 / (k + position) if fusion == 'rrf' else (rank / best if best else 0)
+            scores[doc_id] = scores.get(doc_id, 0) + (1 - weight) * score
+        return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_k]
+
+    print("="*70)
+    print(f"🔀 BENCHMARK: HYBRIDE 2 REQUÊTES vs 1 REQUÊTE ({n_queries} requêtes, top_k={top_k}, {fusion})")
+    print("="*70)
+
+    pool = ConnectionPool(minconn=2, maxconn=2)
+    executor = ThreadPoolExecutor(max_workers=2)
+    try:
+        with pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT d.question, e.embedding::text
+                FROM {table} e JOIN {Config.DOCUMENTS_TABLE} d ON d.id = e.doc_id
+                ORDER BY random() LIMIT %s;
+            """, (n_queries,))
+            queries = [hybrid_hits_params([], text, top_k) | {'query': vector}
+                       for text, vector in cursor.fetchall()]
+            cursor.close()
+
+        def fetch(sql, params):
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+                cursor.close()
+            return rows
+
+        def run_sequential():
+            latencies, results = [], []
+            for params in queries:
+                start = time.time()
+                results.append(fuse(fetch(semantic_sql, params), fetch(keyword_sql, params), params))
+                latencies.append(time.time() - start)
+            return latencies, results
+
+        def run_concurrent():
+            latencies, results = [], []
+            for params in queries:
+                start = time.time()
+                semantic = executor.submit(fetch, semantic_sql, params)
+                keyword = executor.submit(fetch, keyword_sql, params)
+                results.append(fuse(semantic.result(), keyword.result(), params))
+                latencies.append(time.time() - start)
+            return latencies, results
+
+        def run_single():
+            latencies, results = [], []
+            for params in queries:
+                start = time.time()
+                rows = fetch(hybrid_sql, params)
+                results.append([(row[0], row[1]) for row in rows])
+                latencies.append(time.time() - start)
+            return latencies, results
+
+        run_single()  # échauffement
+        sequential, reference = run_sequential()
+        concurrent, _ = run_concurrent()
+        single, fused = run_single()
+
+        print_latency_stats("2 requêtes (séquentiel)", sequential)
+        print_latency_stats("2 requêtes (2 connexions)", concurrent)
+        print_latency_stats("1 requête (CTE)", single)
+        same = sum(
+            [doc_id for doc_id, _ in expected] == [doc_id for doc_id, _ in got]
+            for expected, got in zip(reference, fused)
+        )
+        print(f"\n🎯 Même classement que la fusion Python: {same}/{len(queries)}")
+    finally:
+        executor.shutdown()
+        pool.close()
+
+
+def benchmark_similarity(n_queries=50, top_k=5, min_similarity=0.0):
+    """
+    Chemin sémantique du moteur: ancienne requête (<#>, vecteur lié 3 fois,
+    seuil dans le WHERE) vs semantic_hits_sql (<=>, vecteur lié 1 fois)
+
+    Vérifie par EXPLAIN que seule la nouvelle requête passe par l'index
+    vectoriel, puis que SemanticSearchEngine.semantic_search renvoie les
+    mêmes documents et les mêmes scores que app.semantic_search.
+
+    Args:
+        n_queries: Nombre de requêtes (questions du corpus)
+        top_k: Nombre de résultats par requête
+        min_similarity: Seuil de similarité
+    """
+    from config import Model1Config
+    from src.model_registry import get_model_registry
+    from src.search_engine import SemanticSearchEngine, semantic_hits_params, semantic_hits_sql
+    from src.vector_index import index_name_for
+    import app
+
+    table = Model1Config.TABLE_NAME
+    old_sql = f"""
+        SELECT doc_id, 1 - (embedding <#> %(query)s::vector) as similarity
+        FROM {table}
+        WHERE (1 - (embedding <#> %(query)s::vector)) >= %(min_similarity)s
+        ORDER BY embedding <#> %(query)s::vector
+        LIMIT %(top_k)s
+    """
+    new_sql = semantic_hits_sql(table)
+
+    print("="*70)
+    print(f"📐 BENCHMARK: CHEMIN SÉMANTIQUE <#> vs <=> ({n_queries} requêtes, top_k={top_k})")
+    print("="*70)
+
+    engine = SemanticSearchEngine(model_config=Model1Config)
+    try:
+        with engine.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT embedding::text FROM {table} ORDER BY random() LIMIT %s;", (n_queries,))
+            vectors = [row[0] for row in cursor.fetchall()]
+
+            print(f"\n🔎 Index {index_name_for(table)} utilisé:")
+            params = semantic_hits_params([], top_k, min_similarity) | {'query': vectors[0]}
+            for label, sql in (("<#> (ancienne requête)", old_sql), ("<=> (semantic_hits_sql)", new_sql)):
+                cursor.execute(f"EXPLAIN {sql}", params)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                print(f"   {label:<28} {'✅' if index_name_for(table) in plan else '❌ (parcours séquentiel)'}")
+
+            for label, sql in (("<#> (ancienne requête)", old_sql), ("<=> (semantic_hits_sql)", new_sql)):
+                latencies = []
+                for vector in vectors:
+                    start = time.time()
+                    cursor.execute(sql, semantic_hits_params([], top_k, min_similarity) | {'query': vector})
+                    cursor.fetchall()
+                    latencies.append(time.time() - start)
+                print_latency_stats(label, latencies)
+            cursor.close()
+
+        # Mêmes scores que l'application (mêmes requêtes textuelles, même modèle)
+        model = get_model_registry().get(Model1Config)
+        same = 0
+        queries = load_benchmark_queries(n_queries)
+        for query in queries:
+            results, _ = engine.semantic_search(query, top_k=top_k)
+            expected, _ = app.semantic_search(query, model, Model1Config, top_k=top_k)
+            same += (
+                [result['id'] for result in results] == [row[0] for row in expected]
+                and np.allclose([result['similarity'] for result in results],
+                                [row[5] for row in expected], atol=1e-6)
+            )
+        print(f"\n🎯 Mêmes documents et scores que app.semantic_search: {same}/{len(queries)}")
+    finally:
+        engine.close()
+
+
+def benchmark_quantized(n_queries=200, top_k=10, candidates=None, model_name='pubmed'):
+    """
+    Recall@k et latence: index ANN de la table VECTOR vs index halfvec / bit
+    de la table quantifiée avec rerank float32 (src/quantized_index.py)
+
+    Référence = top_k exacts (parcours séquentiel, index désactivés).
+    Requêtes = questions du corpus encodées par le modèle.
+
+    Args:
+        n_queries: Nombre de requêtes
+        top_k: k du recall@k
+        candidates: Candidats relus en float32 (défaut: Config.QUANTIZED_RERANK_CANDIDATES)
+        model_name: 'minilm' ou 'pubmed'
+    """
+    from src.db_pool import ConnectionPool
+    from src.model_registry import get_model_registry
+    from src.quantized_index import (
+        MODELS, QUANTIZATIONS, QUANTIZED_COLUMNS, quantized_hits_params, quantized_hits_sql,
+        quantized_index_for, quantized_table_for, relation_sizes, storage_configurations
+    )
+    from src.search_engine import semantic_hits_params, semantic_hits_sql
+    from src.vector_index import apply_search_params, index_name_for, shortlist_search_params
+
+    model_config = MODELS[model_name]
+    queries = load_benchmark_queries(n_queries)
+    embeddings = get_model_registry().get(model_config).encode(
+        queries, batch_size=Config.EMBEDDING_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True
+    )
+    candidates = candidates or Config.QUANTIZED_RERANK_CANDIDATES
+    # (libellé, requête, paramètres, index de la liste courte): l'index quantifié doit renvoyer tous les candidats
+    scenarios = [("vector (ANN)", semantic_hits_sql(model_config.TABLE_NAME), semantic_hits_params, None)] + [
+        (f"{quantization} + rerank", quantized_hits_sql(model_config, quantization),
+         lambda embedding, k: quantized_hits_params(embedding, k, candidates=candidates),
+         quantized_index_for(model_config, quantization))
+        for quantization in QUANTIZATIONS
+    ]
+
+    print("="*70)
+    print(f"🗜️  BENCHMARK: VECTOR vs QUANTIFIÉ + RERANK ({model_config.NAME}, {len(queries)} requêtes, "
+          f"recall@{top_k}, {candidates} candidats)")
+    print("="*70)
+
+    pool = ConnectionPool(minconn=1, maxconn=1)
+    try:
+        with pool.connection() as conn:
+            if quantized_table_for(model_config) not in relation_sizes(conn, [quantized_table_for(model_config)]):
+                print(f"❌ Table absente: python src/quantized_index.py --models {model_name}")
+                return
+            cursor = conn.cursor()
+
+            # Référence exacte: parcours séquentiel
+            cursor.execute("SET LOCAL enable_indexscan = off;")
+            exact_sql = semantic_hits_sql(model_config.TABLE_NAME)
+            exact = []
+            for embedding in embeddings:
+                cursor.execute(exact_sql, semantic_hits_params(embedding, top_k))
+                exact.append({row[0] for row in cursor.fetchall()})
+            conn.rollback()
+
+            print(f"\n{'':<4}{'Chemin':<24} {'recall@' + str(top_k):>9}")
+            for label, sql, params_for, shortlist_index in scenarios:
+                if shortlist_index is None:
+                    apply_search_params(cursor)
+                else:
+                    apply_search_params(cursor, **shortlist_search_params(cursor, shortlist_index, candidates))
+                latencies, found = [], 0
+                for embedding, expected in zip(embeddings, exact):
+                    start = time.time()
+                    cursor.execute(sql, params_for(embedding, top_k))
+                    rows = cursor.fetchall()
+                    latencies.append(time.time() - start)
+                    found += len(expected & {row[0] for row in rows})
+                conn.rollback()
+                print(f"    {label:<24} {found / max(sum(map(len, exact)), 1):>9.3f}")
+                print_latency_stats(label, latencies)
+
+            cursor.close()
+            table_name = quantized_table_for(model_config)
+            relations = [model_config.TABLE_NAME, index_name_for(model_config.TABLE_NAME), table_name]
+            relations += [index_name_for(table_name, column) for column in QUANTIZED_COLUMNS.values()]
+            sizes = relation_sizes(conn, relations)
+        print("\n💾 Tailles:")
+        for name, size in sizes.items():
+            print(f"   {name:<52} {size / 1024 / 1024:8.1f} Mo")
+        for name, size in storage_configurations(sizes, model_config).items():
+            print(f"   Total {name:<46} {size / 1024 / 1024:8.1f} Mo")
+    finally:
+        pool.close()
+
+
+def benchmark_artifact(repeats=3):
+    """
+    Chargement des entrées de chaque étape: CSV + .npy vs artefact Arrow mappé
+
+    Trois accès mesurés: textes à encoder (génération), documents +
+    embeddings des 2 modèles (insertion), embeddings + métadonnées d'un
+    modèle (backend NumPy). Meilleur temps sur repeats essais.
+    """
+    from config import Model1Config, Model2Config
+    from src.artifacts import has_embeddings, read_columns, read_documents, read_embeddings, read_texts
+
+    csv_path = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    models = (Model1Config, Model2Config)
+    if not os.path.exists(csv_path) or not all(os.path.exists(m.EMBEDDINGS_FILE) for m in models):
+        print("❌ CSV prétraité et .npy des 2 modèles requis")
+        return
+    if not all(has_embeddings(model_config) for model_config in models):
+        print(f"❌ {Config.ARTIFACT_FILE} sans embeddings: python src/artifacts.py build")
+        return
+
+    def best(load):
+        times = []
+        for _ in range(repeats):
+            start = time.time()
+            result = load()
+            times.append(time.time() - start)
+        return min(times), result
+
+    scenarios = [
+        ("Textes (génération)",
+         lambda: pd.read_csv(csv_path, usecols=['combined_text'])['combined_text'].tolist(),
+         lambda: read_texts(Config.ARTIFACT_FILE)),
+        ("Documents + 2 modèles (insertion)",
+         lambda: (pd.read_csv(csv_path), [np.load(m.EMBEDDINGS_FILE) for m in models]),
+         lambda: (read_documents(), [read_embeddings(m) for m in models])),
+        ("Backend NumPy (1 modèle)",
+         lambda: (pd.read_csv(csv_path), np.load(Model2Config.EMBEDDINGS_FILE, mmap_mode='r')),
+         lambda: (read_columns(['id', 'question', 'answer', 'category']), read_embeddings(Model2Config))),
+    ]
+
+    print("="*70)
+    print(f"📦 BENCHMARK: CSV + .npy vs ARTEFACT ARROW ({Config.ARTIFACT_FILE})")
+    print("="*70)
+    print(f"\n{'Accès':<36} {'CSV + .npy':>11} {'Arrow':>9} {'gain':>7}")
+    for label, legacy, artifact in scenarios:
+        legacy_time, _ = best(legacy)
+        artifact_time, _ = best(artifact)
+        print(f"{label:<36} {legacy_time * 1000:>9.0f}ms {artifact_time * 1000:>7.0f}ms "
+              f"{legacy_time / max(artifact_time, 1e-9):>6.1f}x")
+
+    # Alignement: mêmes vecteurs aux mêmes lignes que les .npy
+    for model_config in models:
+        same = np.array_equal(read_embeddings(model_config), np.load(model_config.EMBEDDINGS_FILE, mmap_mode='r'))
+        print(f"\n🎯 {model_config.ARTIFACT_COLUMN} identique au .npy: {'✅' if same else '❌'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks du moteur de recherche")
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+
+    batch = subparsers.add_parser('batch', help="Boucle vs semantic_search_many")
+    batch.add_argument('--queries', type=int, default=1000)
+    batch.add_argument('--top-k', type=int, default=Config.TOP_K_RESULTS)
+
+    pool = subparsers.add_parser('pool', help="Recherches concurrentes selon la taille du pool")
+    pool.add_argument('--threads', type=int, default=8)
+    pool.add_argument('--queries', type=int, default=400)
+    pool.add_argument('--sizes', type=int, nargs='+', default=[1, 4, 8])
+
+    keyword = subparsers.add_parser('keyword', help="to_tsvector à la volée vs colonne stockée")
+    keyword.add_argument('--queries', type=int, default=200)
+    keyword.add_argument('--top-k', type=int, default=Config.TOP_K_RESULTS)
+
+    two_phase = subparsers.add_parser('two-phase', help="Texte complet joint vs (id, score) + extraits")
+    two_phase.add_argument('--queries', type=int, default=200)
+    two_phase.add_argument('--top-k', type=int, default=Config.TOP_K_RESULTS)
+
+    startup = subparsers.add_parser('startup', help="Démarrage / RSS selon les modèles chargés")
+    startup.add_argument('--scenario', action='append', choices=sorted(STARTUP_SCENARIOS))
+
+    encoder = subparsers.add_parser('encoder', help="Encodage PyTorch vs ONNX Runtime (fp32 / int8)")
+    encoder.add_argument('--model', choices=['minilm', 'pubmed'], default='pubmed')
+    encoder.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8'],
+                         choices=['torch', 'onnx', 'onnx-int8'])
+    encoder.add_argument('--queries', type=int, default=200)
+    encoder.add_argument('--batch-size', type=int, default=32)
+    encoder.add_argument('--threads', type=int, default=None, help="Threads intra-op ONNX Runtime")
+
+    microbatch = subparsers.add_parser('microbatch', help="Requêtes concurrentes: encode() direct vs micro-lots")
+    microbatch.add_argument('--model', choices=['minilm', 'pubmed'], default='pubmed')
+    microbatch.add_argument('--threads', type=int, default=16)
+    microbatch.add_argument('--queries', type=int, default=400)
+    microbatch.add_argument('--max-wait-ms', type=float, default=None)
+
+    generation = subparsers.add_parser('generation', help="Génération des embeddings selon le nombre de processus")
+    generation.add_argument('--model', choices=['minilm', 'pubmed'], default='minilm')
+    generation.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    generation.add_argument('--docs', type=int, default=2048)
+    generation.add_argument('--threads-per-worker', type=int, default=None)
+    generation.add_argument('--backend', choices=['torch', 'onnx', 'onnx-int8'], default='torch')
+    generation.add_argument('--batch-size', type=int, default=32)
+
+    padding = subparsers.add_parser('padding', help="Génération: lots fixes vs lots triés sous budget de tokens")
+    padding.add_argument('--model', choices=['minilm', 'pubmed'], default='pubmed')
+    padding.add_argument('--docs', type=int, default=2048)
+    padding.add_argument('--batch-size', type=int, default=32)
+    padding.add_argument('--token-budget', type=int, default=None)
+    padding.add_argument('--backend', choices=['torch', 'onnx', 'onnx-int8'], default=None)
+
+    hybrid = subparsers.add_parser('hybrid', help="Hybride: 2 requêtes fusionnées en Python vs 1 requête SQL")
+    hybrid.add_argument('--queries', type=int, default=200)
+    hybrid.add_argument('--top-k', type=int, default=Config.TOP_K_RESULTS)
+    hybrid.add_argument('--fusion', choices=['rrf', 'weighted'], default=None)
+
+    similarity = subparsers.add_parser('similarity', help="Requête sémantique <#> vs <=> (EXPLAIN, scores de l'app)")
+    similarity.add_argument('--queries', type=int, default=50)
+    similarity.add_argument('--top-k', type=int, default=Config.TOP_K_RESULTS)
+    similarity.add_argument('--min-similarity', type=float, default=0.0)
+
+    quantized = subparsers.add_parser('quantized', help="Recall@k / latence: vector vs halfvec / bit + rerank")
+    quantized.add_argument('--queries', type=int, default=200)
+    quantized.add_argument('--top-k', type=int, default=10)
+    quantized.add_argument('--candidates', type=int, default=None)
+    quantized.add_argument('--model', choices=['minilm', 'pubmed'], default='pubmed')
+
+    artifact = subparsers.add_parser('artifact', help="Chargement CSV + .npy vs artefact Arrow mappé")
+    artifact.add_argument('--repeats', type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.benchmark == 'batch':
+        benchmark_batch_search(args.queries, args.top_k)
+    elif args.benchmark == 'pool':
+        benchmark_connection_pool(args.threads, args.queries, tuple(args.sizes))
+    elif args.benchmark == 'keyword':
+        benchmark_keyword_search(args.queries, args.top_k)
+    elif args.benchmark == 'two-phase':
+        benchmark_two_phase(args.queries, args.top_k)
+    elif args.benchmark == 'startup':
+        benchmark_startup(args.scenario)
+    elif args.benchmark == 'encoder':
+        benchmark_encoders(args.model, tuple(args.backends), args.queries,
+                           args.batch_size, args.threads)
+    elif args.benchmark == 'microbatch':
+        benchmark_microbatch(args.model, args.threads, args.queries, args.max_wait_ms)
+    elif args.benchmark == 'generation':
+        benchmark_generation(args.model, tuple(args.workers), args.docs,
+                             args.threads_per_worker, args.backend, args.batch_size)
+    elif args.benchmark == 'padding':
+        benchmark_padding(args.model, args.docs, args.batch_size, args.token_budget, args.backend)
+    elif args.benchmark == 'hybrid':
+        benchmark_hybrid(args.queries, args.top_k, args.fusion)
+    elif args.benchmark == 'similarity':
+        benchmark_similarity(args.queries, args.top_k, args.min_similarity)
+    elif args.benchmark == 'quantized':
+        benchmark_quantized(args.queries, args.top_k, args.candidates, args.model)
+    elif args.benchmark == 'artifact':
+        benchmark_artifact(args.repeats)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+"""
+Recherche sémantique filtrée par catégorie
+
+Avec un index approximatif global, WHERE category = ... est appliqué
+APRÈS le parcours de l'index: pour une catégorie rare, les listes
+sondées (IVFFlat) ou le voisinage exploré (HNSW) ne contiennent presque
+aucune ligne de la catégorie et la requête renvoie moins de top_k
+résultats. Le planificateur choisit donc un chemin selon la taille de
+la catégorie:
+- 'exact': catégorie petite, parcours exact de ses lignes (index btree
+  sur category), complet et rapide
+- 'partial': index ANN partiel construit sur les seules lignes de la
+  catégorie (catégories fréquentes)
+- 'global': index global, sondage élargi en proportion de la
+  sélectivité, puis parcours exact si le résultat est incomplet
+"""
+import argparse
+import math
+import os
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config, Model2Config
+from src.vector_index import (
+    INDEX_METHODS, apply_search_params, build_vector_index, category_index_name, index_name_for
+)
+
+
+MODELS = {'minilm': Model1Config, 'pubmed': Model2Config}
+
+STRATEGIES = ('exact', 'partial', 'global')
+
+# Valeurs par défaut de pgvector (ivfflat.probes, hnsw.ef_search) et plafond de ef_search
+DEFAULT_PROBES = 1
+DEFAULT_EF_SEARCH = 40
+MAX_EF_SEARCH = 1000
+
+
+def _category_rows(table_name: str, strategy: str) -> Tuple[str, str]:
+    """(clause WITH, relation à parcourir) des lignes de la catégorie"""
+    if strategy == 'exact':
+        # CTE MATERIALIZED: le tri porte sur les lignes de la catégorie,
+        # l'index ANN ne peut pas être utilisé
+        return f"""
+            WITH rows AS MATERIALIZED (
+                SELECT doc_id, embedding
+                FROM {table_name}
+                WHERE category = %(category)s
+            )""", "rows"
+    # L'optimiseur choisit l'index: partiel si son prédicat correspond
+    # à la catégorie (valeur insérée littéralement par psycopg2), sinon global
+    return "", f"(SELECT doc_id, embedding FROM {table_name} WHERE category = %(category)s) rows"
+
+
+def nearest_sql(table_name: str, strategy: str) -> str:
+    """
+    (doc_id, distance) des plus proches voisins d'une catégorie
+
+    Paramètres nommés: query, category, top_k
+    """
+    with_clause, source = _category_rows(table_name, strategy)
+    return f"""{with_clause}
+        SELECT doc_id, embedding <=> %(query)s::vector AS distance
+        FROM {source}
+        ORDER BY distance
+        LIMIT %(top_k)s
+    """
+
+
+def nearest_many_sql(table_name: str, strategy: str) -> str:
+    """
+    (query_idx, doc_id, distance) pour un lot de vecteurs (LATERAL join)
+
+    Paramètres nommés: queries (vecteurs au format texte), category, top_k
+    """
+    with_clause, source = _category_rows(table_name, strategy)
+    return f"""{with_clause}
+        SELECT q.query_idx, n.doc_id, n.distance
+        FROM unnest(%(queries)s::text[]) WITH ORDINALITY AS q(vec, query_idx)
+        CROSS JOIN LATERAL (
+            SELECT doc_id, embedding <=> q.vec::vector AS distance
+            FROM {source}
+            ORDER BY distance
+            LIMIT %(top_k)s
+        ) n
+        ORDER BY q.query_idx, n.distance
+    """
+
+
+class CategoryPlanner:
+    """
+    Choix du chemin de recherche filtrée d'une table d'embeddings
+
+    Les statistiques (lignes par catégorie, index global, index partiels)
+    sont lues dans la base puis gardées Config.CATEGORY_PLANNER_TTL secondes.
+    """
+
+    def __init__(self, table_name: str, ttl: Optional[float] = None):
+        self.table_name = table_name
+        self.ttl = Config.CATEGORY_PLANNER_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._loaded_at = None
+        self._counts: Dict[str, int] = {}
+        self._total = 0
+        self._method = None
+        self._lists = None
+        self._partial = set()
+
+    def _load(self, cursor):
+        cursor.execute(f"SELECT category, COUNT(*) FROM {self.table_name} GROUP BY category;")
+        counts = dict(cursor.fetchall())
+
+        # Méthode et nombre de listes de l'index global
+        cursor.execute("""
+            SELECT am.amname, c.reloptions
+            FROM pg_class c JOIN pg_am am ON am.oid = c.relam
+            WHERE c.oid = to_regclass(%s);
+        """, (index_name_for(self.table_name),))
+        row = cursor.fetchone()
+        method, lists = None, None
+        if row is not None:
+            method = row[0]
+            options = dict(option.split('=', 1) for option in row[1] or [])
+            lists = int(options['lists']) if 'lists' in options else None
+
+        names = {category: category_index_name(self.table_name, category) for category in counts if category}
+        cursor.execute(
+            "SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NOT NULL;",
+            (list(names.values()),)
+        )
+        existing = {row[0] for row in cursor.fetchall()}
+
+        self._counts = counts
+        self._total = sum(counts.values())
+        self._method = method
+        self._lists = lists
+        self._partial = {category for category, name in names.items() if name in existing}
+        self._loaded_at = time.time()
+
+    def refresh(self, cursor):
+        with self._lock:
+            self._load(cursor)
+
+    def _ensure_loaded(self, cursor):
+        with self._lock:
+            if self._loaded_at is None or (self.ttl and time.time() - self._loaded_at > self.ttl):
+                self._load(cursor)
+
+    def plan(self, cursor, category: str, top_k: int,
+             probes: Optional[int] = None, ef_search: Optional[int] = None) -> Dict:
+        """
+        Chemin de recherche pour une catégorie
+
+        Returns:
+            {'strategy', 'rows' (lignes de la catégorie), 'probes', 'ef_search'}
+        """
+        self._ensure_loaded(cursor)
+        rows = self._counts.get(category, 0)
+        plan = {'strategy': 'global', 'rows': rows, 'probes': probes, 'ef_search': ef_search}
+
+        if self._method is None or rows <= Config.CATEGORY_EXACT_MAX_ROWS:
+            plan['strategy'] = 'exact'
+        elif category in self._partial:
+            plan['strategy'] = 'partial'
+        else:
+            # Sondage élargi: autant de lignes de la catégorie en moyenne
+            # que sans filtre (1 / sélectivité)
+            boost = self._total / max(rows, 1)
+            if self._method == 'ivfflat':
+                base = probes or Config.IVFFLAT_PROBES or DEFAULT_PROBES
+                plan['probes'] = min(self._lists or base, math.ceil(base * boost))
+            else:
+                base = ef_search or Config.HNSW_EF_SEARCH or DEFAULT_EF_SEARCH
+                plan['ef_search'] = min(MAX_EF_SEARCH, max(base, math.ceil(top_k * boost)))
+        return plan
+
+    def stats(self) -> Dict:
+        return {
+            'table': self.table_name,
+            'rows': self._total,
+            'method': self._method,
+            'lists': self._lists,
+            'categories': dict(sorted(self._counts.items(), key=lambda item: -item[1])),
+            'partial_indexes': sorted(self._partial)
+        }
+
+
+def filtered_nearest(cursor, planner: CategoryPlanner, query_embedding, category: str, top_k: int,
+                     probes: Optional[int] = None, ef_search: Optional[int] = None
+                     ) -> Tuple[List[Tuple[int, float]], Dict]:
+    """
+    Plus proches voisins d'une catégorie: toujours min(top_k, lignes de
+    la catégorie) résultats
+
+    Returns:
+        ([(doc_id, similarity)], plan utilisé; plan['fallback'] si le
+        chemin approximatif a dû être complété par un parcours exact)
+    """
+    plan = planner.plan(cursor, category, top_k, probes, ef_search)
+    params = {'query': np.asarray(query_embedding).tolist(), 'category': category, 'top_k': top_k}
+
+    apply_search_params(cursor, plan['probes'], plan['ef_search'])
+    cursor.execute(nearest_sql(planner.table_name, plan['strategy']), params)
+    rows = cursor.fetchall()
+
+    plan['fallback'] = False
+    if plan['strategy'] != 'exact' and len(rows) < min(top_k, plan['rows']):
+        plan['fallback'] = True
+        cursor.execute(nearest_sql(planner.table_name, 'exact'), params)
+        rows = cursor.fetchall()
+
+    return [(doc_id, 1 - distance) for doc_id, distance in rows], plan
+
+
+def filtered_nearest_many(cursor, planner: CategoryPlanner, query_embeddings, category: str, top_k: int,
+                          probes: Optional[int] = None, ef_search: Optional[int] = None
+                          ) -> Tuple[List[List[Tuple[int, float]]], Dict]:
+    """
+    filtered_nearest pour un lot de vecteurs, en un aller-retour (plus un
+    parcours exact pour chaque requête dont le résultat est incomplet)
+
+    Returns:
+        ([[(doc_id, similarity)] par requête], plan utilisé; plan['fallback']
+        = nombre de requêtes complétées par un parcours exact)
+    """
+    plan = planner.plan(cursor, category, top_k, probes, ef_search)
+    vectors = ['[' + ','.join(map(repr, np.asarray(emb).tolist())) + ']' for emb in query_embeddings]
+    params = {'queries': vectors, 'category': category, 'top_k': top_k}
+
+    apply_search_params(cursor, plan['probes'], plan['ef_search'])
+    cursor.execute(nearest_many_sql(planner.table_name, plan['strategy']), params)
+    hits = [[] for _ in vectors]
+    for query_idx, doc_id, distance in cursor.fetchall():
+        hits[query_idx - 1].append((doc_id, 1 - distance))
+
+    plan['fallback'] = 0
+    if plan['strategy'] != 'exact':
+        expected = min(top_k, plan['rows'])
+        for position, query_hits in enumerate(hits):
+            if len(query_hits) < expected:
+                plan['fallback'] += 1
+                cursor.execute(nearest_sql(planner.table_name, 'exact'),
+                               {'query': vectors[position], 'category': category, 'top_k': top_k})
+                hits[position] = [(doc_id, 1 - distance) for doc_id, distance in cursor.fetchall()]
+    return hits, plan
+
+
+def build_category_indexes(conn, table_name: str, method: str = 'ivfflat',
+                           min_rows: Optional[int] = None) -> List[Dict]:
+    """
+    Index ANN partiels des catégories d'au moins min_rows lignes
+
+    Les index partiels des catégories devenues trop petites sont supprimés
+    (le planificateur les parcourt exactement).
+
+    Returns:
+        Description de chaque index construit
+    """
+    min_rows = Config.CATEGORY_INDEX_MIN_ROWS if min_rows is None else min_rows
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT category, COUNT(*) FROM {table_name} WHERE category IS NOT NULL GROUP BY category;")
+    counts = dict(cursor.fetchall())
+    cursor.execute("""
+        SELECT indexname FROM pg_indexes
+        WHERE tablename = %s AND indexname LIKE %s;
+    """, (table_name, f"idx_{table_name}_cat_%"))
+    existing = {row[0] for row in cursor.fetchall()}
+
+    wanted = {category_index_name(table_name, category): category
+              for category, count in counts.items() if count >= min_rows}
+    for name in existing - set(wanted):
+        cursor.execute(f"DROP INDEX IF EXISTS {name};")
+    conn.commit()
+    cursor.close()
+
+    print(f"\n🗂️  {table_name}: {len(wanted)}/{len(counts)} catégories ≥ {min_rows} lignes")
+    return [build_vector_index(conn, table_name, method, category=category)
+            for category in sorted(wanted.values(), key=lambda category: -counts[category])]
+
+
+def main():
+    from src.insert_dual_models import connect
+
+    parser = argparse.ArgumentParser(description="Index vectoriels par catégorie (recherche filtrée)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Construire les index partiels des catégories fréquentes")
+    build.add_argument('--models', nargs='+', choices=sorted(MODELS), default=sorted(MODELS))
+    build.add_argument('--method', choices=INDEX_METHODS, default=Config.VECTOR_INDEX_METHOD)
+    build.add_argument('--min-rows', type=int, default=Config.CATEGORY_INDEX_MIN_ROWS)
+
+    plan = subparsers.add_parser('plan', help="Afficher le chemin choisi pour chaque catégorie")
+    plan.add_argument('--models', nargs='+', choices=sorted(MODELS), default=sorted(MODELS))
+    plan.add_argument('--top-k', type=int, default=Config.TOP_K_RESULTS)
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        for name in args.models:
+            table_name = MODELS[name].TABLE_NAME
+            if args.command == 'build':
+                build_category_indexes(conn, table_name, args.method, args.min_rows)
+                continue
+
+            cursor = conn.cursor()
+            planner = CategoryPlanner(table_name)
+            planner.refresh(cursor)
+            stats = planner.stats()
+            print(f"\n🗂️  {table_name}: {stats['rows']} lignes, index global "
+                  f"{stats['method'] or 'absent'}" + (f" (lists = {stats['lists']})" if stats['lists'] else ""))
+            print(f"   {'Catégorie':<28} {'lignes':>7} {'chemin':>8} {'probes':>7} {'ef_search':>10}")
+            for category, rows in stats['categories'].items():
+                chosen = planner.plan(cursor, category, args.top_k)
+                print(f"   {str(category):<28} {rows:>7} {chosen['strategy']:>8} "
+                      f"{chosen['probes'] or '-':>7} {chosen['ef_search'] or '-':>10}")
+            conn.rollback()
+            cursor.close()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,19 @@ Compare les 2 modèles côte à côte
 """
 import time
 import numpy as np
-import psycopg2
 from sentence_transformers import SentenceTransformer
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from config import Config, Model1Config, Model2Config
+from src.embedding_cache import encode_query
+from src.db_pool import ConnectionPool
+from src.search_engine import semantic_documents_sql, semantic_hits_params
 
 
 class DualModelComparer:
-    def __init__(self):
+    def __init__(self, pool=None):
         print("🔧 Initialisation...")
         
         # Charger les 2 modèles
@@ -23,62 +25,45 @@ class DualModelComparer:
         print(f"   📦 Modèle 2: {Model2Config.NAME}")
         self.model2 = SentenceTransformer(Model2Config.NAME)
         
-        # Connexion DB
-        self.conn = psycopg2.connect(
-            host=Config.DB_HOST,
-            port=Config.DB_PORT,
-            database=Config.DB_NAME,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD
-        )
+        # Pool de connexions DB
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else ConnectionPool()
         
         print("   ✅ Prêt!\n")
     
     def search_model1(self, query, top_k=5):
         """Recherche avec modèle 1"""
         # Encoder
-        emb = self.model1.encode(query, convert_to_numpy=True)
-        emb = emb / np.linalg.norm(emb)
+        emb = encode_query(self.model1, Model1Config.NAME, query)
         
         # Rechercher
-        cursor = self.conn.cursor()
         start = time.time()
-        
-        cursor.execute(f"""
-            SELECT id, question, category, 
-                   1 - (embedding <=> %s::vector) as similarity
-            FROM {Model1Config.TABLE_NAME}
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s;
-        """, (emb.tolist(), emb.tolist(), top_k))
-        
-        results = cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(semantic_documents_sql(Model1Config.TABLE_NAME, ('id', 'question', 'category')),
+                           semantic_hits_params(emb, top_k))
+
+            results = cursor.fetchall()
+            cursor.close()
         search_time = time.time() - start
-        cursor.close()
         
         return results, search_time
     
     def search_model2(self, query, top_k=5):
         """Recherche avec modèle 2"""
         # Encoder
-        emb = self.model2.encode(query, convert_to_numpy=True)
-        emb = emb / np.linalg.norm(emb)
+        emb = encode_query(self.model2, Model2Config.NAME, query)
         
         # Rechercher
-        cursor = self.conn.cursor()
         start = time.time()
-        
-        cursor.execute(f"""
-            SELECT id, question, category, 
-                   1 - (embedding <=> %s::vector) as similarity
-            FROM {Model2Config.TABLE_NAME}
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s;
-        """, (emb.tolist(), emb.tolist(), top_k))
-        
-        results = cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(semantic_documents_sql(Model2Config.TABLE_NAME, ('id', 'question', 'category')),
+                           semantic_hits_params(emb, top_k))
+
+            results = cursor.fetchall()
+            cursor.close()
         search_time = time.time() - start
-        cursor.close()
         
         return results, search_time
     
@@ -135,7 +120,8 @@ class DualModelComparer:
         print("\n" + "="*80 + "\n")
     
     def close(self):
-        self.conn.close()
+        if self._owns_pool:
+            self.pool.close()
 
 
 def main():
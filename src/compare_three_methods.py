@@ -6,18 +6,21 @@ Comparaison de 3 méthodes de recherche:
 """
 import time
 import numpy as np
-import psycopg2
 from sentence_transformers import SentenceTransformer
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config, Model1Config, Model2Config
+from src.embedding_cache import encode_query
+from src.db_pool import ConnectionPool
+from src.search_engine import semantic_documents_sql, semantic_hits_params
+from src.concurrent_search import ConcurrentComparer
 
 
 class TripleSearchComparer:
     """Compare les 3 méthodes de recherche"""
     
-    def __init__(self):
+    def __init__(self, pool=None):
         print("🔧 Initialisation des 3 moteurs de recherche...")
         
         # Charger les 2 modèles sémantiques
@@ -27,14 +30,12 @@ class TripleSearchComparer:
         print(f"   📦 Modèle 2: {Model2Config.NAME}")
         self.model2 = SentenceTransformer(Model2Config.NAME)
         
-        # Connexion DB
-        self.conn = psycopg2.connect(
-            host=Config.DB_HOST,
-            port=Config.DB_PORT,
-            database=Config.DB_NAME,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD
-        )
+        # Pool de connexions DB
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else ConnectionPool()
+        
+        # Les 3 méthodes sont exécutées en même temps (une connexion chacune)
+        self.comparer = ConcurrentComparer(max_workers=3)
         
         print("   ✅ Les 3 moteurs sont prêts!\n")
     
@@ -43,32 +44,29 @@ class TripleSearchComparer:
         Méthode 1: Recherche classique par mots-clés
         Utilise PostgreSQL Full-Text Search
         """
-        cursor = self.conn.cursor()
-        start = time.time()
-        
         # Full-text search PostgreSQL
-        sql = """
+        sql = f"""
             SELECT 
                 id, 
                 question, 
                 answer,
                 category,
                 qtype,
-                ts_rank(
-                    to_tsvector('english', combined_text), 
-                    plainto_tsquery('english', %s)
-                ) as rank
-            FROM medical_documents_minilm
-            WHERE to_tsvector('english', combined_text) @@ 
-                  plainto_tsquery('english', %s)
+                ts_rank(search_vector, tsquery) as rank
+            FROM {Config.DOCUMENTS_TABLE},
+                 plainto_tsquery('english', %s) tsquery
+            WHERE search_vector @@ tsquery
             ORDER BY rank DESC
             LIMIT %s;
         """
         
-        cursor.execute(sql, (query, query, top_k))
-        results = cursor.fetchall()
+        start = time.time()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (query, top_k))
+            results = cursor.fetchall()
+            cursor.close()
         search_time = time.time() - start
-        cursor.close()
         
         return results, search_time
     
@@ -77,28 +75,16 @@ class TripleSearchComparer:
         Méthode 2: Recherche sémantique MiniLM (général)
         """
         # Encoder avec modèle 1
-        emb = self.model1.encode(query, convert_to_numpy=True)
-        emb = emb / np.linalg.norm(emb)
+        emb = encode_query(self.model1, Model1Config.NAME, query)
         
-        cursor = self.conn.cursor()
         start = time.time()
-        
-        cursor.execute(f"""
-            SELECT 
-                id, 
-                question, 
-                answer,
-                category,
-                qtype,
-                1 - (embedding <=> %s::vector) as similarity
-            FROM {Model1Config.TABLE_NAME}
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s;
-        """, (emb.tolist(), emb.tolist(), top_k))
-        
-        results = cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(semantic_documents_sql(Model1Config.TABLE_NAME), semantic_hits_params(emb, top_k))
+
+            results = cursor.fetchall()
+            cursor.close()
         search_time = time.time() - start
-        cursor.close()
         
         return results, search_time
     
@@ -107,28 +93,16 @@ class TripleSearchComparer:
         Méthode 3: Recherche sémantique PubMedBert (médical)
         """
         # Encoder avec modèle 2
-        emb = self.model2.encode(query, convert_to_numpy=True)
-        emb = emb / np.linalg.norm(emb)
+        emb = encode_query(self.model2, Model2Config.NAME, query)
         
-        cursor = self.conn.cursor()
         start = time.time()
-        
-        cursor.execute(f"""
-            SELECT 
-                id, 
-                question, 
-                answer,
-                category,
-                qtype,
-                1 - (embedding <=> %s::vector) as similarity
-            FROM {Model2Config.TABLE_NAME}
-            ORDER BY embedding <=> %s::vector
-            LIMIT %s;
-        """, (emb.tolist(), emb.tolist(), top_k))
-        
-        results = cursor.fetchall()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(semantic_documents_sql(Model2Config.TABLE_NAME), semantic_hits_params(emb, top_k))
+
+            results = cursor.fetchall()
+            cursor.close()
         search_time = time.time() - start
-        cursor.close()
         
         return results, search_time
     
@@ -141,12 +115,20 @@ class TripleSearchComparer:
         print(f"📝 Requête: '{query}'")
         print("="*90 + "\n")
         
+        # Encodage + requête des 3 méthodes en parallèle
+        outputs, timings = self.comparer.run({
+            'keyword': lambda: self.keyword_search(query, top_k),
+            'semantic1': lambda: self.semantic_search_model1(query, top_k),
+            'semantic2': lambda: self.semantic_search_model2(query, top_k)
+        })
+        (r1, t1), (r2, t2), (r3, t3) = outputs['keyword'], outputs['semantic1'], outputs['semantic2']
+        per_method = timings['per_method']
+        
         # 1. Recherche classique
         print("🔷 MÉTHODE 1: RECHERCHE CLASSIQUE (Mots-clés)")
         print("   📖 PostgreSQL Full-Text Search")
         print("-"*90)
         
-        r1, t1 = self.keyword_search(query, top_k)
         print(f"⏱️  Temps: {t1*1000:.2f}ms")
         print(f"📊 Résultats: {len(r1)}\n")
         
@@ -162,7 +144,6 @@ class TripleSearchComparer:
         print(f"   📦 {Model1Config.NAME}")
         print("-"*90)
         
-        r2, t2 = self.semantic_search_model1(query, top_k)
         print(f"⏱️  Temps: {t2*1000:.2f}ms")
         print(f"📊 Résultats: {len(r2)}\n")
         
@@ -175,7 +156,6 @@ class TripleSearchComparer:
         print(f"   📦 {Model2Config.NAME}")
         print("-"*90)
         
-        r3, t3 = self.semantic_search_model2(query, top_k)
         print(f"⏱️  Temps: {t3*1000:.2f}ms")
         print(f"📊 Résultats: {len(r3)}\n")
         
@@ -191,6 +171,12 @@ class TripleSearchComparer:
         print(f"   Classique:  {t1*1000:6.2f}ms")
         print(f"   Sémantique 1: {t2*1000:6.2f}ms")
         print(f"   Sémantique 2: {t3*1000:6.2f}ms")
+        print(f"\n   Encodage + requête par méthode:")
+        print(f"   Classique:  {per_method['keyword']*1000:6.2f}ms")
+        print(f"   Sémantique 1: {per_method['semantic1']*1000:6.2f}ms")
+        print(f"   Sémantique 2: {per_method['semantic2']*1000:6.2f}ms")
+        print(f"   Comparaison (parallèle): {timings['wall']*1000:6.2f}ms "
+              f"au lieu de {timings['sequential']*1000:6.2f}ms en séquentiel")
         
         if len(r1) > 0:
             ids1 = {r[0] for r in r1}
@@ -222,11 +208,14 @@ class TripleSearchComparer:
         return {
             'keyword': (r1, t1),
             'semantic1': (r2, t2),
-            'semantic2': (r3, t3)
+            'semantic2': (r3, t3),
+            'timings': timings
         }
     
     def close(self):
-        self.conn.close()
+        self.comparer.close()
+        if self._owns_pool:
+            self.pool.close()
 
 
 def main():
@@ -0,0 +1,94 @@
+"""
+Exécution concurrente des méthodes de recherche à comparer
+
+Chaque méthode (encodage + requête) tourne dans son propre thread et
+emprunte sa propre connexion au pool: l'encodage PyTorch et les appels
+psycopg2 relâchent le GIL, la comparaison prend donc à peu près le temps
+de la méthode la plus lente au lieu de la somme des méthodes, tant que
+l'exécuteur a des threads libres: partagé entre plusieurs appelants, les
+méthodes en trop attendent un thread et cette attente compte dans 'wall'.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class ConcurrentComparer:
+    """
+    Lance plusieurs méthodes de recherche en parallèle et mesure
+    la latence de chacune ainsi que la latence "murale" de l'ensemble
+    """
+
+    def __init__(self, max_workers: int = 4):
+        """
+        Args:
+            max_workers: Nombre de méthodes exécutées simultanément, tous
+                appels à run() confondus (au plus une connexion du pool chacune)
+        """
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='compare'
+        )
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @staticmethod
+    def _timed(task: Callable[[], Any]) -> Tuple[Any, float]:
+        start = time.time()
+        result = task()
+        return result, time.time() - start
+
+    def run(
+        self,
+        tasks: Dict[str, Callable[[], Any]],
+        timeout: Optional[float] = None
+    ) -> Tuple[Dict[str, Any], Dict]:
+        """
+        Exécute les méthodes en même temps
+
+        Args:
+            tasks: {nom de la méthode: fonction sans argument}
+            timeout: Attente maximum (s) de l'ensemble des méthodes
+
+        Returns:
+            (résultats par méthode, temps)
+            Les temps contiennent 'per_method' (s, par méthode), 'wall' (s)
+            et 'sequential' (somme des méthodes, ce qu'aurait coûté une boucle)
+
+        Une exception levée par une méthode est propagée après l'attente des autres.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ConcurrentComparer fermé")
+            start = time.time()
+            futures = {
+                name: self._executor.submit(self._timed, task)
+                for name, task in tasks.items()
+            }
+
+        results, per_method = {}, {}
+        errors = []
+        deadline = start + timeout if timeout is not None else None
+        for name, future in futures.items():
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                results[name], per_method[name] = future.result(timeout=remaining)
+            except Exception as e:
+                errors.append(e)
+        wall = time.time() - start
+
+        if errors:
+            raise errors[0]
+
+        return results, {
+            'per_method': per_method,
+            'wall': wall,
+            'sequential': sum(per_method.values())
+        }
+
+    def close(self):
+        """Arrête les threads (les comparaisons en cours se terminent)"""
+        with self._lock:
+            self._closed = True
+        self._executor.shutdown(wait=True)
@@ -5,15 +5,25 @@ Prétraitement des données MedQuAD
 - Préparation pour les embeddings
 """
 
+import argparse
 import pandas as pd
 import re
 import os
 import sys
+import time
+from collections import Counter
 
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config
 
+
+# Motifs compilés une fois (appliqués par pandas à toute une colonne)
+NEWLINES_PATTERN = re.compile(r'\n+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+OUTPUT_COLUMNS = ['id', 'question', 'answer', 'combined_text', 'category', 'source']
+
 def clean_text(text):
     """
     Nettoie un texte médical
@@ -31,10 +41,10 @@ def clean_text(text):
     text = str(text)
     
     # Remplacer les sauts de ligne multiples par un seul espace
-    text = re.sub(r'\n+', ' ', text)
+    text = NEWLINES_PATTERN.sub(' ', text)
     
     # Remplacer les espaces multiples par un seul
-    text = re.sub(r'\s+', ' ', text)
+    text = WHITESPACE_PATTERN.sub(' ', text)
     
     # Enlever les espaces au début et à la fin
     text = text.strip()
@@ -59,7 +69,31 @@ def combine_question_answer(row):
     
     return combined
 
-def preprocess_dataset(input_path, output_path, sample_size=None):
+def clean_series(series):
+    """
+    Version vectorisée de clean_text pour une colonne entière
+    
+    \\s+ couvre aussi les sauts de ligne: une seule passe donne le même
+    résultat que les deux re.sub de clean_text.
+    
+    Args:
+        series (pd.Series): Textes bruts
+        
+    Returns:
+        pd.Series: Textes nettoyés ("" pour les valeurs manquantes)
+    """
+    return series.fillna('').astype(str).str.replace(WHITESPACE_PATTERN, ' ', regex=True).str.strip()
+
+def combine_columns(questions, answers):
+    """
+    Version vectorisée de combine_question_answer (textes déjà nettoyés)
+    
+    Returns:
+        pd.Series: "Question: ... Answer: ..."
+    """
+    return 'Question: ' + questions + ' Answer: ' + answers
+
+def preprocess_dataset(input_path, output_path, sample_size=None, artifact_path=None):
     """
     Prétraite le dataset MedQuAD complet
     
@@ -67,6 +101,7 @@ def preprocess_dataset(input_path, output_path, sample_size=None):
         input_path (str): Chemin du CSV brut
         output_path (str): Chemin du CSV traité
         sample_size (int, optional): Prendre seulement N documents (pour test)
+        artifact_path (str, optional): Écrire aussi l'artefact Arrow (src/artifacts.py)
     
     Returns:
         pd.DataFrame: Dataset prétraité
@@ -105,8 +140,8 @@ def preprocess_dataset(input_path, output_path, sample_size=None):
     
     # 4. Nettoyage des textes
     print("\n3️⃣ Nettoyage des textes...")
-    df['question_clean'] = df['Question'].apply(clean_text)
-    df['answer_clean'] = df['Answer'].apply(clean_text)
+    df['question_clean'] = clean_series(df['Question'])
+    df['answer_clean'] = clean_series(df['Answer'])
     print("   ✅ Textes nettoyés")
     
     # Vérifier la longueur des textes
@@ -125,7 +160,7 @@ def preprocess_dataset(input_path, output_path, sample_size=None):
     
     # 5. Combiner Question + Answer
     print("\n4️⃣ Combinaison Question + Answer...")
-    df['combined_text'] = df.apply(combine_question_answer, axis=1)
+    df['combined_text'] = combine_columns(df['question_clean'], df['answer_clean'])
     df['combined_length'] = df['combined_text'].str.len()
     print("   ✅ Textes combinés")
     print(f"      - Longueur moyenne: {df['combined_length'].mean():.0f} caractères")
@@ -160,6 +195,10 @@ def preprocess_dataset(input_path, output_path, sample_size=None):
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
     df_final.to_csv(output_path, index=False)
     print(f"   ✅ Sauvegardé: {output_path}")
+    if artifact_path:
+        from src.artifacts import write_documents
+        write_documents(df_final, artifact_path)
+        print(f"   ✅ Artefact: {artifact_path}")
     
     # 9. Statistiques finales
     print("\n" + "=" * 60)
@@ -178,26 +217,187 @@ def preprocess_dataset(input_path, output_path, sample_size=None):
     
     return df_final
 
+def preprocess_chunk(chunk, first_id):
+    """
+    Prétraite un bloc du CSV brut (opérations vectorisées uniquement)
+    
+    Args:
+        chunk (pd.DataFrame): Lignes brutes (colonnes Question, Answer, qtype)
+        first_id (int): id du premier document conservé du bloc
+        
+    Returns:
+        pd.DataFrame: Colonnes OUTPUT_COLUMNS
+    """
+    chunk = chunk.dropna(subset=['Question', 'Answer'])
+    question = clean_series(chunk['Question'])
+    answer = clean_series(chunk['Answer'])
+    return pd.DataFrame({
+        'id': range(first_id, first_id + len(chunk)),
+        'question': question.values,
+        'answer': answer.values,
+        'combined_text': combine_columns(question, answer).values,
+        'category': chunk['qtype'].values,
+        'source': 'MedQuAD'
+    })
+
+def preprocess_dataset_chunked(input_path, output_path, chunk_size=50000, csv_output_path=None,
+                               artifact_path=None):
+    """
+    Prétraite un CSV brut de taille quelconque, bloc par bloc
+    
+    Chaque bloc est nettoyé avec des opérations vectorisées puis ajouté
+    au fichier Parquet de sortie (un row group par bloc): la mémoire reste
+    bornée par chunk_size, quelle que soit la taille de l'entrée. Seules
+    des statistiques cumulées sont gardées entre deux blocs.
+    
+    Args:
+        input_path (str): Chemin du CSV brut
+        output_path (str): Chemin du Parquet de sortie
+        chunk_size (int): Lignes lues à la fois
+        csv_output_path (str, optional): Écrire aussi le CSV traité
+        artifact_path (str, optional): Écrire aussi l'artefact Arrow (étapes suivantes)
+    
+    Returns:
+        dict: Lignes lues / conservées, temps, débit (lignes/sec)
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    print("=" * 60)
+    print("🧹 PRÉTRAITEMENT PAR BLOCS")
+    print("=" * 60)
+    print(f"\n📂 {input_path} → {output_path} (blocs de {chunk_size} lignes)")
+    
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('question', pa.string()),
+        ('answer', pa.string()),
+        ('combined_text', pa.string()),
+        ('category', pa.string()),
+        ('source', pa.string())
+    ])
+    
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    tmp_csv_path = f"{csv_output_path}.tmp" if csv_output_path else None
+    
+    rows_read = 0
+    rows_kept = 0
+    length_sums = Counter()
+    length_max = Counter()
+    categories = Counter()
+    start = time.time()
+    
+    writer = pq.ParquetWriter(tmp_path, schema)
+    artifact = None
+    if artifact_path:
+        from src.artifacts import DocumentWriter
+        artifact = DocumentWriter(artifact_path)
+    try:
+        for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+            first_chunk = rows_read == 0
+            rows_read += len(chunk)
+            processed = preprocess_chunk(chunk, rows_kept)
+            rows_kept += len(processed)
+            
+            writer.write_table(pa.Table.from_pandas(processed, schema=schema, preserve_index=False))
+            if artifact is not None:
+                artifact.write(processed)
+            if tmp_csv_path:
+                processed.to_csv(tmp_csv_path, mode='w' if first_chunk else 'a',
+                                 header=first_chunk, index=False)
+            
+            for column in ('question', 'answer', 'combined_text'):
+                lengths = processed[column].str.len()
+                length_sums[column] += int(lengths.sum())
+                length_max[column] = max(length_max[column], int(lengths.max()) if len(lengths) else 0)
+            categories.update(processed['category'].fillna('Unknown').tolist())
+            
+            elapsed = time.time() - start
+            print(f"   ⏳ {rows_read} lignes lues, {rows_kept} conservées "
+                  f"({rows_read / elapsed:.0f} lignes/sec)")
+    except Exception:
+        # Rien n'est publié: les fichiers temporaires partiels sont supprimés
+        writer.close()
+        if artifact is not None:
+            artifact.abort()
+        for path in (tmp_path, tmp_csv_path):
+            if path and os.path.exists(path):
+                os.remove(path)
+        raise
+    writer.close()
+    
+    # Publication une fois tous les blocs écrits
+    os.replace(tmp_path, output_path)
+    if tmp_csv_path:
+        os.replace(tmp_csv_path, csv_output_path)
+    if artifact is not None:
+        artifact.close()
+    elapsed = time.time() - start
+    
+    print("\n" + "=" * 60)
+    print("✅ PRÉTRAITEMENT TERMINÉ!")
+    print("=" * 60)
+    print(f"\n📊 Résumé:")
+    print(f"   - Documents originaux: {rows_read}")
+    print(f"   - Documents après nettoyage: {rows_kept} ({rows_read - rows_kept} supprimés)")
+    for column in ('question', 'answer', 'combined_text'):
+        print(f"   - Longueur {column}: moyenne {length_sums[column] / max(rows_kept, 1):.0f}, "
+              f"max {length_max[column]} caractères")
+    print(f"   - Catégories uniques: {len(categories)}")
+    extra = [path for path in (csv_output_path, artifact_path) if path]
+    print(f"   - Fichier de sortie: {output_path}" + (f" (+ {', '.join(extra)})" if extra else ""))
+    print(f"   ⚡ {elapsed:.1f}s, {rows_read / elapsed:.0f} lignes/sec")
+    
+    print(f"\n📈 Distribution par catégorie:")
+    for category, count in categories.most_common(10):
+        print(f"   {category}: {count}")
+    
+    return {
+        'rows_read': rows_read,
+        'rows_kept': rows_kept,
+        'seconds': elapsed,
+        'rows_per_sec': rows_read / elapsed
+    }
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prétraitement du dataset MedQuAD")
+    parser.add_argument('--mode', choices=['memory', 'chunked'], default='memory',
+                        help="memory: tout en RAM (CSV), chunked: par blocs vectorisés (Parquet + CSV)")
+    parser.add_argument('--input', default=os.path.join(Config.RAW_DATA_DIR, 'medquad_raw.csv'))
+    parser.add_argument('--sample', type=int, default=None,
+                        help="memory: prendre seulement N documents (test rapide)")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="chunked: lignes lues à la fois")
+    parser.add_argument('--no-csv', action='store_true',
+                        help="chunked: ne pas écrire le CSV")
+    parser.add_argument('--no-artifact', action='store_true',
+                        help=f"Ne pas écrire l'artefact Arrow ({Config.ARTIFACT_FILE})")
+    args = parser.parse_args()
+    if args.mode == 'chunked' and args.sample:
+        # L'échantillon aléatoire suppose tout le dataset en mémoire
+        parser.error("--sample n'est disponible qu'avec --mode memory")
+    
     # Chemins
-    input_csv = os.path.join(Config.RAW_DATA_DIR, 'medquad_raw.csv')
+    input_csv = args.input
     output_csv = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    output_parquet = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.parquet')
     
     print(f"\n📂 Chemins:")
     print(f"   Input:  {input_csv}")
-    print(f"   Output: {output_csv}")
-    
-    # Pour TEST RAPIDE: utilise sample_size=1000
-    # Pour PRODUCTION: sample_size=None (tous les documents)
-    
-    # CHOISIS TON MODE:
-    MODE = "PRODUCTION"  # ou "PRODUCTION"
-    
-    if MODE == "TEST":
-        print("\n⚡ MODE TEST: 1000 documents seulement")
-        df = preprocess_dataset(input_csv, output_csv, sample_size=1000)
+    print(f"   Output: {output_parquet if args.mode == 'chunked' else output_csv}")
+    artifact_path = None if args.no_artifact else Config.ARTIFACT_FILE
+    if artifact_path:
+        print(f"   Artefact: {artifact_path}")
+    
+    if args.mode == 'chunked':
+        print("\n🏭 MODE PAR BLOCS: mémoire bornée, sortie Parquet")
+        preprocess_dataset_chunked(input_csv, output_parquet, args.chunk_size,
+                                   None if args.no_csv else output_csv, artifact_path)
+    elif args.sample:
+        print(f"\n⚡ MODE TEST: {args.sample} documents seulement")
+        df = preprocess_dataset(input_csv, output_csv, sample_size=args.sample, artifact_path=artifact_path)
     else:
         print("\n🏭 MODE PRODUCTION: Tous les documents")
-        df = preprocess_dataset(input_csv, output_csv, sample_size=None)
+        df = preprocess_dataset(input_csv, output_csv, sample_size=None, artifact_path=artifact_path)
     
     print("\n✨ Fichier prêt pour l'étape suivante: Génération d'embeddings")
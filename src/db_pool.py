@@ -0,0 +1,160 @@
+"""
+Pool de connexions PostgreSQL partagé par l'application et les moteurs de recherche
+"""
+import os
+import sys
+import threading
+import time
+import psycopg2
+from contextlib import contextmanager
+from psycopg2 import pool as pg_pool
+from typing import Dict, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+def default_connection_params() -> Dict:
+    """Paramètres de connexion issus de Config (.env)"""
+    return {
+        'host': Config.DB_HOST,
+        'port': Config.DB_PORT,
+        'dbname': Config.DB_NAME,
+        'user': Config.DB_USER,
+        'password': Config.DB_PASSWORD
+    }
+
+
+class ConnectionPool:
+    """
+    Pool thread-safe de connexions psycopg2
+
+    - bloque (au lieu d'échouer) quand toutes les connexions sont empruntées
+    - vérifie les connexions restées inactives avant de les prêter
+    - jette les connexions cassées: la suivante est recréée automatiquement
+    """
+
+    def __init__(
+        self,
+        minconn: Optional[int] = None,
+        maxconn: Optional[int] = None,
+        healthcheck_interval: Optional[float] = None,
+        timeout: Optional[float] = 30,
+        **connect_kwargs
+    ):
+        """
+        Args:
+            minconn: Connexions ouvertes en permanence (défaut: Config.DB_POOL_MIN)
+            maxconn: Connexions maximum (défaut: Config.DB_POOL_MAX)
+            healthcheck_interval: Inactivité (s) au-delà de laquelle on teste la connexion
+            timeout: Attente maximum (s) d'une connexion libre (None = illimitée)
+            **connect_kwargs: Paramètres psycopg2.connect (défaut: Config)
+        """
+        self.minconn = minconn if minconn is not None else Config.DB_POOL_MIN
+        self.maxconn = maxconn if maxconn is not None else Config.DB_POOL_MAX
+        self.healthcheck_interval = (
+            healthcheck_interval if healthcheck_interval is not None
+            else Config.DB_POOL_HEALTHCHECK_INTERVAL
+        )
+        self.timeout = timeout
+        self.connect_kwargs = connect_kwargs or default_connection_params()
+
+        self._pool = pg_pool.ThreadedConnectionPool(
+            self.minconn, self.maxconn, **self.connect_kwargs
+        )
+        # ThreadedConnectionPool lève PoolError quand il est épuisé: on fait attendre
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._last_used: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def _is_healthy(self, conn) -> bool:
+        """Vérifie une connexion (SELECT 1 seulement si elle est restée inactive)"""
+        if conn.closed:
+            return False
+        with self._lock:
+            last_used = self._last_used.get(id(conn), 0.0)
+        if time.time() - last_used < self.healthcheck_interval:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1;")
+            cursor.close()
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def _discard(self, conn):
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+        self._pool.putconn(conn, close=True)
+
+    def getconn(self):
+        """Emprunte une connexion saine (à rendre avec putconn)"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise pg_pool.PoolError(
+                f"Aucune connexion libre après {self.timeout}s (max={self.maxconn})"
+            )
+        try:
+            # Reconnexion transparente: les connexions cassées sont remplacées.
+            # Après un redémarrage du serveur, toutes les connexions du pool
+            # sont mortes: au-delà de maxconn essais, le pool en ouvre de neuves.
+            for _ in range(self.maxconn + 1):
+                conn = self._pool.getconn()
+                if self._is_healthy(conn):
+                    return conn
+                self._discard(conn)
+            raise psycopg2.OperationalError(
+                f"Aucune connexion saine après {self.maxconn + 1} essais"
+            )
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn, close: bool = False):
+        """Rend une connexion au pool (annule toute transaction en cours)"""
+        try:
+            if close or conn.closed:
+                self._discard(conn)
+            else:
+                with self._lock:
+                    self._last_used[id(conn)] = time.time()
+                self._pool.putconn(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """
+        Emprunte une connexion le temps d'un bloc `with`
+
+        Exemple:
+            with pool.connection() as conn:
+                cursor = conn.cursor()
+        """
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    def close(self):
+        """Ferme toutes les connexions du pool"""
+        self._pool.closeall()
+
+
+_default_pool: Optional[ConnectionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """Pool partagé par le processus (paramètres Config)"""
+    global _default_pool
+    if _default_pool is None:
+        with _default_pool_lock:
+            if _default_pool is None:
+                _default_pool = ConnectionPool()
+    return _default_pool
@@ -0,0 +1,185 @@
+"""
+Hydratation des résultats de recherche en deux temps
+
+1. la recherche vectorielle ne retourne que (id, score)
+2. les champs d'affichage (question, extrait de réponse, catégorie...)
+   sont lus en une seule requête `WHERE id = ANY(...)`, ou depuis un
+   cache local des documents déjà vus
+
+La réponse complète n'est chargée que sur demande (get_answer).
+
+Chaque entrée du cache garde le content_hash du document: la lecture
+par ids renvoie les hashs courants et ne relit le texte que des
+documents absents ou modifiés (mise à jour incrémentale pendant que
+l'application tourne).
+"""
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from src.db_pool import ConnectionPool, get_pool
+
+
+class DocumentStore:
+    """
+    Lecture des champs d'affichage par identifiant, avec cache LRU
+
+    Les lignes hydratées ont la forme
+    (id, question, extrait, category, qtype, score, tronqué)
+    où `tronqué` indique que la réponse complète est plus longue que l'extrait.
+    """
+
+    def __init__(self, pool: Optional[ConnectionPool] = None, max_entries: Optional[int] = None):
+        """
+        Args:
+            pool: Pool de connexions (défaut: pool partagé du processus)
+            max_entries: Nombre de documents gardés en cache (défaut: Config.DOCUMENT_CACHE_SIZE)
+        """
+        self.pool = pool if pool is not None else get_pool()
+        self.max_entries = max_entries if max_entries is not None else Config.DOCUMENT_CACHE_SIZE
+
+        # {id: (content_hash, valeur)}
+        self._documents: "OrderedDict[int, Tuple[str, Tuple]]" = OrderedDict()
+        self._answers: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, cache: OrderedDict, key: int, value):
+        """Ajoute une entrée et évince les plus anciennes (lock tenu)"""
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    def _fetch_documents(self, doc_ids: List[int], known: Dict[int, str]) -> Dict[int, Tuple]:
+        """
+        Hash courant de chaque document, et champs d'affichage de ceux dont
+        le hash diffère de celui du cache (une requête)
+
+        Returns:
+            {id: (content_hash, champs ou None si le cache est à jour)}
+        """
+        # octet_length ne décompresse pas la réponse (taille lue dans l'en-tête TOAST)
+        sql = f"""
+            SELECT d.id, d.content_hash, k.id IS NOT NULL AS fresh,
+                   d.question, d.answer_preview, d.category, d.qtype,
+                   octet_length(d.answer) > octet_length(d.answer_preview) as truncated
+            FROM {Config.DOCUMENTS_TABLE} d
+            LEFT JOIN unnest(%s::int[], %s::text[]) AS k(id, content_hash)
+                ON k.id = d.id AND k.content_hash = d.content_hash
+            WHERE d.id = ANY(%s);
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, (list(known), list(known.values()), list(doc_ids)))
+            rows = cursor.fetchall()
+            cursor.close()
+        return {row[0]: (row[1], None if row[2] else row[3:]) for row in rows}
+
+    def get_documents(self, doc_ids: Iterable[int]) -> Dict[int, Tuple]:
+        """
+        Champs d'affichage par identifiant
+
+        Les hashs sont vérifiés à chaque appel; seuls les documents absents
+        du cache ou modifiés depuis sont relus.
+
+        Returns:
+            {id: (question, extrait, category, qtype, tronqué)}
+            (les identifiants inconnus sont absents)
+        """
+        doc_ids = list(doc_ids)
+        if not doc_ids:
+            return {}
+        with self._lock:
+            cached = {doc_id: self._documents[doc_id] for doc_id in doc_ids if doc_id in self._documents}
+
+        fetched = self._fetch_documents(doc_ids, {doc_id: entry[0] for doc_id, entry in cached.items()})
+        found = {}
+        with self._lock:
+            for doc_id in doc_ids:
+                if doc_id not in fetched:
+                    # Supprimé: ne plus le servir depuis le cache
+                    self._documents.pop(doc_id, None)
+                    self._answers.pop(doc_id, None)
+                    continue
+                content_hash, document = fetched[doc_id]
+                if document is None:
+                    # Hash inchangé: la copie lue avant la requête est à jour
+                    if doc_id in self._documents:
+                        self._documents.move_to_end(doc_id)
+                    found[doc_id] = cached[doc_id][1]
+                    self.hits += 1
+                    continue
+                self._remember(self._documents, doc_id, (content_hash, document))
+                found[doc_id] = document
+                self.misses += 1
+        return found
+
+    def hydrate(self, hits: Sequence[Tuple[int, float]]) -> List[Tuple]:
+        """
+        Complète des résultats (id, score) avec les champs d'affichage
+
+        Args:
+            hits: Résultats de la phase 1, dans l'ordre du classement
+
+        Returns:
+            Liste de (id, question, extrait, category, qtype, score, tronqué)
+        """
+        documents = self.get_documents(doc_id for doc_id, _ in hits)
+        rows = []
+        for doc_id, score in hits:
+            document = documents.get(doc_id)
+            if document is None:
+                continue  # supprimé entre les deux phases
+            question, preview, category, qtype, truncated = document
+            rows.append((doc_id, question, preview, category, qtype, float(score), truncated))
+        return rows
+
+    def get_answer(self, doc_id: int) -> Optional[str]:
+        """Réponse complète d'un document (chargée à la demande, puis en cache tant que son hash ne change pas)"""
+        with self._lock:
+            cached = self._answers.get(doc_id)
+
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT content_hash, CASE WHEN content_hash = %s THEN NULL ELSE answer END
+                FROM {Config.DOCUMENTS_TABLE}
+                WHERE id = %s;
+            """, (cached[0] if cached else None, doc_id))
+            row = cursor.fetchone()
+            cursor.close()
+        if row is None:
+            with self._lock:
+                self._answers.pop(doc_id, None)
+            return None
+
+        content_hash, answer = row
+        with self._lock:
+            if answer is None:
+                if doc_id in self._answers:
+                    self._answers.move_to_end(doc_id)
+                return cached[1]
+            self._remember(self._answers, doc_id, (content_hash, answer))
+        return answer
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs du cache de documents"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'documents': len(self._documents),
+                'answers': len(self._answers)
+            }
+
+    def clear(self):
+        """Vide le cache (après un rechargement de la table par exemple)"""
+        with self._lock:
+            self._documents.clear()
+            self._answers.clear()
@@ -0,0 +1,241 @@
+"""
+Cache LRU des embeddings de requêtes
+Partagé par toutes les fonctions de recherche: une requête déjà vue
+ne repasse pas par le modèle SentenceTransformer
+"""
+import hashlib
+import os
+import sys
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+class EmbeddingCache:
+    """
+    Cache LRU (borné en mémoire) avec TTL et tier disque optionnel
+
+    Clé = (nom du modèle, texte normalisé). Les embeddings stockés sont
+    normalisés L2, comme ceux utilisés par toutes les recherches.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: Optional[float] = 3600,
+        disk_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            max_bytes: Taille maximale du cache mémoire (octets)
+            ttl: Durée de vie d'une entrée en secondes (None ou 0 = illimitée)
+            disk_dir: Dossier du tier disque (None = désactivé)
+        """
+        self.max_bytes = max_bytes
+        self.ttl = ttl or None
+        self.disk_dir = disk_dir
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, float]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        Clé de cache d'une requête (espaces et casse normalisés)
+
+        Seule la clé est normalisée: le modèle encode le texte d'origine.
+        Les deux modèles configurés utilisent des tokenizers "uncased",
+        les variantes de casse d'une requête ont donc le même embedding.
+        """
+        return ' '.join(str(query).split()).lower()
+
+    @staticmethod
+    def _entry_size(key: Tuple[str, str], embedding: np.ndarray) -> int:
+        return embedding.nbytes + len(key[0]) + len(key[1])
+
+    def _disk_path(self, key: Tuple[str, str]) -> str:
+        digest = hashlib.sha1(f"{key[0]}\x00{key[1]}".encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.npy")
+
+    def _is_expired(self, stored_at: float) -> bool:
+        return self.ttl is not None and time.time() - stored_at > self.ttl
+
+    def _store(self, key: Tuple[str, str], embedding: np.ndarray, stored_at: float):
+        """Insère une entrée en mémoire et évince les plus anciennes (lock tenu)"""
+        if key in self._entries:
+            self._size -= self._entry_size(key, self._entries.pop(key)[0])
+        self._entries[key] = (embedding, stored_at)
+        self._size += self._entry_size(key, embedding)
+
+        while self._size > self.max_bytes and len(self._entries) > 1:
+            old_key, (old_embedding, _) = self._entries.popitem(last=False)
+            self._size -= self._entry_size(old_key, old_embedding)
+            self.evictions += 1
+
+    def _load_from_disk(self, key: Tuple[str, str]) -> Optional[np.ndarray]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if self._is_expired(os.path.getmtime(path)):
+                os.remove(path)
+                return None
+            return np.load(path)
+        except (OSError, ValueError):
+            return None
+
+    def _save_to_disk(self, key: Tuple[str, str], embedding: np.ndarray):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                np.save(f, embedding)
+            os.replace(tmp_path, path)
+        except OSError:
+            pass
+
+    def get(self, model_name: str, query: str) -> Optional[np.ndarray]:
+        """Retourne l'embedding en cache (ou None) et met à jour les compteurs"""
+        key = (model_name, self.normalize_query(query))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                embedding, stored_at = entry
+                if not self._is_expired(stored_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return embedding
+                self._size -= self._entry_size(key, embedding)
+                del self._entries[key]
+
+        embedding = self._load_from_disk(key)
+        with self._lock:
+            if embedding is not None:
+                embedding.setflags(write=False)
+                self._store(key, embedding, time.time())
+                self.hits += 1
+                self.disk_hits += 1
+                return embedding
+            self.misses += 1
+        return None
+
+    def put(self, model_name: str, query: str, embedding: np.ndarray) -> np.ndarray:
+        """Ajoute un embedding (normalisé) au cache et le retourne en lecture seule"""
+        key = (model_name, self.normalize_query(query))
+        embedding = np.array(embedding, dtype=np.float32)
+        embedding.setflags(write=False)
+
+        with self._lock:
+            self._store(key, embedding, time.time())
+        self._save_to_disk(key, embedding)
+        return embedding
+
+    @staticmethod
+    def _cache_name(model, model_name: str) -> str:
+        """Clé du modèle: un encodeur ONNX / int8 ne partage pas les entrées du chemin PyTorch"""
+        return model_name + getattr(model, 'cache_suffix', '')
+
+    def encode(self, model, model_name: str, query: str) -> np.ndarray:
+        """
+        Encode une requête en passant par le cache
+
+        Args:
+            model: Objet exposant encode() (SentenceTransformer)
+            model_name: Nom du modèle (clé du cache)
+            query: Texte de la requête
+
+        Returns:
+            Vecteur numpy normalisé (lecture seule)
+        """
+        model_name = self._cache_name(model, model_name)
+        embedding = self.get(model_name, query)
+        if embedding is not None:
+            return embedding
+
+        embedding = model.encode(str(query), convert_to_numpy=True)
+        embedding = embedding / np.linalg.norm(embedding)
+        return self.put(model_name, query, embedding)
+
+    def encode_many(self, model, model_name: str, queries: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Encode une liste de requêtes: seules les requêtes absentes du cache
+        sont encodées, en un seul appel à model.encode
+
+        Returns:
+            Matrice (len(queries), dimensions) de vecteurs normalisés
+        """
+        model_name = self._cache_name(model, model_name)
+        cached = [self.get(model_name, q) for q in queries]
+        missing = [i for i, emb in enumerate(cached) if emb is None]
+
+        if missing:
+            # Dédupliquer par clé avant l'encodage (premier texte d'origine de chaque clé)
+            texts = {}
+            for i in missing:
+                texts.setdefault(self.normalize_query(queries[i]), str(queries[i]))
+            embeddings = model.encode(list(texts.values()), batch_size=batch_size, convert_to_numpy=True)
+            embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+            by_key = {key: self.put(model_name, text, emb) for (key, text), emb in zip(texts.items(), embeddings)}
+            for i in missing:
+                cached[i] = by_key[self.normalize_query(queries[i])]
+
+        return np.vstack(cached)
+
+    def stats(self) -> Dict:
+        """Compteurs du cache (hits, misses, taux de succès, taille)"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_bytes': self._size
+            }
+
+    def clear(self):
+        """Vide le cache mémoire et remet les compteurs à zéro"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.disk_hits = self.misses = self.evictions = 0
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Cache partagé par le processus (configuré via Config)"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    max_bytes=int(Config.EMBEDDING_CACHE_MAX_MB * 1024 * 1024),
+                    ttl=Config.EMBEDDING_CACHE_TTL,
+                    disk_dir=Config.EMBEDDING_CACHE_DIR
+                )
+    return _cache
+
+
+def encode_query(model, model_name: str, query: str) -> np.ndarray:
+    """Raccourci: encode une requête via le cache partagé"""
+    return get_embedding_cache().encode(model, model_name, query)
@@ -1,24 +1,28 @@
 """
 Génère les embeddings pour les 2 modèles
 """
-import pandas as pd
+import argparse
+import json
 import numpy as np
 import os
 import time
-from sentence_transformers import SentenceTransformer
 from tqdm import tqdm
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config, Model1Config, Model2Config
+from src.artifacts import attach_embeddings, count_rows, default_input, fingerprint, is_artifact, iter_texts, read_texts
+from src.length_batching import combine_padding_stats, encode_length_bucketed, print_padding_stats
 
 
-def generate_embeddings_for_model(model_config, input_csv):
+def generate_embeddings_for_model(model_config, input_csv, token_budget=None):
     """
     Génère les embeddings pour UN modèle
     
     Args:
         model_config: Configuration du modèle (Model1Config ou Model2Config)
-        input_csv: Chemin du CSV prétraité
+        input_csv: Chemin du CSV prétraité ou de l'artefact Arrow
+        token_budget: Lots triés par nombre de tokens sous ce budget
+                      (None = lots fixes de 32 textes)
     """
     print("\n" + "="*70)
     print(f"🧠 GÉNÉRATION EMBEDDINGS: {model_config.NAME}")
@@ -26,14 +30,14 @@ def generate_embeddings_for_model(model_config, input_csv):
     
     # 1. Charger les données
     print(f"\n1️⃣ Chargement du dataset...")
-    df = pd.read_csv(input_csv)
-    texts = df['combined_text'].tolist()
+    texts = read_texts(input_csv)
     print(f"   ✅ {len(texts)} textes chargés")
     
     # 2. Charger le modèle
     print(f"\n2️⃣ Chargement du modèle '{model_config.NAME}'...")
     print(f"   ⏳ Cela peut prendre 1-2 minutes...")
     
+    from sentence_transformers import SentenceTransformer
     start = time.time()
     model = SentenceTransformer(model_config.NAME)
     load_time = time.time() - start
@@ -46,17 +50,24 @@ def generate_embeddings_for_model(model_config, input_csv):
     print(f"   ⏳ Estimation: ~{len(texts) // 32 * 0.5:.0f}s")
     
     start = time.time()
-    embeddings = model.encode(
-        texts,
-        batch_size=32,
-        show_progress_bar=True,
-        convert_to_numpy=True,
-        normalize_embeddings=True
-    )
+    if token_budget:
+        embeddings, stats = encode_length_bucketed(
+            model, texts, max_tokens=token_budget, batch_size=32, show_progress_bar=True
+        )
+    else:
+        embeddings = model.encode(
+            texts,
+            batch_size=32,
+            show_progress_bar=True,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
     gen_time = time.time() - start
     
     print(f"\n   ✅ Embeddings générés en {gen_time:.1f}s")
     print(f"   ⚡ Vitesse: {len(texts) / gen_time:.1f} docs/sec")
+    if token_budget:
+        print_padding_stats(stats)
     
     # 4. Vérifier
     print(f"\n4️⃣ Vérification...")
@@ -73,18 +84,213 @@ def generate_embeddings_for_model(model_config, input_csv):
     os.makedirs(Config.EMBEDDINGS_DIR, exist_ok=True)
     np.save(model_config.EMBEDDINGS_FILE, embeddings)
     print(f"   ✅ Sauvegardé: {model_config.EMBEDDINGS_FILE}")
+    publish_to_artifact(model_config, input_csv)
     
     print(f"\n✅ Terminé pour {model_config.NAME}!")
     
     return embeddings
 
 
+def _source_signature(input_csv):
+    """
+    Identifie la version de l'entrée (un checkpoint ne vaut que pour elle)
+    
+    Artefact: empreinte des ids et textes, qui ne change pas quand un
+    autre modèle y ajoute sa colonne d'embeddings.
+    """
+    if is_artifact(input_csv):
+        return {'path': os.path.abspath(input_csv), 'fingerprint': fingerprint(input_csv)}
+    stat = os.stat(input_csv)
+    return {'path': os.path.abspath(input_csv), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+
+
+def publish_to_artifact(model_config, input_path):
+    """Copie le .npy généré dans la colonne du modèle quand l'entrée est l'artefact"""
+    if not is_artifact(input_path):
+        return
+    embeddings = np.load(model_config.EMBEDDINGS_FILE, mmap_mode='r')
+    attach_embeddings(model_config, embeddings, input_path)
+    print(f"   ✅ Artefact: colonne {model_config.ARTIFACT_COLUMN} → {input_path}")
+
+
+def _write_checkpoint(path, checkpoint):
+    """Écriture atomique du checkpoint (jamais à moitié écrit)"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def generate_embeddings_streaming(model_config, input_csv, chunk_size=None, batch_size=32,
+                                  restart=False, model=None, token_budget=None):
+    """
+    Génère les embeddings d'UN modèle par morceaux, avec reprise sur erreur
+    
+    Le CSV est lu par blocs de chunk_size lignes, chaque bloc est encodé puis
+    écrit dans un .npy pré-alloué (np.memmap): la mémoire reste constante
+    quelle que soit la taille du corpus. Après chaque bloc, un checkpoint
+    enregistre les lignes terminées; relancer la commande reprend au bloc
+    suivant. Le fichier final n'apparaît qu'une fois complet.
+    
+    Args:
+        model_config: Configuration du modèle (Model1Config ou Model2Config)
+        input_csv: Chemin du CSV prétraité ou de l'artefact Arrow
+        chunk_size: Lignes par bloc (défaut: Config.EMBEDDING_CHUNK_SIZE)
+        batch_size: Taille de batch de model.encode
+        restart: Ignorer un checkpoint existant et tout recalculer
+        model: Modèle déjà chargé (optionnel)
+        token_budget: Lots triés par nombre de tokens sous ce budget, dans
+                      chaque bloc (None = lots fixes de batch_size textes)
+    
+    Returns:
+        Shape de la matrice écrite
+    """
+    chunk_size = chunk_size or Config.EMBEDDING_CHUNK_SIZE
+    output_file = model_config.EMBEDDINGS_FILE
+    partial_file = f"{output_file}.partial"
+    checkpoint_file = f"{output_file}.checkpoint.json"
+    
+    print("\n" + "="*70)
+    print(f"🧠 GÉNÉRATION EMBEDDINGS (par blocs): {model_config.NAME}")
+    print("="*70)
+    
+    # 1. Taille du corpus (lecture par blocs, colonne utile seulement)
+    n_rows = count_rows(input_csv)
+    shape = (n_rows, model_config.DIMENSIONS)
+    expected = {
+        'model': model_config.NAME,
+        'shape': list(shape),
+        'chunk_size': chunk_size,
+        'source': _source_signature(input_csv)
+    }
+    print(f"\n1️⃣ {n_rows} textes, blocs de {chunk_size}")
+    
+    # 2. Reprise ou nouveau fichier
+    completed_rows = 0
+    checkpoint = None
+    if not restart and os.path.exists(checkpoint_file) and os.path.exists(partial_file):
+        with open(checkpoint_file) as f:
+            checkpoint = json.load(f)
+        if {key: checkpoint.get(key) for key in expected} == expected:
+            completed_rows = checkpoint['completed_rows']
+        else:
+            print("   ⚠️  Checkpoint d'un autre CSV / modèle: on repart de zéro")
+            checkpoint = None
+    
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    if checkpoint is not None:
+        print(f"   🔁 Reprise à la ligne {completed_rows}/{n_rows}")
+        output = np.load(partial_file, mmap_mode='r+')
+    else:
+        output = np.lib.format.open_memmap(partial_file, mode='w+', dtype=np.float32, shape=shape)
+        checkpoint = dict(expected, completed_rows=0)
+        _write_checkpoint(checkpoint_file, checkpoint)
+    
+    # 3. Modèle (chargé seulement s'il reste du travail)
+    start = time.time()
+    if completed_rows < n_rows and model is None:
+        print(f"\n2️⃣ Chargement du modèle '{model_config.NAME}'...")
+        # Import local: les processus de --mode parallel (spawn) réimportent
+        # ce script avant de fixer leurs threads, sans charger torch
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_config.NAME)
+        print(f"   ✅ Modèle chargé en {time.time() - start:.1f}s")
+    
+    # 4. Encodage bloc par bloc
+    print(f"\n3️⃣ Génération des embeddings...")
+    start = time.time()
+    encoded = 0
+    row = 0
+    padding_stats = []
+    with tqdm(total=n_rows, initial=completed_rows, desc="Blocs", unit="docs") as progress:
+        for _, texts in iter_texts(input_csv, chunk_size):
+            end = row + len(texts)
+            if end <= completed_rows:
+                row = end
+                continue
+            
+            if token_budget:
+                embeddings, stats = encode_length_bucketed(
+                    model, texts, max_tokens=token_budget, batch_size=batch_size
+                )
+                padding_stats.append(stats)
+            else:
+                embeddings = model.encode(
+                    texts,
+                    batch_size=batch_size,
+                    show_progress_bar=False,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True
+                )
+            if embeddings.shape != (len(texts), model_config.DIMENSIONS):
+                raise ValueError(f"Shape incorrecte: {embeddings.shape}")
+            if np.isnan(embeddings).any():
+                raise ValueError(f"NaN détectés (lignes {row}-{end})")
+            
+            output[row:end] = embeddings
+            output.flush()
+            # Le checkpoint n'avance qu'après l'écriture du bloc sur disque
+            checkpoint['completed_rows'] = end
+            _write_checkpoint(checkpoint_file, checkpoint)
+            
+            encoded += len(texts)
+            progress.update(len(texts))
+            row = end
+    
+    gen_time = time.time() - start
+    if row != n_rows:
+        raise ValueError(f"L'entrée a changé pendant la génération ({row} lignes lues, {n_rows} attendues)")
+    
+    output.flush()
+    del output
+    
+    # 5. Publication atomique du fichier complet
+    os.replace(partial_file, output_file)
+    os.remove(checkpoint_file)
+    
+    if encoded:
+        print(f"\n   ✅ {encoded} embeddings générés en {gen_time:.1f}s "
+              f"({encoded / gen_time:.1f} docs/sec)")
+    if padding_stats:
+        print_padding_stats(combine_padding_stats(padding_stats))
+    print(f"   ✅ Sauvegardé: {output_file} {shape}")
+    publish_to_artifact(model_config, input_csv)
+    
+    return shape
+
+
+MODELS = {'minilm': Model1Config, 'pubmed': Model2Config}
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Génération des embeddings des 2 modèles")
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=['minilm', 'pubmed'])
+    parser.add_argument('--mode', choices=['streaming', 'memory', 'parallel'], default='streaming',
+                        help="streaming: par blocs avec reprise (défaut), memory: tout en RAM (historique), "
+                             "parallel: tranches réparties sur plusieurs processus")
+    parser.add_argument('--chunk-size', type=int, default=Config.EMBEDDING_CHUNK_SIZE)
+    parser.add_argument('--batch-size', type=int, default=Config.EMBEDDING_BATCH_SIZE)
+    parser.add_argument('--restart', action='store_true', help="Ignorer les checkpoints existants")
+    parser.add_argument('--token-budget', type=int, nargs='?', const=Config.EMBEDDING_TOKEN_BUDGET,
+                        default=None, help="Lots de longueurs voisines sous ce budget de tokens "
+                                           f"(sans valeur: {Config.EMBEDDING_TOKEN_BUDGET}; streaming et memory)")
+    parser.add_argument('--workers', type=int, default=Config.EMBEDDING_WORKERS,
+                        help="--mode parallel: nombre de processus")
+    parser.add_argument('--threads-per-worker', type=int, default=None,
+                        help="--mode parallel: threads par processus (défaut: cœurs / processus)")
+    parser.add_argument('--backend', choices=['torch', 'onnx', 'onnx-int8'], default='torch',
+                        help="--mode parallel: encodeur utilisé par les processus")
+    parser.add_argument('--yes', '-y', action='store_true', help="Ne pas demander de confirmation")
+    args = parser.parse_args()
+    
+    model_configs = [MODELS[name] for name in args.models]
+    
     print("="*70)
-    print("🔬 GÉNÉRATION EMBEDDINGS POUR 2 MODÈLES")
+    print(f"🔬 GÉNÉRATION EMBEDDINGS POUR {len(model_configs)} MODÈLE(S)")
     print("="*70)
     
-    input_csv = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    # Artefact Arrow s'il existe (les embeddings y sont ajoutés), sinon CSV
+    input_csv = default_input()
     
     if not os.path.exists(input_csv):
         print(f"❌ Fichier non trouvé: {input_csv}")
@@ -93,38 +299,48 @@ def main():
     
     print(f"\n📂 Input: {input_csv}")
     print(f"\n🎯 Modèles à générer:")
-    print(f"   1. {Model1Config.NAME} → {Model1Config.DIMENSIONS}D")
-    print(f"   2. {Model2Config.NAME} → {Model2Config.DIMENSIONS}D")
+    for i, model_config in enumerate(model_configs, 1):
+        print(f"   {i}. {model_config.NAME} → {model_config.DIMENSIONS}D")
     
-    # Demander confirmation
+    # Demander confirmation (seulement en interactif)
     print(f"\n⏱️ Temps estimé total: ~15-20 minutes")
-    choice = input("\n▶️  Continuer? (y/n) > ").strip().lower()
-    
-    if choice != 'y':
-        print("❌ Annulé")
-        return
-    
-    # Modèle 1
-    print("\n" + "#"*70)
-    print("# MODÈLE 1/2")
-    print("#"*70)
-    embeddings1 = generate_embeddings_for_model(Model1Config, input_csv)
+    if not args.yes and sys.stdin.isatty():
+        choice = input("\n▶️  Continuer? (y/n) > ").strip().lower()
+        
+        if choice != 'y':
+            print("❌ Annulé")
+            return
     
-    # Modèle 2
-    print("\n" + "#"*70)
-    print("# MODÈLE 2/2")
-    print("#"*70)
-    embeddings2 = generate_embeddings_for_model(Model2Config, input_csv)
+    shapes = []
+    for i, model_config in enumerate(model_configs, 1):
+        print("\n" + "#"*70)
+        print(f"# MODÈLE {i}/{len(model_configs)}")
+        print("#"*70)
+        if args.mode == 'parallel':
+            from src.parallel_embeddings import generate_embeddings_parallel
+            shape = generate_embeddings_parallel(
+                model_config, input_csv, args.workers, args.threads_per_worker,
+                batch_size=args.batch_size, backend=args.backend
+            )['shape']
+            publish_to_artifact(model_config, input_csv)
+        elif args.mode == 'streaming':
+            shape = generate_embeddings_streaming(
+                model_config, input_csv, args.chunk_size, args.batch_size, args.restart,
+                token_budget=args.token_budget
+            )
+        else:
+            shape = generate_embeddings_for_model(model_config, input_csv, args.token_budget).shape
+        shapes.append((model_config, shape))
     
     # Résumé
     print("\n" + "="*70)
     print("🎉 TOUS LES EMBEDDINGS GÉNÉRÉS!")
     print("="*70)
     print(f"\n📊 Résumé:")
-    print(f"   Modèle 1: {embeddings1.shape} → {Model1Config.EMBEDDINGS_FILE}")
-    print(f"   Modèle 2: {embeddings2.shape} → {Model2Config.EMBEDDINGS_FILE}")
-    print(f"\n✅ Prochaine étape: python insert_dual_models.py")
+    for i, (model_config, shape) in enumerate(shapes, 1):
+        print(f"   Modèle {i}: {shape} → {model_config.EMBEDDINGS_FILE}")
+    print(f"\n✅ Prochaine étape: python src/insert_dual_models.py")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,122 @@
+"""
+Recherche hybride mots-clés + sémantique en une seule requête SQL
+
+Les deux listes de candidats sont des CTE de la même requête: le scan
+ANN (index vectoriel de la table du modèle) et le scan plein texte
+(index GIN de search_vector). Elles sont fusionnées par FULL OUTER JOIN
+sur doc_id, puis classées par:
+- 'rrf': reciprocal rank fusion, somme pondérée de 1 / (k + rang)
+- 'weighted': somme pondérée de la similarité cosinus et du ts_rank
+  normalisé par le meilleur ts_rank des candidats
+
+Un seul encodage, un seul aller-retour: la requête renvoie (doc_id, score)
+et les scores de chaque composante, le texte est lu ensuite par id.
+"""
+import os
+import sys
+from typing import Dict, Optional
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+FUSIONS = ('rrf', 'weighted')
+
+# Colonnes renvoyées par hybrid_hits_sql, dans l'ordre
+HIT_COLUMNS = ('doc_id', 'score', 'semantic_similarity', 'keyword_rank',
+               'semantic_position', 'keyword_position')
+
+
+def hybrid_hits_sql(table_name: str, fusion: str = 'rrf', category_filter: bool = False) -> str:
+    """
+    Phase 1 de la recherche hybride: (doc_id, score fusionné, composantes)
+
+    Chaque branche ne lit que %(candidates)s lignes; un document trouvé
+    par une seule branche garde un score nul (ou un rang NULL) pour l'autre.
+    Le vecteur de la requête n'apparaît qu'une fois (ORDER BY sur l'alias).
+
+    Paramètres nommés: query, text, candidates, semantic_weight, rrf_k,
+    top_k (+ category si category_filter)
+    """
+    if fusion not in FUSIONS:
+        raise ValueError(f"Fusion inconnue: {fusion} (attendu: {FUSIONS})")
+    if fusion == 'rrf':
+        score = (
+            "%(semantic_weight)s * coalesce(1 / (%(rrf_k)s + s.position)::float8, 0)"
+            " + (1 - %(semantic_weight)s) * coalesce(1 / (%(rrf_k)s + k.position)::float8, 0)"
+        )
+    else:
+        score = (
+            "%(semantic_weight)s * coalesce(s.similarity, 0)"
+            " + (1 - %(semantic_weight)s) * coalesce(k.rank / nullif(k.best_rank, 0), 0)"
+        )
+    semantic_filter = "WHERE category = %(category)s" if category_filter else ""
+    keyword_filter = "AND category = %(category)s" if category_filter else ""
+    return f"""
+        WITH semantic AS (
+            SELECT
+                doc_id,
+                1 - distance AS similarity,
+                row_number() OVER (ORDER BY distance) AS position
+            FROM (
+                SELECT doc_id, embedding <=> %(query)s::vector AS distance
+                FROM {table_name}
+                {semantic_filter}
+                ORDER BY distance
+                LIMIT %(candidates)s
+            ) nearest
+        ), keyword AS (
+            SELECT
+                id AS doc_id,
+                rank,
+                max(rank) OVER () AS best_rank,
+                row_number() OVER (ORDER BY rank DESC, id) AS position
+            FROM (
+                SELECT id, ts_rank(search_vector, tsquery) AS rank
+                FROM {Config.DOCUMENTS_TABLE}, plainto_tsquery('english', %(text)s) tsquery
+                WHERE search_vector @@ tsquery
+                    {keyword_filter}
+                ORDER BY rank DESC
+                LIMIT %(candidates)s
+            ) matches
+        )
+        SELECT
+            coalesce(s.doc_id, k.doc_id) AS doc_id,
+            {score} AS score,
+            s.similarity AS semantic_similarity,
+            k.rank AS keyword_rank,
+            s.position AS semantic_position,
+            k.position AS keyword_position
+        FROM semantic s
+        FULL OUTER JOIN keyword k ON k.doc_id = s.doc_id
+        ORDER BY score DESC, doc_id
+        LIMIT %(top_k)s
+    """
+
+
+def hybrid_hits_params(query_embedding, text: str, top_k: int,
+                       semantic_weight: Optional[float] = None, candidates: Optional[int] = None,
+                       rrf_k: Optional[int] = None, category_filter: Optional[str] = None) -> Dict:
+    """Paramètres de hybrid_hits_sql"""
+    params = {
+        'query': np.asarray(query_embedding).tolist(),
+        'text': text,
+        'candidates': candidates or top_k * Config.HYBRID_CANDIDATES_PER_RESULT,
+        'semantic_weight': Config.HYBRID_SEMANTIC_WEIGHT if semantic_weight is None else semantic_weight,
+        'rrf_k': rrf_k or Config.HYBRID_RRF_K,
+        'top_k': top_k
+    }
+    if category_filter:
+        params['category'] = category_filter
+    return params
+
+
+def components(row) -> Dict:
+    """Scores de chaque composante d'une ligne de hybrid_hits_sql"""
+    _, _, similarity, rank, semantic_position, keyword_position = row
+    return {
+        'semantic_similarity': None if similarity is None else float(similarity),
+        'keyword_rank': None if rank is None else float(rank),
+        'semantic_position': semantic_position,
+        'keyword_position': keyword_position
+    }
@@ -0,0 +1,579 @@
+"""
+Mise à jour incrémentale des documents et des embeddings
+
+Chaque document est identifié par l'empreinte md5 du texte encodé
+(content_hash). Une réserve persistante empreinte -> vecteur par modèle
+évite de ré-encoder un texte déjà vu: après une modification du CSV,
+seuls les textes nouveaux ou modifiés passent par le modèle, seules les
+lignes concernées sont écrites (upsert) et les documents disparus sont
+supprimés (ON DELETE CASCADE sur les tables d'embeddings).
+
+Chaque table de modèle garde l'empreinte du texte de ses vecteurs: un
+modèle absent d'une exécution --models partielle est rattrapé à la
+suivante. Les tables dérivées (quantifiée, ACP, passages) sont
+rafraîchies ou invalidées pour les documents écrits, et seuls les
+.npy / colonnes de l'artefact dont l'alignement a changé sont réécrits.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from psycopg2.extras import execute_values
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config, Model2Config
+from src.artifacts import attach_embeddings, open_table, read_columns, write_documents
+from src.insert_dual_models import (
+    DOCUMENTS_TABLE, _categories, add_embedding_hash_column, connect, document_ids
+)
+from src.passage_index import passage_table_for
+from src.quantized_index import quantize_rows_sql, quantized_table_for
+from src.reduced_index import get_projection, reduced_tables
+
+
+MODELS = {'minilm': Model1Config, 'pubmed': Model2Config}
+
+
+def _is_missing(value) -> bool:
+    return value is None or (isinstance(value, float) and np.isnan(value))
+
+
+def content_hash(combined_text, question, answer) -> str:
+    """
+    Empreinte du texte encodé, identique à la colonne générée
+    md5(coalesce(combined_text, question || ' ' || answer))
+    """
+    text = f"{question} {answer}" if _is_missing(combined_text) else str(combined_text)
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+def content_hashes(df) -> List[str]:
+    """Empreinte de chaque ligne du CSV prétraité"""
+    return [
+        content_hash(combined_text, question, answer)
+        for combined_text, question, answer in zip(df['combined_text'], df['question'], df['answer'])
+    ]
+
+
+def store_path_for(model_config) -> str:
+    """Fichier de la réserve d'un modèle, à côté de son .npy"""
+    return os.path.splitext(model_config.EMBEDDINGS_FILE)[0] + '.store.npz'
+
+
+class EmbeddingStore:
+    """
+    Réserve persistante empreinte -> embedding d'un modèle (fichier .npz)
+
+    Les vecteurs sont ceux écrits dans la table du modèle: un texte qui
+    revient (déplacé, restauré) est retrouvé sans repasser par l'encodeur.
+    aligned = empreintes des lignes du .npy écrit en dernier (None: inconnu).
+    """
+
+    def __init__(self, model_config, path: Optional[str] = None):
+        self.model_config = model_config
+        self.path = path or store_path_for(model_config)
+        self._vectors: Dict[str, np.ndarray] = {}
+        self.aligned: Optional[List[str]] = None
+
+    def __len__(self):
+        return len(self._vectors)
+
+    def __contains__(self, digest: str) -> bool:
+        return digest in self._vectors
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> 'EmbeddingStore':
+        if self.exists():
+            with np.load(self.path) as data:
+                if data['model'].item() != self.model_config.NAME:
+                    raise ValueError(f"{self.path} appartient à un autre modèle ({data['model'].item()})")
+                self._vectors = dict(zip(data['hashes'].tolist(), data['embeddings']))
+                if 'aligned' in data.files:
+                    self.aligned = data['aligned'].tolist()
+        return self
+
+    def seed_from_database(self, conn) -> int:
+        """
+        Première exécution: reprend les vecteurs déjà en base, sous
+        l'empreinte du texte dont ils ont été calculés (content_hash de
+        la table du modèle)
+
+        Returns:
+            Nombre de vecteurs ajoutés
+        """
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT content_hash, embedding::text
+            FROM {self.model_config.TABLE_NAME}
+            WHERE content_hash IS NOT NULL;
+        """)
+        added = 0
+        for digest, embedding in cursor:
+            if digest not in self._vectors:
+                self._vectors[digest] = np.asarray(json.loads(embedding), dtype=np.float32)
+                added += 1
+        cursor.close()
+        return added
+
+    def get(self, digest: str) -> np.ndarray:
+        return self._vectors[digest]
+
+    def covers(self, digests: Iterable[str]) -> bool:
+        """Tous les textes ont un vecteur dans la réserve"""
+        return all(digest in self._vectors for digest in digests)
+
+    def matrix(self, digests: List[str]) -> np.ndarray:
+        """Matrice (len(digests), dimensions) dans l'ordre des empreintes"""
+        if not digests:
+            return np.empty((0, self.model_config.DIMENSIONS), dtype=np.float32)
+        return np.stack([self._vectors[digest] for digest in digests])
+
+    def add(self, digests: Iterable[str], embeddings: np.ndarray):
+        for digest, embedding in zip(digests, embeddings):
+            self._vectors[digest] = np.asarray(embedding, dtype=np.float32)
+
+    def prune(self, keep: Iterable[str]) -> int:
+        """Oublie les empreintes absentes du corpus courant"""
+        keep = set(keep)
+        stale = [digest for digest in self._vectors if digest not in keep]
+        for digest in stale:
+            del self._vectors[digest]
+        return len(stale)
+
+    def save(self):
+        """Écriture atomique (fichier temporaire puis renommage)"""
+        digests = list(self._vectors)
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        arrays = {}
+        if self.aligned is not None:
+            arrays['aligned'] = np.array(self.aligned, dtype='U32')
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, model=np.array(self.model_config.NAME),
+                     hashes=np.array(digests, dtype='U32'), embeddings=self.matrix(digests), **arrays)
+        os.replace(tmp_path, self.path)
+
+
+def _vector_literal(embedding) -> str:
+    return '[' + ','.join(map(repr, np.asarray(embedding, dtype=np.float32).tolist())) + ']'
+
+
+def plan_documents(conn, df) -> Dict:
+    """
+    Compare le CSV à la table des documents (par id: empreinte + catégorie)
+
+    Returns:
+        {'new': [ids], 'changed': [ids], 'deleted': [ids], 'unchanged': n}
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT id, content_hash, category FROM {DOCUMENTS_TABLE};")
+    current = {doc_id: (digest, category) for doc_id, digest, category in cursor}
+    cursor.close()
+
+    wanted = dict(zip(document_ids(df), zip(content_hashes(df), _categories(df))))
+    new = [doc_id for doc_id in wanted if doc_id not in current]
+    changed = [doc_id for doc_id, row in wanted.items() if doc_id in current and current[doc_id] != row]
+    deleted = [doc_id for doc_id in current if doc_id not in wanted]
+    return {
+        'new': new,
+        'changed': changed,
+        'deleted': deleted,
+        'unchanged': len(wanted) - len(new) - len(changed)
+    }
+
+
+def stale_embeddings(conn, model_config, wanted: Dict[int, Tuple[str, str]]) -> List[int]:
+    """
+    Documents du CSV dont la ligne du modèle est absente (chargement
+    interrompu...) ou a été calculée sur un autre texte / une autre catégorie
+
+    Comparaison avec l'empreinte de la table du modèle, pas avec celle
+    des documents: après une exécution --models partielle, la table des
+    documents est à jour mais pas les vecteurs des autres modèles.
+
+    Args:
+        wanted: {id: (empreinte, catégorie)} du CSV
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT doc_id, content_hash, category FROM {model_config.TABLE_NAME};")
+    current = {doc_id: (digest, category) for doc_id, digest, category in cursor}
+    cursor.close()
+    return sorted(doc_id for doc_id, row in wanted.items() if current.get(doc_id) != row)
+
+
+def encode_missing(model_config, store: EmbeddingStore, texts_by_hash: Dict[str, str],
+                   batch_size: int = 32, model=None) -> int:
+    """
+    Encode les textes dont l'empreinte n'est pas dans la réserve
+
+    Le modèle n'est chargé que s'il y a quelque chose à encoder.
+
+    Returns:
+        Nombre de textes encodés
+    """
+    todo = [digest for digest in texts_by_hash if digest not in store]
+    if not todo:
+        return 0
+
+    if model is None:
+        from sentence_transformers import SentenceTransformer
+        print(f"   📦 Chargement du modèle: {model_config.NAME}")
+        model = SentenceTransformer(model_config.NAME)
+
+    embeddings = model.encode(
+        [texts_by_hash[digest] for digest in todo],
+        batch_size=batch_size,
+        show_progress_bar=len(todo) > batch_size,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+    if embeddings.shape != (len(todo), model_config.DIMENSIONS):
+        raise ValueError(f"Shape incorrecte: {embeddings.shape}")
+    store.add(todo, embeddings)
+    return len(todo)
+
+
+def _upsert_documents(cursor, rows):
+    execute_values(cursor, f"""
+        INSERT INTO {DOCUMENTS_TABLE} (id, question, answer, combined_text, category, qtype, source)
+        VALUES %s
+        ON CONFLICT (id) DO UPDATE SET
+            question = EXCLUDED.question,
+            answer = EXCLUDED.answer,
+            combined_text = EXCLUDED.combined_text,
+            category = EXCLUDED.category,
+            qtype = EXCLUDED.qtype
+    """, rows, page_size=500)
+
+
+def _upsert_embeddings(cursor, model_config, rows):
+    execute_values(cursor, f"""
+        INSERT INTO {model_config.TABLE_NAME} (doc_id, category, content_hash, embedding)
+        VALUES %s
+        ON CONFLICT (doc_id) DO UPDATE SET
+            category = EXCLUDED.category,
+            content_hash = EXCLUDED.content_hash,
+            embedding = EXCLUDED.embedding
+    """, rows, template="(%s, %s, %s, %s::vector)", page_size=500)
+
+
+def _upsert_vectors(cursor, table_name, rows):
+    execute_values(cursor, f"""
+        INSERT INTO {table_name} (doc_id, category, embedding)
+        VALUES %s
+        ON CONFLICT (doc_id) DO UPDATE SET
+            category = EXCLUDED.category,
+            embedding = EXCLUDED.embedding
+    """, rows, template="(%s, %s, %s::vector)", page_size=500)
+
+
+def _table_exists(cursor, table_name) -> bool:
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (table_name,))
+    return cursor.fetchone()[0]
+
+
+def refresh_derived_tables(conn, model_config, store: EmbeddingStore, rows) -> Dict[str, int]:
+    """
+    Tables dérivées de la table d'un modèle, pour les documents qui
+    viennent d'y être écrits (dans la transaction en cours)
+
+    - {table}_quantized: recalculée en SQL depuis la table du modèle
+    - {table}_pca{dim}: vecteurs projetés avec la projection enregistrée
+      (lignes supprimées si elle est absente)
+    - {table}_passages: lignes supprimées, le découpage demande le
+      tokenizer du modèle (relancer src/passage_index.py)
+
+    Args:
+        rows: (doc_id, catégorie, empreinte) écrits dans la table du modèle
+
+    Returns:
+        {table: lignes rafraîchies ou supprimées}
+    """
+    doc_ids = [doc_id for doc_id, _, _ in rows]
+    counts = {}
+    cursor = conn.cursor()
+
+    table_name = quantized_table_for(model_config)
+    if _table_exists(cursor, table_name):
+        cursor.execute(quantize_rows_sql(model_config, doc_filter=True), {'doc_ids': doc_ids})
+        counts[table_name] = cursor.rowcount
+
+    tables = reduced_tables(conn, model_config)
+    if tables:
+        try:
+            projection = get_projection(model_config)
+        except FileNotFoundError:
+            projection = None
+        vectors = store.matrix([digest for _, _, digest in rows])
+        for dimensions, table_name in sorted(tables.items()):
+            if projection is None or dimensions > projection.max_dimensions:
+                cursor.execute(f"DELETE FROM {table_name} WHERE doc_id = ANY(%s);", (doc_ids,))
+                counts[table_name] = cursor.rowcount
+                print(f"   ⚠️  {table_name}: projection absente, {cursor.rowcount} lignes supprimées "
+                      f"(python src/reduced_index.py build)")
+                continue
+            reduced = projection.transform(vectors, dimensions)
+            _upsert_vectors(cursor, table_name, [
+                (doc_id, category, _vector_literal(vector))
+                for (doc_id, category, _), vector in zip(rows, reduced)
+            ])
+            counts[table_name] = len(rows)
+
+    table_name = passage_table_for(model_config)
+    if _table_exists(cursor, table_name):
+        cursor.execute(f"DELETE FROM {table_name} WHERE doc_id = ANY(%s);", (doc_ids,))
+        counts[table_name] = cursor.rowcount
+        if cursor.rowcount:
+            print(f"   ⚠️  {table_name}: {cursor.rowcount} passages obsolètes supprimés "
+                  f"(python src/passage_index.py pour les recalculer)")
+
+    cursor.close()
+    return counts
+
+
+def write_npy(model_config, store: EmbeddingStore, digests: List[str]):
+    """Réécrit le .npy aligné sur le CSV (backend NumPy) depuis la réserve, sans encodage"""
+    tmp_path = f"{model_config.EMBEDDINGS_FILE}.tmp.npy"
+    output = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                       shape=(len(digests), model_config.DIMENSIONS))
+    for row, digest in enumerate(digests):
+        output[row] = store.get(digest)
+    output.flush()
+    del output
+    os.replace(tmp_path, model_config.EMBEDDINGS_FILE)
+    store.aligned = list(digests)
+
+
+def _model_key(model_config) -> str:
+    return next(name for name, config in MODELS.items() if config is model_config)
+
+
+def load_stores(stores: Dict) -> Dict:
+    """Réserves des modèles traités + celles déjà enregistrées des autres modèles"""
+    stores = dict(stores)
+    for model_config in MODELS.values():
+        if model_config not in stores and os.path.exists(store_path_for(model_config)):
+            stores[model_config] = EmbeddingStore(model_config).load()
+    return stores
+
+
+def update_npy_files(stores: Dict, digests: List[str]) -> List:
+    """
+    Réécrit les seuls .npy dont l'alignement a changé (documents
+    ajoutés, modifiés, supprimés ou déplacés)
+
+    Un modèle dont la réserve ne couvre pas tout le corpus garde son
+    .npy: il sera réécrit par la prochaine exécution qui le traite.
+
+    Returns:
+        Modèles dont le .npy a été réécrit
+    """
+    written = []
+    for model_config, store in stores.items():
+        if store.aligned == digests and os.path.exists(model_config.EMBEDDINGS_FILE):
+            continue
+        if not store.covers(digests):
+            print(f"   ⚠️  {model_config.EMBEDDINGS_FILE} n'est plus aligné sur le CSV "
+                  f"(--models {_model_key(model_config)} pour le réécrire)")
+            continue
+        write_npy(model_config, store, digests)
+        print(f"   ✅ {model_config.EMBEDDINGS_FILE}: {len(digests)} lignes")
+        written.append(model_config)
+    return written
+
+
+def update_artifact(df, digests: List[str], stores: Dict, path: Optional[str] = None):
+    """
+    Aligne l'artefact Arrow sur le CSV sans le reconstruire
+
+    Documents inchangés: seules les colonnes d'embeddings absentes sont
+    ajoutées (attach_embeddings recopie les autres). Documents modifiés:
+    colonnes des documents réécrites, puis colonne de chaque modèle dont
+    la réserve couvre le corpus; une colonne qui ne correspondrait plus
+    aux textes est retirée.
+    """
+    path = path or Config.ARTIFACT_FILE
+    before = set(open_table(path).schema.names)
+    current = read_columns(['id', 'question', 'answer', 'combined_text'], path)
+    if document_ids(current) != document_ids(df) or content_hashes(current) != digests:
+        write_documents(df, path)
+        print(f"   ✅ {len(df)} documents → {path}")
+    present = set(open_table(path).schema.names)
+
+    ids = np.asarray(document_ids(df), dtype=np.int64)
+    for model_config, store in stores.items():
+        column = model_config.ARTIFACT_COLUMN
+        if column in present:
+            continue
+        if not store.covers(digests):
+            if column in before:
+                print(f"   ⚠️  {column} retirée: ne correspond plus aux textes "
+                      f"(--models {_model_key(model_config)} pour la recalculer)")
+            continue
+        attach_embeddings(model_config, store.matrix(digests), path, ids)
+        print(f"   ✅ {column}: {len(digests)} lignes")
+
+
+def incremental_update(df, model_configs, dry_run=False, batch_size=32, models=None, write_arrays=True):
+    """
+    Aligne la base (et les .npy) sur le CSV en ne traitant que les différences
+
+    Toutes les écritures en base ont lieu dans une seule transaction, après
+    l'encodage: une erreur laisse la base dans son état précédent.
+
+    Args:
+        df: CSV prétraité
+        model_configs: Modèles à mettre à jour
+        dry_run: Afficher le plan sans encoder ni écrire
+        batch_size: Taille de batch de model.encode
+        models: {model_config: encodeur déjà chargé} (optionnel)
+        write_arrays: Aligner aussi les fichiers .npy (et l'artefact Arrow s'il existe)
+
+    Returns:
+        Plan des documents + {'encoded': {nom: n}, 'upserted': {nom: n}, 'derived': {nom: {table: n}}}
+    """
+    models = models or {}
+    ids = document_ids(df)
+    digests = content_hashes(df)
+    categories = list(_categories(df))
+    wanted = dict(zip(ids, zip(digests, categories)))
+    texts = df['combined_text'].where(df['combined_text'].notna(),
+                                      df['question'].astype(str) + ' ' + df['answer'].astype(str))
+    row_of = {doc_id: row for row, doc_id in enumerate(ids)}
+
+    conn = connect()
+    try:
+        start = time.time()
+        plan = plan_documents(conn, df)
+        print(f"\n🔎 Documents: {len(plan['new'])} nouveaux, {len(plan['changed'])} modifiés, "
+              f"{len(plan['deleted'])} supprimés, {plan['unchanged']} inchangés "
+              f"({time.time() - start:.1f}s)")
+
+        touched = plan['new'] + plan['changed']
+        todo = {}
+        for model_config in model_configs:
+            # Empreinte par ligne de modèle (tables antérieures: reprise de celle du document)
+            add_embedding_hash_column(conn, model_config.TABLE_NAME, commit=not dry_run)
+            todo[model_config] = stale_embeddings(conn, model_config, wanted)
+            print(f"   - {model_config.NAME}: {len(todo[model_config])} embeddings à écrire")
+        skipped = [model_config.NAME for model_config in MODELS.values() if model_config not in model_configs]
+        if touched and skipped:
+            print(f"   ⚠️  Non traités: {', '.join(skipped)} (vecteurs obsolètes jusqu'à leur prochaine mise à jour)")
+        if dry_run:
+            return plan
+
+        # 1. Encodage (hors transaction) des seuls textes inconnus de la réserve
+        stores = {}
+        plan['encoded'] = {}
+        for model_config in model_configs:
+            store = EmbeddingStore(model_config).load()
+            if not store.exists():
+                seeded = store.seed_from_database(conn)
+                conn.rollback()  # ne pas garder de transaction ouverte pendant l'encodage
+                print(f"   🌱 Réserve {model_config.NAME} initialisée depuis la base: {seeded} vecteurs")
+            needed = {digests[row_of[doc_id]]: texts.iloc[row_of[doc_id]] for doc_id in todo[model_config]}
+            if write_arrays:
+                needed.update({digest: texts.iloc[row] for row, digest in enumerate(digests)
+                               if digest not in store and digest not in needed})
+            start = time.time()
+            encoded = encode_missing(model_config, store, needed, batch_size, models.get(model_config))
+            plan['encoded'][model_config.NAME] = encoded
+            if encoded:
+                print(f"   ✅ {model_config.NAME}: {encoded} textes encodés en {time.time() - start:.1f}s")
+            stores[model_config] = store
+
+        # 2. Écriture en une transaction
+        start = time.time()
+        cursor = conn.cursor()
+        if plan['deleted']:
+            cursor.execute(f"DELETE FROM {DOCUMENTS_TABLE} WHERE id = ANY(%s);", (plan['deleted'],))
+        if touched:
+            _upsert_documents(cursor, [
+                (doc_id, df['question'].iloc[row_of[doc_id]], df['answer'].iloc[row_of[doc_id]],
+                 None if _is_missing(df['combined_text'].iloc[row_of[doc_id]]) else df['combined_text'].iloc[row_of[doc_id]],
+                 categories[row_of[doc_id]], categories[row_of[doc_id]], 'MedQuAD')
+                for doc_id in touched
+            ])
+            cursor.execute(f"""
+                SELECT setval(
+                    pg_get_serial_sequence('{DOCUMENTS_TABLE}', 'id'),
+                    COALESCE((SELECT MAX(id) FROM {DOCUMENTS_TABLE}), 0) + 1,
+                    false
+                );
+            """)
+        plan['upserted'] = {}
+        plan['derived'] = {}
+        for model_config in model_configs:
+            store = stores[model_config]
+            rows = [(doc_id, categories[row_of[doc_id]], digests[row_of[doc_id]]) for doc_id in todo[model_config]]
+            if rows:
+                _upsert_embeddings(cursor, model_config, [
+                    (doc_id, category, digest, _vector_literal(store.get(digest)))
+                    for doc_id, category, digest in rows
+                ])
+                plan['derived'][model_config.NAME] = refresh_derived_tables(conn, model_config, store, rows)
+            plan['upserted'][model_config.NAME] = len(rows)
+        conn.commit()
+        cursor.close()
+        print(f"   ✅ Base mise à jour en {time.time() - start:.1f}s")
+    finally:
+        conn.close()
+
+    # 3. Réserves (seulement les textes du corpus courant), puis .npy et
+    # colonnes de l'artefact des seuls modèles dont l'alignement a changé
+    for store in stores.values():
+        store.prune(digests)
+    all_stores, written = stores, []
+    if write_arrays:
+        all_stores = load_stores(stores)
+        written = update_npy_files(all_stores, digests)
+        if os.path.exists(Config.ARTIFACT_FILE):
+            print(f"\n📦 Artefact: {Config.ARTIFACT_FILE}")
+            update_artifact(df, digests, all_stores)
+    for model_config in set(stores) | set(written):
+        all_stores[model_config].save()
+
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mise à jour incrémentale des documents et embeddings")
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=['minilm', 'pubmed'])
+    parser.add_argument('--input', default=os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv'))
+    parser.add_argument('--batch-size', type=int, default=Config.EMBEDDING_BATCH_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help="Afficher les différences sans rien écrire")
+    parser.add_argument('--no-arrays', action='store_true',
+                        help="Ne pas aligner les .npy (backend NumPy) ni l'artefact")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("🔄 MISE À JOUR INCRÉMENTALE")
+    print("="*70)
+
+    if not os.path.exists(args.input):
+        print(f"❌ CSV non trouvé: {args.input}")
+        return
+
+    start = time.time()
+    df = pd.read_csv(args.input)
+    print(f"\n📂 {args.input}: {len(df)} documents")
+
+    plan = incremental_update(df, [MODELS[name] for name in args.models], dry_run=args.dry_run,
+                              batch_size=args.batch_size, write_arrays=not args.no_arrays)
+
+    if args.dry_run:
+        print("\n💡 --dry-run: rien n'a été écrit")
+        return
+    print(f"\n✅ Terminé en {time.time() - start:.1f}s")
+    for name, count in plan['upserted'].items():
+        print(f"   - {name}: {plan['encoded'][name]} encodés, {count} lignes écrites")
+
+
+if __name__ == "__main__":
+    main()
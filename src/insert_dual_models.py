@@ -1,51 +1,122 @@
 """
-Insère les embeddings des 2 modèles dans des tables séparées
+Insère les documents (une seule fois) et les embeddings des 2 modèles
+(une table étroite par modèle, clé = id du document)
 """
+import argparse
 import os
+import struct
 import sys
+import time
 import numpy as np
 import pandas as pd
 import psycopg2
+from concurrent.futures import ThreadPoolExecutor
 from psycopg2.extras import execute_batch
 from tqdm import tqdm
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import Config, Model1Config, Model2Config
+from src.artifacts import has_embeddings, read_columns, read_embeddings
+from src.vector_index import INDEX_METHODS, build_vector_index
 
 
-def create_table(conn, Config):
-    """Crée une table pour un modèle"""
+# Format binaire de COPY: en-tête, fin de flux, valeur NULL
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+PGCOPY_TRAILER = struct.pack('!h', -1)
+PGCOPY_NULL = struct.pack('!i', -1)
+
+DOCUMENT_COLUMNS = ('id', 'question', 'answer', 'combined_text', 'category', 'qtype', 'source')
+EMBEDDING_COLUMNS = ('doc_id', 'category', 'embedding')
+DOCUMENTS_TABLE = Config.DOCUMENTS_TABLE
+
+
+def connect():
+    """Ouvre une connexion PostgreSQL (paramètres Config)"""
+    return psycopg2.connect(
+        host=Config.DB_HOST,
+        port=Config.DB_PORT,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD
+    )
+
+
+def document_ids(df):
+    """Identifiants stables des documents (colonne 'id' du CSV prétraité)"""
+    if 'id' in df:
+        return df['id'].astype(int).tolist()
+    return list(range(len(df)))
+
+
+def create_documents_table(conn):
+    """Crée la table partagée des documents (texte + métadonnées)"""
     cursor = conn.cursor()
     
-    print(f"\n📊 Création table: {Config.TABLE_NAME}")
+    print(f"\n📊 Création table: {Config.DOCUMENTS_TABLE}")
     
-    # Supprimer si existe
-    cursor.execute(f"DROP TABLE IF EXISTS {Config.TABLE_NAME} CASCADE;")
+    # Supprimer si existe (les tables d'embeddings dépendantes aussi)
+    cursor.execute(f"DROP TABLE IF EXISTS {Config.DOCUMENTS_TABLE} CASCADE;")
     
-    # Créer la table
     cursor.execute(f"""
-        CREATE TABLE {Config.TABLE_NAME} (
-            id SERIAL PRIMARY KEY,
+        CREATE TABLE {Config.DOCUMENTS_TABLE} (
+            id INTEGER GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
             question TEXT NOT NULL,
             answer TEXT NOT NULL,
-            combined_text TEXT NOT NULL,
+            combined_text TEXT,
             category VARCHAR(100),
             qtype VARCHAR(50),
             source VARCHAR(200) DEFAULT 'MedQuAD',
-            embedding VECTOR({Config.DIMENSIONS}) NOT NULL,
+            search_vector TSVECTOR
+                GENERATED ALWAYS AS (
+                    to_tsvector('english', coalesce(combined_text, question || ' ' || answer))
+                ) STORED,
+            answer_preview TEXT
+                GENERATED ALWAYS AS (left(answer, {Config.ANSWER_PREVIEW_CHARS})) STORED,
+            content_hash TEXT
+                GENERATED ALWAYS AS (md5(coalesce(combined_text, question || ' ' || answer))) STORED,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     """)
     
-    # Index vectoriel
-    print(f"   📌 Création index vectoriel...")
     cursor.execute(f"""
-        CREATE INDEX idx_{Config.TABLE_NAME}_embedding 
-        ON {Config.TABLE_NAME} 
-        USING ivfflat (embedding vector_cosine_ops)
-        WITH (lists = 100);
+        CREATE INDEX idx_{Config.DOCUMENTS_TABLE}_category 
+        ON {Config.DOCUMENTS_TABLE}(category);
     """)
     
+    conn.commit()
+    cursor.close()
+    
+    print(f"   ✅ Table créée!")
+
+
+def create_table(conn, Config):
+    """
+    Crée la table d'embeddings d'un modèle (une ligne par document)
+    
+    Seuls l'id du document, sa catégorie (pour les recherches filtrées
+    sans jointure) et le vecteur y sont stockés: le texte reste dans la
+    table des documents.
+    """
+    cursor = conn.cursor()
+    
+    print(f"\n📊 Création table: {Config.TABLE_NAME}")
+    
+    # Supprimer si existe
+    cursor.execute(f"DROP TABLE IF EXISTS {Config.TABLE_NAME} CASCADE;")
+    
+    # Créer la table
+    cursor.execute(f"""
+        CREATE TABLE {Config.TABLE_NAME} (
+            doc_id INTEGER PRIMARY KEY
+                REFERENCES {DOCUMENTS_TABLE}(id) ON DELETE CASCADE,
+            category VARCHAR(100),
+            embedding VECTOR({Config.DIMENSIONS}) NOT NULL,
+            content_hash TEXT
+        );
+    """)
+    
+    # L'index vectoriel est construit après le chargement
+    
     # Index catégorie
     cursor.execute(f"""
         CREATE INDEX idx_{Config.TABLE_NAME}_category 
@@ -58,33 +129,185 @@ def create_table(conn, Config):
     print(f"   ✅ Table créée!")
 
 
-def insert_data(conn, Config, df, embeddings):
-    """Insère les données pour un modèle"""
+def finalize_documents_table(conn):
+    """Après chargement: index GIN, séquence d'identité, statistiques"""
+    create_text_search_index(conn, Config.DOCUMENTS_TABLE)
+    
+    cursor = conn.cursor()
+    # Les ids sont fournis explicitement: recaler la séquence pour les futurs INSERT
+    cursor.execute(f"""
+        SELECT setval(
+            pg_get_serial_sequence('{Config.DOCUMENTS_TABLE}', 'id'),
+            COALESCE((SELECT MAX(id) FROM {Config.DOCUMENTS_TABLE}), 0) + 1,
+            false
+        );
+    """)
+    cursor.execute(f"ANALYZE {Config.DOCUMENTS_TABLE};")
+    conn.commit()
+    cursor.close()
+
+
+def create_text_search_index(conn, table_name):
+    """Index GIN sur la colonne tsvector stockée (recherche par mots-clés)"""
     cursor = conn.cursor()
     
-    print(f"\n💾 Insertion dans: {Config.TABLE_NAME}")
+    print(f"\n📌 Index full-text sur {table_name}")
+    start = time.time()
+    cursor.execute(f"""
+        CREATE INDEX IF NOT EXISTS idx_{table_name}_search_vector
+        ON {table_name}
+        USING GIN (search_vector);
+    """)
+    conn.commit()
+    cursor.close()
+    
+    print(f"   ✅ Index GIN construit en {time.time() - start:.1f}s")
+
+
+def add_search_vector_column(conn, table_name):
+    """
+    Migration d'une table existante: ajoute la colonne tsvector générée
+    et son index GIN sans recharger les données
+    """
+    cursor = conn.cursor()
+    
+    print(f"\n🔧 Migration full-text: {table_name}")
+    cursor.execute(f"""
+        ALTER TABLE {table_name}
+        ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+            GENERATED ALWAYS AS (
+                to_tsvector('english', coalesce(combined_text, question || ' ' || answer))
+            ) STORED;
+    """)
+    conn.commit()
+    cursor.close()
+    
+    create_text_search_index(conn, table_name)
+    
+    cursor = conn.cursor()
+    cursor.execute(f"ANALYZE {table_name};")
+    conn.commit()
+    cursor.close()
+
+
+def add_answer_preview_column(conn, table_name):
+    """
+    Migration d'une table existante: ajoute l'extrait de réponse précalculé
+    (lu par les résultats de recherche à la place de la réponse complète)
+    """
+    cursor = conn.cursor()
+    
+    print(f"\n🔧 Migration extrait de réponse: {table_name}")
+    cursor.execute(f"""
+        ALTER TABLE {table_name}
+        ADD COLUMN IF NOT EXISTS answer_preview TEXT
+            GENERATED ALWAYS AS (left(answer, {Config.ANSWER_PREVIEW_CHARS})) STORED;
+    """)
+    conn.commit()
+    cursor.close()
+
+
+def add_content_hash_column(conn, table_name):
+    """
+    Migration d'une table existante: ajoute l'empreinte md5 du texte encodé
+    (utilisée par src/incremental_update.py pour détecter les changements)
+    """
+    cursor = conn.cursor()
+    
+    print(f"\n🔧 Migration empreinte de contenu: {table_name}")
+    cursor.execute(f"""
+        ALTER TABLE {table_name}
+        ADD COLUMN IF NOT EXISTS content_hash TEXT
+            GENERATED ALWAYS AS (md5(coalesce(combined_text, question || ' ' || answer))) STORED;
+    """)
+    conn.commit()
+    cursor.close()
+
+
+def add_embedding_hash_column(conn, table_name, commit=True):
+    """
+    Empreinte du texte encodé dans la table d'un modèle: chaque modèle
+    est comparé au CSV séparément par src/incremental_update.py
+
+    Les lignes sans empreinte (chargement complet, table antérieure)
+    reçoivent celle de leur document: chargées ensemble, elles lui
+    correspondent.
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS content_hash TEXT;")
+    cursor.execute(f"""
+        UPDATE {table_name} e
+        SET content_hash = d.content_hash
+        FROM {DOCUMENTS_TABLE} d
+        WHERE d.id = e.doc_id AND e.content_hash IS NULL;
+    """)
+    if commit:
+        conn.commit()
+    cursor.close()
+
+
+def _report(label, count, start):
+    elapsed = time.time() - start
+    print(f"   ✅ {count} lignes {label} en {elapsed:.1f}s "
+          f"({count / elapsed:.0f} lignes/sec)")
+    return elapsed
+
+
+def insert_documents(conn, df):
+    """Insère les documents (execute_batch)"""
+    cursor = conn.cursor()
+    
+    print(f"\n💾 Insertion dans: {Config.DOCUMENTS_TABLE}")
+    start = time.time()
     
-    # Préparer les données
     data = []
-    for idx, row in df.iterrows():
-        embedding_list = embeddings[idx].tolist()
+    for doc_id, (idx, row) in zip(document_ids(df), df.iterrows()):
         category = row.get('category', 'Unknown')
-        
         data.append((
+            doc_id,
             row['question'],
             row['answer'],
             row['combined_text'],
             category,
             category,  # qtype = category
-            'MedQuAD',
-            embedding_list
+            'MedQuAD'
         ))
     
+    insert_query = f"""
+        INSERT INTO {Config.DOCUMENTS_TABLE}
+        (id, question, answer, combined_text, category, qtype, source)
+        VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """
+    
+    batch_size = 100
+    for i in tqdm(range(0, len(data), batch_size), desc="Insertion"):
+        batch = data[i:i+batch_size]
+        execute_batch(cursor, insert_query, batch, page_size=batch_size)
+        conn.commit()
+    
+    cursor.close()
+    return _report("insérées", len(data), start)
+
+
+def insert_data(conn, Config, df, embeddings):
+    """Insère les embeddings d'un modèle (execute_batch)"""
+    cursor = conn.cursor()
+    
+    print(f"\n💾 Insertion dans: {Config.TABLE_NAME}")
+    start = time.time()
+    
+    # Préparer les données
+    data = []
+    for doc_id, (idx, row) in zip(document_ids(df), df.iterrows()):
+        embedding_list = embeddings[idx].tolist()
+        category = row.get('category', 'Unknown')
+        data.append((doc_id, category, embedding_list))
+    
     # Insérer par batch
     insert_query = f"""
         INSERT INTO {Config.TABLE_NAME}
-        (question, answer, combined_text, category, qtype, source, embedding)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
+        (doc_id, category, embedding)
+        VALUES (%s, %s, %s)
     """
     
     batch_size = 100
@@ -94,83 +317,307 @@ def insert_data(conn, Config, df, embeddings):
         conn.commit()
     
     cursor.close()
-    print(f"   ✅ {len(data)} documents insérés!")
+    return _report("insérées", len(data), start)
 
 
-def main():
-    print("="*70)
-    print("💾 INSERTION DES 2 MODÈLES DANS POSTGRESQL")
-    print("="*70)
+def _encode_text_field(value):
+    """Champ texte au format binaire COPY (longueur + UTF-8)"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return PGCOPY_NULL
+    data = str(value).encode('utf-8')
+    return struct.pack('!i', len(data)) + data
+
+
+def _encode_int_field(value):
+    """Champ INTEGER au format binaire COPY"""
+    return struct.pack('!ii', 4, int(value))
+
+
+def _categories(df):
+    return df['category'].fillna('Unknown') if 'category' in df else ['Unknown'] * len(df)
+
+
+def iter_document_rows(df):
+    """Génère les lignes de la table des documents au format binaire COPY"""
+    field_count = struct.pack('!h', len(DOCUMENT_COLUMNS))
+    source = _encode_text_field('MedQuAD')
+    columns = zip(document_ids(df), df['question'], df['answer'],
+                  df['combined_text'], _categories(df))
     
-    # Vérifier fichiers
-    csv_path = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    yield PGCOPY_HEADER
+    for doc_id, question, answer, combined_text, category in columns:
+        category_field = _encode_text_field(category)
+        yield b''.join((
+            field_count,
+            _encode_int_field(doc_id),
+            _encode_text_field(question),
+            _encode_text_field(answer),
+            _encode_text_field(combined_text),
+            category_field,
+            category_field,  # qtype = category
+            source
+        ))
+    yield PGCOPY_TRAILER
+
+
+def iter_embedding_rows(df, embeddings):
+    """
+    Génère les lignes d'une table d'embeddings au format binaire COPY
+    
+    Les vecteurs sont écrits au format binaire de pgvector
+    (int16 dim, int16 réservé, float4 big-endian) directement depuis le
+    buffer NumPy, sans passer par des floats Python.
+    """
+    vectors = np.ascontiguousarray(embeddings, dtype='>f4')
+    dim = vectors.shape[1]
+    vector_header = struct.pack('!ihh', 4 + 4 * dim, dim, 0)
+    field_count = struct.pack('!h', len(EMBEDDING_COLUMNS))
+    
+    yield PGCOPY_HEADER
+    for idx, (doc_id, category) in enumerate(zip(document_ids(df), _categories(df))):
+        yield b''.join((
+            field_count,
+            _encode_int_field(doc_id),
+            _encode_text_field(category),
+            vector_header,
+            vectors[idx].tobytes()
+        ))
+    yield PGCOPY_TRAILER
+
+
+class CopyStream:
+    """Objet "fichier" minimal alimenté par un générateur, pour copy_expert"""
+    
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+    
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            try:
+                self._buffer += next(self._chunks)
+            except StopIteration:
+                break
+        if size < 0 or size > len(self._buffer):
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+    
+    readline = read
+
+
+def _copy(conn, table_name, columns, rows):
+    cursor = conn.cursor()
+    cursor.copy_expert(
+        f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT binary)",
+        CopyStream(rows),
+        size=1 << 20
+    )
+    conn.commit()
+    cursor.close()
+
+
+def copy_documents(conn, df):
+    """Charge les documents via COPY binaire (une seule transaction)"""
+    print(f"\n💾 COPY dans: {Config.DOCUMENTS_TABLE}")
+    start = time.time()
+    _copy(conn, Config.DOCUMENTS_TABLE, DOCUMENT_COLUMNS, iter_document_rows(df))
+    return _report("copiées", len(df), start)
+
+
+def copy_data(conn, Config, df, embeddings):
+    """Charge les embeddings d'un modèle via COPY binaire (une seule transaction)"""
+    print(f"\n💾 COPY dans: {Config.TABLE_NAME}")
+    start = time.time()
+    _copy(conn, Config.TABLE_NAME, EMBEDDING_COLUMNS, iter_embedding_rows(df, embeddings))
+    return _report("copiées", len(df), start)
+
+
+# loader -> (documents, embeddings)
+LOADERS = {
+    'batch': (insert_documents, insert_data),
+    'copy': (copy_documents, copy_data)
+}
+
+
+def load_documents_table(df, loader='copy'):
+    """Crée et remplit la table des documents"""
+    conn = connect()
+    try:
+        create_documents_table(conn)
+        elapsed = LOADERS[loader][0](conn, df)
+        finalize_documents_table(conn)
+    finally:
+        conn.close()
+    return elapsed
+
+
+def load_model_table(model_config, df, embeddings, loader='copy', index_options=None):
+    """
+    Crée et remplit la table d'un modèle avec sa propre connexion,
+    puis construit l'index vectoriel sur les données chargées
+    
+    Returns:
+        (temps de chargement, description de l'index construit)
+    """
+    conn = connect()
+    try:
+        create_table(conn, model_config)
+        elapsed = LOADERS[loader][1](conn, model_config, df, embeddings)
+        add_embedding_hash_column(conn, model_config.TABLE_NAME)
+        index_info = build_vector_index(conn, model_config.TABLE_NAME, **(index_options or {}))
+    finally:
+        conn.close()
+    return elapsed, index_info
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Insertion des 2 modèles dans PostgreSQL")
+    parser.add_argument('--loader', choices=sorted(LOADERS), default='copy',
+                        help="copy: COPY binaire (rapide), batch: execute_batch (historique)")
+    parser.add_argument('--parallel', action='store_true',
+                        help="Charger les 2 tables en même temps (une connexion par table)")
+    parser.add_argument('--index', choices=INDEX_METHODS, default=Config.VECTOR_INDEX_METHOD,
+                        help="Type d'index vectoriel construit après le chargement")
+    parser.add_argument('--lists', type=int, help="IVFFlat: nombre de listes (défaut: rows/1000)")
+    parser.add_argument('--m', type=int, help="HNSW: connexions par nœud")
+    parser.add_argument('--ef-construction', type=int, help="HNSW: taille de la liste de construction")
+    parser.add_argument('--migrate-text-search', action='store_true',
+                        help="Ajouter seulement la colonne tsvector + index GIN à la table des documents")
+    parser.add_argument('--migrate-answer-preview', action='store_true',
+                        help="Ajouter seulement la colonne answer_preview à la table des documents")
+    parser.add_argument('--migrate-content-hash', action='store_true',
+                        help="Ajouter seulement la colonne content_hash aux tables des documents et des modèles")
+    args = parser.parse_args()
     
-    if not os.path.exists(csv_path):
-        print(f"❌ CSV non trouvé: {csv_path}")
+    if args.migrate_text_search:
+        conn = connect()
+        try:
+            add_search_vector_column(conn, Config.DOCUMENTS_TABLE)
+        finally:
+            conn.close()
         return
     
-    if not os.path.exists(Model1Config.EMBEDDINGS_FILE):
-        print(f"❌ Embeddings modèle 1 non trouvés")
-        print(f"💡 Lance: python generate_dual_embeddings.py")
+    if args.migrate_answer_preview:
+        conn = connect()
+        try:
+            add_answer_preview_column(conn, Config.DOCUMENTS_TABLE)
+        finally:
+            conn.close()
         return
     
-    if not os.path.exists(Model2Config.EMBEDDINGS_FILE):
-        print(f"❌ Embeddings modèle 2 non trouvés")
-        print(f"💡 Lance: python generate_dual_embeddings.py")
+    if args.migrate_content_hash:
+        conn = connect()
+        try:
+            add_content_hash_column(conn, Config.DOCUMENTS_TABLE)
+            for model_config in (Model1Config, Model2Config):
+                add_embedding_hash_column(conn, model_config.TABLE_NAME)
+        finally:
+            conn.close()
         return
     
+    index_options = {
+        'method': args.index,
+        'lists': args.lists,
+        'm': args.m,
+        'ef_construction': args.ef_construction
+    }
+    
+    print("="*70)
+    print("💾 INSERTION DES 2 MODÈLES DANS POSTGRESQL")
+    print("="*70)
+    
+    # Artefact Arrow (textes et vecteurs alignés par construction), sinon CSV + .npy
+    use_artifact = all(has_embeddings(model_config) for model_config in (Model1Config, Model2Config))
+    csv_path = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    
+    if not use_artifact:
+        if not os.path.exists(csv_path):
+            print(f"❌ CSV non trouvé: {csv_path}")
+            return
+        
+        if not os.path.exists(Model1Config.EMBEDDINGS_FILE):
+            print(f"❌ Embeddings modèle 1 non trouvés")
+            print(f"💡 Lance: python generate_dual_embeddings.py")
+            return
+        
+        if not os.path.exists(Model2Config.EMBEDDINGS_FILE):
+            print(f"❌ Embeddings modèle 2 non trouvés")
+            print(f"💡 Lance: python generate_dual_embeddings.py")
+            return
+    
     # Charger données
     print(f"\n📂 Chargement des données...")
-    df = pd.read_csv(csv_path)
-    emb1 = np.load(Model1Config.EMBEDDINGS_FILE)
-    emb2 = np.load(Model2Config.EMBEDDINGS_FILE)
+    if use_artifact:
+        # Colonnes utiles seulement; les embeddings sont des vues sur le fichier mappé
+        df = read_columns(['id', 'question', 'answer', 'combined_text', 'category'])
+        emb1 = read_embeddings(Model1Config)
+        emb2 = read_embeddings(Model2Config)
+        print(f"   ✅ Artefact: {Config.ARTIFACT_FILE}")
+    else:
+        df = pd.read_csv(csv_path)
+        emb1 = np.load(Model1Config.EMBEDDINGS_FILE)
+        emb2 = np.load(Model2Config.EMBEDDINGS_FILE)
     
-    print(f"   ✅ CSV: {len(df)} documents")
+    print(f"   ✅ Documents: {len(df)}")
     print(f"   ✅ Embeddings 1: {emb1.shape}")
     print(f"   ✅ Embeddings 2: {emb2.shape}")
-    
-    # Connexion
-    print(f"\n🔌 Connexion PostgreSQL...")
-    conn = psycopg2.connect(
-        host=Config.DB_HOST,
-        port=Config.DB_PORT,
-        database=Config.DB_NAME,
-        user=Config.DB_USER,
-        password=Config.DB_PASSWORD
-    )
+    print(f"   ⚙️  Loader: {args.loader}{' (parallèle)' if args.parallel else ''}")
     
     # Activer pgvector
-    cursor = conn.cursor()
-    cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
-    conn.commit()
-    cursor.close()
-    
+    print(f"\n🔌 Connexion PostgreSQL...")
+    conn = connect()
     try:
-        # Modèle 1
-        print(f"\n{'#'*70}")
-        print(f"# MODÈLE 1: {Model1Config.NAME}")
-        print(f"{'#'*70}")
-        create_table(conn, Model1Config)
-        insert_data(conn, Model1Config, df, emb1)
-        
-        # Modèle 2
-        print(f"\n{'#'*70}")
-        print(f"# MODÈLE 2: {Model2Config.NAME}")
-        print(f"{'#'*70}")
-        create_table(conn, Model2Config)
-        insert_data(conn, Model2Config, df, emb2)
-        
-        print(f"\n{'='*70}")
-        print("🎉 INSERTION TERMINÉE!")
-        print("="*70)
-        print(f"\n✅ Les 2 modèles sont prêts pour comparaison!")
-        print(f"\n📊 Tables créées:")
-        print(f"   - {Model1Config.TABLE_NAME}")
-        print(f"   - {Model2Config.TABLE_NAME}")
-        
+        cursor = conn.cursor()
+        cursor.execute("CREATE EXTENSION IF NOT EXISTS vector;")
+        conn.commit()
+        cursor.close()
     finally:
         conn.close()
+    
+    jobs = [(Model1Config, emb1), (Model2Config, emb2)]
+    start = time.time()
+    
+    # Le texte n'est chargé qu'une fois: les tables d'embeddings le référencent
+    print(f"\n{'#'*70}")
+    print(f"# DOCUMENTS")
+    print(f"{'#'*70}")
+    documents_time = load_documents_table(df, args.loader)
+    
+    if args.parallel:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [
+                executor.submit(load_model_table, model_config, df, embeddings,
+                                args.loader, index_options)
+                for model_config, embeddings in jobs
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = []
+        for i, (model_config, embeddings) in enumerate(jobs, 1):
+            print(f"\n{'#'*70}")
+            print(f"# MODÈLE {i}: {model_config.NAME}")
+            print(f"{'#'*70}")
+            results.append(load_model_table(model_config, df, embeddings,
+                                            args.loader, index_options))
+    
+    total_time = time.time() - start
+    
+    print(f"\n{'='*70}")
+    print("🎉 INSERTION TERMINÉE!")
+    print("="*70)
+    print(f"\n✅ Les 2 modèles sont prêts pour comparaison!")
+    print(f"\n📊 Tables créées:")
+    print(f"   - {Config.DOCUMENTS_TABLE}: {documents_time:.1f}s "
+          f"({len(df) / documents_time:.0f} lignes/sec)")
+    for (model_config, _), (elapsed, index_info) in zip(jobs, results):
+        print(f"   - {model_config.TABLE_NAME}: {elapsed:.1f}s ({len(df) / elapsed:.0f} lignes/sec)")
+        print(f"     index {index_info['method']} {index_info['params']}: "
+              f"{index_info['build_time']:.1f}s")
+    print(f"\n⏱️  Total ({args.loader}): {total_time:.1f}s "
+          f"({len(df) * (len(jobs) + 1) / total_time:.0f} lignes/sec)")
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
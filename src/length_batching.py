@@ -0,0 +1,204 @@
+"""
+Lots de longueurs voisines sous budget de tokens
+
+encode(texts, batch_size=32) forme des lots de taille fixe et complète
+chaque lot jusqu'à son texte le plus long: dans MedQuAD (de quelques mots
+à plusieurs milliers de caractères), l'essentiel du calcul part dans le
+padding. Ici les textes sont triés par nombre de tokens puis regroupés
+sous un budget lignes × longueur maximale du lot: beaucoup de textes
+courts par lot, peu de textes longs. La sortie est remise dans l'ordre
+d'origine.
+"""
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from tqdm import tqdm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+def token_lengths(model, texts: Sequence[str]) -> np.ndarray:
+    """
+    Nombre de tokens de chaque texte (tokens spéciaux compris, tronqué à max_seq_length)
+
+    Args:
+        model: SentenceTransformer (tokenizer transformers) ou OnnxEncoder (tokenizers)
+        texts: Textes à mesurer
+
+    Returns:
+        Longueurs (int) dans l'ordre des textes
+    """
+    tokenizer = getattr(model, 'tokenizer', None)
+    max_length = getattr(model, 'max_seq_length', None)
+    if hasattr(tokenizer, 'encode_batch'):
+        # tokenizers (OnnxEncoder): padding activé, on compte le masque d'attention
+        lengths = [sum(encoding.attention_mask) for encoding in tokenizer.encode_batch(list(texts))]
+    elif tokenizer is not None:
+        lengths = [len(ids) for ids in tokenizer(
+            list(texts), add_special_tokens=True, truncation=max_length is not None, max_length=max_length
+        )['input_ids']]
+    else:
+        # Encodeur sans tokenizer exposé: approximation par les mots
+        lengths = [len(text.split()) + 2 for text in texts]
+    lengths = np.asarray(lengths, dtype=np.int64)
+    return np.minimum(lengths, max_length) if max_length else lengths
+
+
+def plan_batches(lengths: np.ndarray, max_tokens: int, max_batch_size: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Regroupe les indices par longueur décroissante sous un budget de tokens
+
+    Le coût d'un lot est len(lot) × longueur de son plus long texte
+    (taille du tenseur paddé). Les lots les plus longs passent en premier:
+    une erreur mémoire apparaît tout de suite, pas en fin de corpus.
+
+    Args:
+        lengths: Nombre de tokens par texte
+        max_tokens: Budget de tokens paddés par lot
+        max_batch_size: Nombre maximum de textes par lot (optionnel)
+
+    Returns:
+        Liste de tableaux d'indices (un par lot)
+    """
+    order = np.argsort(-lengths, kind='stable')
+    batches = []
+    start = 0
+    while start < len(order):
+        longest = max(int(lengths[order[start]]), 1)
+        size = max(1, max_tokens // longest)
+        if max_batch_size:
+            size = min(size, max_batch_size)
+        batches.append(order[start:start + size])
+        start += size
+    return batches
+
+
+def padded_tokens(lengths: np.ndarray, batches: Sequence[np.ndarray]) -> int:
+    """Tokens effectivement calculés (chaque lot paddé à son plus long texte)"""
+    return int(sum(len(batch) * lengths[batch].max() for batch in batches if len(batch)))
+
+
+def fixed_batches(n: int, batch_size: int, order: Optional[np.ndarray] = None) -> List[np.ndarray]:
+    """Lots de taille fixe (dans l'ordre donné, par défaut l'ordre d'origine)"""
+    order = np.arange(n) if order is None else order
+    return [order[start:start + batch_size] for start in range(0, n, batch_size)]
+
+
+def padding_report(texts: Sequence[str], lengths: np.ndarray, batches: Sequence[np.ndarray],
+                   batch_size: int) -> Dict:
+    """
+    Padding des lots planifiés comparé aux lots de taille fixe
+
+    Deux références: l'ordre d'origine, et le tri par nombre de caractères
+    que SentenceTransformer.encode applique déjà avant de découper.
+
+    Returns:
+        tokens réels, tokens paddés (planifiés / fixes / fixes triés par caractères),
+        fraction du padding supprimée par rapport à chaque référence
+    """
+    real = int(lengths.sum())
+    planned = padded_tokens(lengths, batches)
+    fixed = padded_tokens(lengths, fixed_batches(len(lengths), batch_size))
+    by_chars = np.argsort([-len(text) for text in texts], kind='stable')
+    fixed_sorted = padded_tokens(lengths, fixed_batches(len(lengths), batch_size, by_chars))
+
+    def removed(reference):
+        waste = reference - real
+        return (reference - planned) / waste if waste > 0 else 0.0
+
+    return {
+        'real_tokens': real,
+        'padded_tokens': planned,
+        'fixed_padded_tokens': fixed,
+        'fixed_sorted_padded_tokens': fixed_sorted,
+        'padding_removed': removed(fixed),
+        'padding_removed_vs_sorted': removed(fixed_sorted)
+    }
+
+
+def encode_length_bucketed(model, texts: Sequence[str], max_tokens: Optional[int] = None,
+                           max_batch_size: Optional[int] = None, batch_size: int = 32,
+                           normalize_embeddings: bool = True,
+                           show_progress_bar: bool = False) -> Tuple[np.ndarray, Dict]:
+    """
+    Encode des textes par lots de longueurs voisines, sortie dans l'ordre d'origine
+
+    Args:
+        model: Encodeur exposant encode() (SentenceTransformer, OnnxEncoder...)
+        texts: Textes à encoder
+        max_tokens: Budget de tokens paddés par lot (défaut: Config.EMBEDDING_TOKEN_BUDGET)
+        max_batch_size: Textes maximum par lot (défaut: Config.EMBEDDING_MAX_BATCH_SIZE)
+        batch_size: Taille fixe de référence pour le rapport de padding
+        normalize_embeddings: Normaliser L2 les vecteurs
+        show_progress_bar: Barre de progression par lot
+
+    Returns:
+        (embeddings, statistiques: padding, tokens/sec, docs/sec, nombre de lots)
+    """
+    texts = list(texts)
+    max_tokens = max_tokens or Config.EMBEDDING_TOKEN_BUDGET
+    max_batch_size = max_batch_size or Config.EMBEDDING_MAX_BATCH_SIZE
+
+    lengths = token_lengths(model, texts)
+    batches = plan_batches(lengths, max_tokens, max_batch_size)
+    stats = padding_report(texts, lengths, batches, batch_size)
+
+    start = time.time()
+    embeddings = None
+    for batch in tqdm(batches, desc="Lots", unit="lot", disable=not show_progress_bar):
+        batch_embeddings = model.encode(
+            [texts[i] for i in batch],
+            batch_size=len(batch),
+            show_progress_bar=False,
+            convert_to_numpy=True,
+            normalize_embeddings=normalize_embeddings
+        )
+        if embeddings is None:
+            embeddings = np.empty((len(texts), batch_embeddings.shape[1]), dtype=np.float32)
+        embeddings[batch] = batch_embeddings
+    seconds = time.time() - start
+
+    if embeddings is None:
+        dim = model.get_sentence_embedding_dimension()
+        embeddings = np.zeros((0, dim), dtype=np.float32)
+
+    stats.update({
+        'batches': len(batches),
+        'seconds': seconds,
+        'tokens_per_sec': stats['real_tokens'] / seconds if seconds else 0.0,
+        'docs_per_sec': len(texts) / seconds if seconds else 0.0
+    })
+    return embeddings, stats
+
+
+def combine_padding_stats(all_stats: Sequence[Dict]) -> Dict:
+    """Cumule les statistiques de plusieurs appels (génération par blocs)"""
+    totals = {key: sum(stats[key] for stats in all_stats)
+              for key in ('real_tokens', 'padded_tokens', 'fixed_padded_tokens',
+                          'fixed_sorted_padded_tokens', 'batches', 'seconds')}
+    docs = sum(stats['docs_per_sec'] * stats['seconds'] for stats in all_stats)
+    real = totals['real_tokens']
+
+    def removed(reference):
+        waste = totals[reference] - real
+        return (totals[reference] - totals['padded_tokens']) / waste if waste > 0 else 0.0
+
+    seconds = totals['seconds']
+    totals.update({
+        'padding_removed': removed('fixed_padded_tokens'),
+        'padding_removed_vs_sorted': removed('fixed_sorted_padded_tokens'),
+        'tokens_per_sec': real / seconds if seconds else 0.0,
+        'docs_per_sec': docs / seconds if seconds else 0.0
+    })
+    return totals
+
+
+def print_padding_stats(stats: Dict):
+    """Résumé lisible de encode_length_bucketed"""
+    print(f"   📦 {stats['batches']} lots, {stats['real_tokens']} tokens réels, "
+          f"{stats['padded_tokens']} calculés (taille fixe: {stats['fixed_padded_tokens']})")
+    print(f"   ✂️  Padding supprimé: {stats['padding_removed']:.1%} "
+          f"({stats['padding_removed_vs_sorted']:.1%} vs lots fixes triés par caractères)")
+    print(f"   ⚡ {stats['tokens_per_sec']:.0f} tokens/sec, {stats['docs_per_sec']:.1f} docs/sec")
@@ -0,0 +1,139 @@
+"""
+Encodage des requêtes par micro-lots
+
+Les sessions concurrentes encodent chacune une seule requête: au lieu de
+N passes avant de taille 1, les requêtes arrivées pendant quelques
+millisecondes sont regroupées en un seul appel encode() (padding au sein
+du lot) et chaque appelant récupère son vecteur via un Future.
+"""
+import os
+import queue
+import sys
+import threading
+import time
+import numpy as np
+from collections import Counter
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Union
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+_STOP = object()
+
+
+class MicroBatchEncoder:
+    """
+    File d'attente + thread de travail devant un encodeur (un par modèle)
+
+    Expose encode() comme SentenceTransformer: il peut remplacer le modèle
+    partout (cache d'embeddings compris). Seuls les textes isolés passent
+    par la file; une liste est déjà un lot et va directement au modèle.
+    """
+
+    def __init__(self, model, max_batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None,
+                 name: str = 'encoder'):
+        """
+        Args:
+            model: Encodeur sous-jacent (SentenceTransformer, OnnxEncoder...)
+            max_batch_size: Taille maximum d'un lot (défaut: Config.MICROBATCH_MAX_SIZE)
+            max_wait_ms: Attente maximum après la première requête d'un lot
+                         (défaut: Config.MICROBATCH_MAX_WAIT_MS, 0 = pas d'attente)
+            name: Nom du thread de travail
+        """
+        self.model = model
+        self.max_batch_size = max_batch_size or Config.MICROBATCH_MAX_SIZE
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else Config.MICROBATCH_MAX_WAIT_MS) / 1000
+        # Même clé de cache que l'encodeur sous-jacent
+        self.cache_suffix = getattr(model, 'cache_suffix', '')
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self.batch_sizes: Counter = Counter()
+        self.queue_depths: Counter = Counter()
+        self.requests = 0
+
+        self._worker = threading.Thread(target=self._run, name=f'microbatch-{name}', daemon=True)
+        self._worker.start()
+
+    def submit(self, text: str) -> Future:
+        """Met une requête en file et retourne le Future de son vecteur"""
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Encode une requête (via la file) ou une liste (directement)
+
+        Returns:
+            Vecteur (texte seul) ou matrice, comme le modèle sous-jacent
+        """
+        if isinstance(sentences, str):
+            return self.submit(sentences).result()
+        return self.model.encode(sentences, batch_size=batch_size, convert_to_numpy=True)
+
+    def _collect(self, first) -> List:
+        """Regroupe les requêtes jusqu'à max_batch_size ou l'échéance"""
+        batch = [first]
+        deadline = time.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)  # traité au tour suivant, après ce lot
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            # Profondeur de la file à l'ouverture du lot (requête courante comprise)
+            depth = self._queue.qsize() + 1
+            batch = self._collect(first)
+
+            # Requêtes identiques dans le même lot: un seul encodage
+            texts = list(dict.fromkeys(text for text, _ in batch))
+            try:
+                embeddings = self.model.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+                by_text = dict(zip(texts, embeddings))
+                for text, future in batch:
+                    future.set_result(by_text[text])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+            with self._lock:
+                self.requests += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self.queue_depths[depth] += 1
+
+    def stats(self) -> Dict:
+        """
+        Métriques du micro-batching
+
+        Returns:
+            requêtes, lots, taille moyenne, profondeur actuelle de la file,
+            histogrammes {taille de lot: nombre} et {profondeur de la file à l'ouverture d'un lot: nombre}
+        """
+        with self._lock:
+            batches = sum(self.batch_sizes.values())
+            return {
+                'requests': self.requests,
+                'batches': batches,
+                'mean_batch_size': self.requests / batches if batches else 0.0,
+                'queue_depth': self._queue.qsize(),
+                'batch_size_histogram': dict(sorted(self.batch_sizes.items())),
+                'queue_depth_histogram': dict(sorted(self.queue_depths.items()))
+            }
+
+    def close(self):
+        """Arrête le thread de travail après les requêtes déjà en file"""
+        self._queue.put(_STOP)
+        self._worker.join()
@@ -0,0 +1,150 @@
+"""
+Registre des modèles d'embeddings chargés à la demande
+
+Chaque encodeur (clé = classe Model1Config / Model2Config) n'est chargé
+qu'à sa première utilisation: un mode qui n'en a pas besoin (recherche
+par mots-clés) n'importe jamais sentence_transformers / torch.
+"""
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+
+
+class ModelRegistry:
+    """
+    Chargement paresseux et thread-safe des encodeurs
+
+    Deux threads qui demandent le même modèle en même temps attendent
+    le même chargement (verrou par modèle); des modèles différents se
+    chargent en parallèle.
+    """
+
+    def __init__(self):
+        self._models: Dict[type, object] = {}
+        self._batchers: Dict[type, object] = {}
+        self._model_locks: Dict[type, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.load_times: Dict[str, float] = {}
+
+    def _load(self, model_config):
+        """
+        Instancie l'encodeur d'un modèle selon Config.ENCODER_BACKEND
+        (torch ou ONNX Runtime: l'import du backend n'a lieu qu'ici)
+        """
+        from src.onnx_encoder import load_encoder
+        return load_encoder(model_config)
+
+    def _model_lock(self, model_config) -> threading.Lock:
+        with self._lock:
+            return self._model_locks.setdefault(model_config, threading.Lock())
+
+    def get(self, model_config):
+        """
+        Encodeur d'un modèle, chargé au premier appel
+
+        Args:
+            model_config: Classe de configuration du modèle (Model1Config, Model2Config...)
+
+        Returns:
+            Encodeur exposant encode() (SentenceTransformer ou OnnxEncoder)
+        """
+        model = self._models.get(model_config)
+        if model is not None:
+            return model
+
+        with self._model_lock(model_config):
+            model = self._models.get(model_config)
+            if model is None:
+                print(f"   📦 Chargement du modèle: {model_config.NAME} ({Config.ENCODER_BACKEND})")
+                start = time.time()
+                model = self._load(model_config)
+                self.load_times[model_config.NAME] = time.time() - start
+                self._models[model_config] = model
+        return model
+
+    def get_batcher(self, model_config):
+        """
+        Encodeur à micro-lots d'un modèle (un par modèle, créé au premier appel)
+
+        Les requêtes isolées de sessions concurrentes sont regroupées
+        en un seul appel encode() (voir src/micro_batcher.py).
+        """
+        batcher = self._batchers.get(model_config)
+        if batcher is not None:
+            return batcher
+
+        from src.micro_batcher import MicroBatchEncoder
+
+        model = self.get(model_config)
+        with self._model_lock(model_config):
+            batcher = self._batchers.get(model_config)
+            if batcher is None:
+                batcher = MicroBatchEncoder(model, name=model_config.NAME)
+                self._batchers[model_config] = batcher
+        return batcher
+
+    def batcher_stats(self) -> Dict[str, Dict]:
+        """Métriques de micro-batching par modèle"""
+        return {
+            model_config.NAME: batcher.stats()
+            for model_config, batcher in list(self._batchers.items())
+        }
+
+    def is_loaded(self, model_config) -> bool:
+        return model_config in self._models
+
+    def loaded(self) -> List[str]:
+        """Noms des modèles déjà chargés"""
+        return [model_config.NAME for model_config in list(self._models)]
+
+    def warm_up(self, model_configs: Iterable, background: bool = True) -> Optional[threading.Thread]:
+        """
+        Précharge des modèles (par défaut dans un thread en arrière-plan)
+
+        Args:
+            model_configs: Modèles à charger
+            background: False = chargement bloquant
+
+        Returns:
+            Le thread de préchargement (None si background=False)
+        """
+        model_configs = list(model_configs)
+
+        def load_all():
+            for model_config in model_configs:
+                try:
+                    self.get(model_config)
+                except Exception as e:
+                    # Le préchargement est optionnel: l'erreur réapparaîtra au premier usage
+                    print(f"   ⚠️  Préchargement impossible ({model_config.NAME}): {e}")
+
+        if not background:
+            load_all()
+            return None
+
+        thread = threading.Thread(target=load_all, name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+
+_default_registry: Optional[ModelRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Registre partagé par le processus"""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = ModelRegistry()
+    return _default_registry
+
+
+def get_model(model_config):
+    """Raccourci: encodeur d'un modèle via le registre partagé"""
+    return get_model_registry().get(model_config)
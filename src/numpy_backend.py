@@ -0,0 +1,177 @@
+"""
+Backend de recherche exacte en mémoire (NumPy)
+Utilise directement l'artefact Arrow (ou les fichiers .npy) générés par
+generate_dual_embeddings.py au lieu d'interroger pgvector
+"""
+import os
+import sys
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from src.artifacts import has_embeddings, read_columns, read_embeddings
+
+
+class NumpyBackend:
+    """
+    Recherche exacte par produit scalaire sur une matrice float32 mappée en mémoire
+
+    Les embeddings étant normalisés L2, le produit scalaire est égal à la
+    similarité cosinus. Les métadonnées sont stockées dans des tableaux
+    alignés sur les lignes de la matrice (catégories encodées en entiers).
+    """
+
+    def __init__(self, embeddings_file: str, metadata_csv: str):
+        """
+        Args:
+            embeddings_file: Fichier .npy des embeddings (normalisés)
+            metadata_csv: CSV prétraité aligné ligne à ligne avec les embeddings
+        """
+        self._load(np.load(embeddings_file, mmap_mode='r'), pd.read_csv(metadata_csv))
+
+    def _load(self, embeddings: np.ndarray, df: pd.DataFrame):
+        if embeddings.dtype != np.float32:
+            embeddings = embeddings.astype(np.float32)
+        self.embeddings = embeddings
+
+        if len(df) != len(self.embeddings):
+            raise ValueError(
+                f"Métadonnées ({len(df)} lignes) et embeddings "
+                f"({len(self.embeddings)} lignes) non alignés"
+            )
+
+        # Mêmes identifiants que la table des documents (colonne 'id' du CSV)
+        if 'id' in df:
+            self.ids = df['id'].to_numpy(dtype=np.int64)
+        else:
+            self.ids = np.arange(len(df), dtype=np.int64)
+        self.questions = df['question'].to_numpy(dtype=object)
+        self.answers = df['answer'].to_numpy(dtype=object)
+
+        categories = pd.Categorical(df['category'].fillna('Unknown'))
+        self.category_names = np.asarray(categories.categories, dtype=object)
+        self.category_codes = categories.codes.astype(np.int16)
+        self._category_index = {name: code for code, name in enumerate(self.category_names)}
+        self._category_rows: Dict[int, np.ndarray] = {}
+
+    @classmethod
+    def from_artifact(cls, model_config, path: Optional[str] = None):
+        """
+        Crée le backend depuis l'artefact Arrow: seules les colonnes utiles
+        sont lues, la matrice reste mappée sur le fichier
+        """
+        backend = cls.__new__(cls)
+        backend._load(read_embeddings(model_config, path),
+                      read_columns(['id', 'question', 'answer', 'category'], path))
+        return backend
+
+    @classmethod
+    def from_model_config(cls, model_config, metadata_csv: Optional[str] = None):
+        """Crée le backend pour Model1Config / Model2Config (artefact Arrow s'il contient le modèle)"""
+        if metadata_csv is None and has_embeddings(model_config):
+            return cls.from_artifact(model_config)
+        if metadata_csv is None:
+            metadata_csv = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+        return cls(model_config.EMBEDDINGS_FILE, metadata_csv)
+
+    def __len__(self):
+        return len(self.embeddings)
+
+    def _rows_for_category(self, category: str) -> Optional[np.ndarray]:
+        """Indices des lignes d'une catégorie (None si catégorie inconnue)"""
+        code = self._category_index.get(category)
+        if code is None:
+            return None
+        if code not in self._category_rows:
+            self._category_rows[code] = np.flatnonzero(self.category_codes == code)
+        return self._category_rows[code]
+
+    def _top_k(self, scores: np.ndarray, top_k: int, min_similarity: float) -> np.ndarray:
+        """Indices des top_k meilleurs scores (triés) au-dessus du seuil"""
+        k = min(top_k, len(scores))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return top[scores[top] >= min_similarity]
+
+    def _format_rows(self, indices: np.ndarray, scores: np.ndarray) -> List[Tuple]:
+        """Lignes au format SQL: (id, question, answer, category, qtype, similarity)"""
+        rows = []
+        for idx, score in zip(indices, scores):
+            category = self.category_names[self.category_codes[idx]]
+            rows.append((
+                int(self.ids[idx]),
+                self.questions[idx],
+                self.answers[idx],
+                category,
+                category,  # qtype = category
+                float(score)
+            ))
+        return rows
+
+    def search(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int = 5,
+        category_filter: Optional[str] = None,
+        min_similarity: float = 0.0
+    ) -> List[Tuple]:
+        """
+        Recherche les top_k documents les plus proches d'un vecteur requête
+
+        Args:
+            query_embedding: Vecteur requête normalisé
+            top_k: Nombre de résultats
+            category_filter: Filtrer par catégorie (optionnel)
+            min_similarity: Seuil minimum de similarité
+
+        Returns:
+            Liste de tuples (id, question, answer, category, qtype, similarity)
+        """
+        query = np.asarray(query_embedding, dtype=np.float32)
+
+        if category_filter:
+            rows = self._rows_for_category(category_filter)
+            if rows is None:
+                return []
+            scores = self.embeddings[rows] @ query
+        else:
+            rows = None
+            scores = self.embeddings @ query
+
+        top = self._top_k(scores, top_k, min_similarity)
+        indices = rows[top] if rows is not None else top
+        return self._format_rows(indices, scores[top])
+
+    def search_many(
+        self,
+        query_embeddings: np.ndarray,
+        top_k: int = 5,
+        category_filter: Optional[str] = None,
+        min_similarity: float = 0.0
+    ) -> List[List[Tuple]]:
+        """
+        Recherche par lot: un seul produit matriciel pour toutes les requêtes
+
+        Returns:
+            Une liste de résultats (voir search) par requête
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+
+        if category_filter:
+            rows = self._rows_for_category(category_filter)
+            if rows is None:
+                return [[] for _ in range(len(queries))]
+            scores = queries @ self.embeddings[rows].T
+        else:
+            rows = None
+            scores = queries @ self.embeddings.T
+
+        all_results = []
+        for query_scores in scores:
+            top = self._top_k(query_scores, top_k, min_similarity)
+            indices = rows[top] if rows is not None else top
+            all_results.append(self._format_rows(indices, query_scores[top]))
+        return all_results
@@ -0,0 +1,341 @@
+"""
+Encodeur ONNX Runtime pour les requêtes (CPU)
+- export de chaque modèle configuré vers ONNX (+ quantification int8 dynamique optionnelle)
+- OnnxEncoder: même interface encode() que SentenceTransformer, sans torch
+- vérification de parité des scores cosinus avec le chemin PyTorch
+
+Usage:
+    python src/onnx_encoder.py export --model all --quantize
+    python src/onnx_encoder.py parity --model pubmed --int8
+"""
+import argparse
+import json
+import os
+import sys
+import numpy as np
+from typing import Dict, List, Optional, Union
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config, Model2Config
+
+
+MODELS = {'minilm': Model1Config, 'pubmed': Model2Config}
+
+ONNX_FILE = 'model.onnx'
+ONNX_INT8_FILE = 'model.int8.onnx'
+METADATA_FILE = 'encoder.json'
+TOKENIZER_FILE = 'tokenizer.json'
+
+# Écart maximum toléré des scores cosinus PyTorch vs ONNX (fp32 / int8)
+PARITY_TOLERANCE = 1e-3
+PARITY_TOLERANCE_INT8 = 0.05
+
+
+def model_dir_for(model_config, onnx_dir: Optional[str] = None) -> str:
+    """Dossier de l'export ONNX d'un modèle"""
+    return os.path.join(onnx_dir or Config.ONNX_DIR, model_config.NAME.replace('/', '__'))
+
+
+def export_onnx(model_config, onnx_dir: Optional[str] = None, quantize: bool = False, opset: int = 17) -> str:
+    """
+    Exporte le transformer d'un modèle SentenceTransformer vers ONNX
+
+    Le pooling et la normalisation ne sont pas dans le graphe: ils sont
+    décrits dans encoder.json et appliqués par OnnxEncoder (NumPy).
+
+    Args:
+        model_config: Classe de configuration du modèle
+        onnx_dir: Dossier racine des exports (défaut: Config.ONNX_DIR)
+        quantize: Produire aussi model.int8.onnx (poids int8, quantification dynamique)
+        opset: Version d'opset ONNX
+
+    Returns:
+        Dossier de l'export
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    output_dir = model_dir_for(model_config, onnx_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"\n📦 Export ONNX: {model_config.NAME}")
+    model = SentenceTransformer(model_config.NAME, device='cpu')
+    transformer = model[0].auto_model.eval()
+    tokenizer = model.tokenizer
+
+    sample = tokenizer(["What are the symptoms of diabetes?"], return_tensors='pt')
+    input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+
+    class LastHiddenState(torch.nn.Module):
+        """Sortie unique last_hidden_state (le pooling est fait hors du graphe)"""
+
+        def __init__(self, module):
+            super().__init__()
+            self.module = module
+
+        def forward(self, *inputs):
+            return self.module(**dict(zip(input_names, inputs))).last_hidden_state
+
+    dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+    dynamic_axes['last_hidden_state'] = {0: 'batch', 1: 'sequence'}
+
+    onnx_path = os.path.join(output_dir, ONNX_FILE)
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(transformer),
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=['last_hidden_state'],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            dynamo=False
+        )
+    print(f"   ✅ {onnx_path} ({os.path.getsize(onnx_path) / 1e6:.0f} Mo)")
+
+    # Tokenizer "fast" (tokenizer.json) + description du pooling
+    tokenizer.save_pretrained(output_dir)
+    pooling = next((module for module in model if type(module).__name__ == 'Pooling'), None)
+    metadata = {
+        'model': model_config.NAME,
+        'dimensions': model.get_sentence_embedding_dimension(),
+        'max_seq_length': model.max_seq_length,
+        'pooling': 'cls' if getattr(pooling, 'pooling_mode_cls_token', False) else 'mean',
+        'normalize': any(type(module).__name__ == 'Normalize' for module in model),
+        'inputs': input_names,
+        'pad_token': tokenizer.pad_token,
+        'pad_token_id': tokenizer.pad_token_id
+    }
+    with open(os.path.join(output_dir, METADATA_FILE), 'w') as f:
+        json.dump(metadata, f, indent=2)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        int8_path = os.path.join(output_dir, ONNX_INT8_FILE)
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QInt8)
+        print(f"   ✅ {int8_path} ({os.path.getsize(int8_path) / 1e6:.0f} Mo, int8)")
+
+    return output_dir
+
+
+class OnnxEncoder:
+    """
+    Encodeur de phrases exécuté par ONNX Runtime (CPU)
+
+    Compatible avec l'usage de SentenceTransformer dans ce projet:
+    encode(str) -> vecteur, encode(list) -> matrice.
+    """
+
+    def __init__(self, model_dir: str, quantized: bool = False, intra_op_threads: Optional[int] = None):
+        """
+        Args:
+            model_dir: Dossier produit par export_onnx
+            quantized: Utiliser le graphe int8 (model.int8.onnx)
+            intra_op_threads: Threads par opérateur (défaut: Config.ONNX_INTRA_OP_THREADS,
+                              None = choix d'ONNX Runtime)
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        onnx_path = os.path.join(model_dir, ONNX_INT8_FILE if quantized else ONNX_FILE)
+        if not os.path.exists(onnx_path):
+            raise FileNotFoundError(
+                f"Export ONNX non trouvé: {onnx_path} "
+                f"(lance: python src/onnx_encoder.py export{' --quantize' if quantized else ''})"
+            )
+
+        with open(os.path.join(model_dir, METADATA_FILE)) as f:
+            self.metadata = json.load(f)
+        self.input_names = self.metadata['inputs']
+        self.max_seq_length = self.metadata['max_seq_length']
+        self.quantized = quantized
+        # Les embeddings ONNX (surtout int8) diffèrent légèrement: entrées de cache séparées
+        self.cache_suffix = '#onnx-int8' if quantized else '#onnx'
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=self.max_seq_length)
+        self.tokenizer.enable_padding(
+            pad_id=self.metadata['pad_token_id'], pad_token=self.metadata['pad_token']
+        )
+
+        threads = intra_op_threads if intra_op_threads is not None else Config.ONNX_INTRA_OP_THREADS
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self.session = ort.InferenceSession(onnx_path, options, providers=['CPUExecutionProvider'])
+
+    @classmethod
+    def from_model_config(cls, model_config, quantized: bool = False, intra_op_threads: Optional[int] = None):
+        """Encodeur d'un modèle configuré (export dans Config.ONNX_DIR)"""
+        return cls(model_dir_for(model_config), quantized, intra_op_threads)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.metadata['dimensions']
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.metadata['pooling'] == 'cls':
+            return hidden[:, 0]
+        mask = attention_mask[..., None].astype(hidden.dtype)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        features = {
+            'input_ids': np.array([e.ids for e in encodings], dtype=np.int64),
+            'attention_mask': np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            'token_type_ids': np.array([e.type_ids for e in encodings], dtype=np.int64)
+        }
+        hidden = self.session.run(
+            ['last_hidden_state'], {name: features[name] for name in self.input_names}
+        )[0]
+        return self._pool(hidden, features['attention_mask'])
+
+    def encode(
+        self,
+        sentences: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+        **kwargs
+    ) -> np.ndarray:
+        """
+        Encode une phrase ou une liste de phrases
+
+        Args:
+            sentences: Texte ou liste de textes
+            batch_size: Taille des batchs envoyés à ONNX Runtime
+            convert_to_numpy: Ignoré (toujours NumPy), pour compatibilité
+            normalize_embeddings: Normaliser L2 les vecteurs
+            **kwargs: Options SentenceTransformer ignorées (show_progress_bar...)
+
+        Returns:
+            Vecteur (texte seul) ou matrice float32
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        dim = self.get_sentence_embedding_dimension()
+        if not texts:
+            return np.zeros((0, dim), dtype=np.float32)
+
+        # Comme SentenceTransformer: batchs de longueurs voisines (moins de padding)
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        embeddings = np.empty((len(texts), dim), dtype=np.float32)
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            embeddings[idx] = self._encode_batch([texts[i] for i in idx])
+
+        if normalize_embeddings or self.metadata['normalize']:
+            embeddings /= np.clip(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None)
+
+        return embeddings[0] if single else embeddings
+
+
+def load_encoder(model_config, backend: Optional[str] = None):
+    """
+    Encodeur d'un modèle selon le backend demandé
+
+    Args:
+        backend: 'torch' (SentenceTransformer), 'onnx' ou 'onnx-int8'
+                 (défaut: Config.ENCODER_BACKEND)
+    """
+    backend = backend or Config.ENCODER_BACKEND
+    if backend == 'torch':
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_config.NAME)
+    if backend in ('onnx', 'onnx-int8'):
+        return OnnxEncoder.from_model_config(model_config, quantized=backend == 'onnx-int8')
+    raise ValueError(f"Backend d'encodage inconnu: {backend} (attendu: torch, onnx, onnx-int8)")
+
+
+def check_parity(model_config, quantized: bool = False, n_queries: int = 50, n_documents: int = 200) -> Dict:
+    """
+    Compare les scores cosinus requête/document des chemins PyTorch et ONNX
+
+    Args:
+        model_config: Modèle à vérifier
+        quantized: Vérifier le graphe int8
+        n_queries: Nombre de questions du dataset utilisées comme requêtes
+        n_documents: Nombre de documents (combined_text) scorés par requête
+
+    Returns:
+        Écarts maximum / moyen des scores, cosinus minimum entre embeddings,
+        accord du top-1 entre les deux chemins
+    """
+    import pandas as pd
+
+    csv_path = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    df = pd.read_csv(csv_path, usecols=['question', 'combined_text']).sample(
+        n=n_queries + n_documents, random_state=42
+    )
+    queries = df['question'].iloc[:n_queries].tolist()
+    documents = df['combined_text'].iloc[n_queries:].tolist()
+
+    def normalized(encoder, texts):
+        embeddings = encoder.encode(texts, batch_size=32, convert_to_numpy=True)
+        return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    scores = {}
+    query_embeddings = {}
+    for backend in ('torch', 'onnx-int8' if quantized else 'onnx'):
+        encoder = load_encoder(model_config, backend)
+        query_embeddings[backend] = normalized(encoder, queries)
+        scores[backend] = query_embeddings[backend] @ normalized(encoder, documents).T
+
+    reference, candidate = scores.values()
+    diff = np.abs(reference - candidate)
+    embedding_cosines = np.sum(np.multiply(*query_embeddings.values()), axis=1)
+
+    return {
+        'max_abs_diff': float(diff.max()),
+        'mean_abs_diff': float(diff.mean()),
+        'min_embedding_cosine': float(embedding_cosines.min()),
+        'top1_agreement': float(np.mean(reference.argmax(axis=1) == candidate.argmax(axis=1)))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encodeur ONNX Runtime")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export = subparsers.add_parser('export', help="Exporter les modèles vers ONNX")
+    export.add_argument('--model', choices=sorted(MODELS) + ['all'], default='all')
+    export.add_argument('--quantize', action='store_true', help="Produire aussi le graphe int8")
+    export.add_argument('--output-dir', default=Config.ONNX_DIR)
+
+    parity = subparsers.add_parser('parity', help="Parité des scores cosinus PyTorch vs ONNX")
+    parity.add_argument('--model', choices=sorted(MODELS) + ['all'], default='all')
+    parity.add_argument('--int8', action='store_true', help="Vérifier le graphe int8")
+    parity.add_argument('--queries', type=int, default=50)
+    parity.add_argument('--documents', type=int, default=200)
+    parity.add_argument('--tolerance', type=float, default=None,
+                        help="Écart maximum de score toléré (défaut: 1e-3, 0.05 en int8)")
+
+    args = parser.parse_args()
+    model_configs = list(MODELS.values()) if args.model == 'all' else [MODELS[args.model]]
+
+    if args.command == 'export':
+        for model_config in model_configs:
+            export_onnx(model_config, args.output_dir, quantize=args.quantize)
+        return
+
+    tolerance = args.tolerance if args.tolerance is not None else (
+        PARITY_TOLERANCE_INT8 if args.int8 else PARITY_TOLERANCE
+    )
+    failed = False
+    for model_config in model_configs:
+        report = check_parity(model_config, args.int8, args.queries, args.documents)
+        ok = report['max_abs_diff'] <= tolerance
+        failed = failed or not ok
+        print(f"\n{'✅' if ok else '❌'} {model_config.NAME} ({'int8' if args.int8 else 'fp32'})")
+        print(f"   Écart max des scores:   {report['max_abs_diff']:.6f} (tolérance {tolerance})")
+        print(f"   Écart moyen des scores: {report['mean_abs_diff']:.6f}")
+        print(f"   Cosinus min embeddings: {report['min_embedding_cosine']:.6f}")
+        print(f"   Accord du top-1:        {report['top1_agreement']:.0%}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+Génération des embeddings sur plusieurs processus
+
+Un seul processus torch ne sature pas une machine à nombreux cœurs pour
+de petits lots BERT: le corpus est découpé en tranches de lignes
+(shards) réparties sur N processus, chacun limité à un nombre fixe de
+threads. Chaque processus écrit ses vecteurs directement à leur rang
+dans le .npy pré-alloué (np.memmap partagé): l'ordre des lignes est
+celui du CSV, sans étape de fusion.
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing
+from typing import Dict, Iterable, Optional
+import numpy as np
+from tqdm import tqdm
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config
+from src.artifacts import iter_texts
+
+
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS')
+
+# État propre à chaque processus de travail
+_worker = {}
+
+
+def default_threads_per_worker(workers: int) -> int:
+    """Cœurs disponibles répartis entre les processus (au moins 1)"""
+    return max(1, (os.cpu_count() or 1) // workers)
+
+
+@contextmanager
+def _thread_env(threads: int):
+    """
+    OMP / MKL / OPENBLAS_NUM_THREADS posés dans l'environnement du parent
+    pendant la vie du pool, puis restaurés
+
+    Les runtimes BLAS lisent ces variables à leur chargement: un processus
+    lancé par spawn importe numpy (ce module) avant son initializer, elles
+    doivent donc être dans l'environnement hérité à sa création. Les
+    processus sont créés à la demande: les variables restent posées
+    jusqu'à l'arrêt du pool.
+    """
+    previous = {name: os.environ.get(name) for name in THREAD_ENV_VARS}
+    os.environ.update({name: str(threads) for name in THREAD_ENV_VARS})
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def _init_worker(model_config, backend: str, threads: int):
+    """
+    Initialisation d'un processus: threads torch / ONNX Runtime fixés
+    avant le chargement du modèle, puis chargement (une fois par processus)
+
+    Les threads BLAS de numpy viennent de l'environnement hérité du
+    parent (_thread_env): numpy est déjà chargé quand l'initializer s'exécute.
+    """
+    start = time.time()
+    if backend == 'torch':
+        import torch
+        torch.set_num_threads(threads)
+        from src.onnx_encoder import load_encoder
+        model = load_encoder(model_config, 'torch')
+    else:
+        from src.onnx_encoder import OnnxEncoder
+        model = OnnxEncoder.from_model_config(
+            model_config, quantized=backend == 'onnx-int8', intra_op_threads=threads
+        )
+    _worker.update(model=model, model_config=model_config, load_time=time.time() - start,
+                   reported=False, outputs={})
+
+
+def _encode_shard(output_file: str, start: int, texts, batch_size: int):
+    """
+    Encode une tranche et l'écrit aux lignes [start, start + len(texts))
+
+    Returns:
+        (lignes écrites, temps de chargement du modèle si pas encore remonté)
+    """
+    model_config = _worker['model_config']
+    embeddings = _worker['model'].encode(
+        texts,
+        batch_size=batch_size,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    )
+    if embeddings.shape != (len(texts), model_config.DIMENSIONS):
+        raise ValueError(f"Shape incorrecte: {embeddings.shape}")
+    if np.isnan(embeddings).any():
+        raise ValueError(f"NaN détectés (lignes {start}-{start + len(texts)})")
+
+    output = _worker['outputs'].get(output_file)
+    if output is None:
+        output = np.load(output_file, mmap_mode='r+')
+        _worker['outputs'][output_file] = output
+    output[start:start + len(texts)] = embeddings
+    output.flush()
+
+    load_time = None
+    if not _worker['reported']:
+        _worker['reported'] = True
+        load_time = _worker['load_time']
+    return len(texts), load_time
+
+
+def _iter_shards(input_csv: str, shard_size: int, limit: Optional[int]):
+    """(première ligne, textes) par tranche de shard_size lignes (CSV ou artefact Arrow)"""
+    return iter_texts(input_csv, shard_size, limit)
+
+
+def generate_embeddings_parallel(model_config, input_csv, workers=None, threads_per_worker=None,
+                                 shard_size=None, batch_size=32, backend='torch',
+                                 limit=None, output_file=None) -> Dict:
+    """
+    Génère les embeddings d'UN modèle avec N processus
+
+    Les tranches sont distribuées au fil de l'eau (au plus 2 par
+    processus en attente, la mémoire reste bornée); le fichier final
+    n'apparaît qu'une fois toutes les lignes écrites. Pas de reprise:
+    utiliser le mode streaming pour un long calcul interrompable.
+
+    Args:
+        model_config: Configuration du modèle (Model1Config ou Model2Config)
+        input_csv: Chemin du CSV prétraité ou de l'artefact Arrow
+        workers: Nombre de processus (défaut: Config.EMBEDDING_WORKERS)
+        threads_per_worker: Threads par processus (défaut: cœurs / workers)
+        shard_size: Lignes par tranche (défaut: Config.EMBEDDING_SHARD_SIZE)
+        batch_size: Taille de batch de model.encode
+        backend: 'torch', 'onnx' ou 'onnx-int8'
+        limit: N'encoder que les premières lignes (benchmark)
+        output_file: Fichier .npy de sortie (défaut: model_config.EMBEDDINGS_FILE)
+
+    Returns:
+        {'shape', 'seconds', 'load_seconds', 'docs_per_sec', 'encode_docs_per_sec'}
+    """
+    workers = workers or Config.EMBEDDING_WORKERS
+    threads_per_worker = threads_per_worker or default_threads_per_worker(workers)
+    shard_size = shard_size or Config.EMBEDDING_SHARD_SIZE
+    output_file = output_file or model_config.EMBEDDINGS_FILE
+    partial_file = f"{output_file}.partial"
+
+    n_rows = sum(len(texts) for _, texts in _iter_shards(input_csv, Config.EMBEDDING_CHUNK_SIZE, limit))
+    shape = (n_rows, model_config.DIMENSIONS)
+
+    print(f"\n🧠 {model_config.NAME}: {n_rows} textes, {workers} processus × {threads_per_worker} threads "
+          f"(tranches de {shard_size}, {backend})")
+
+    # Fichier pré-alloué partagé par les processus (chacun écrit ses lignes)
+    os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+    np.lib.format.open_memmap(partial_file, mode='w+', dtype=np.float32, shape=shape).flush()
+
+    start = time.time()
+    load_times = []
+    written = 0
+    with _thread_env(threads_per_worker):
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),  # pas de fork d'un processus avec torch chargé
+            initializer=_init_worker,
+            initargs=(model_config, backend, threads_per_worker)
+        )
+        try:
+            pending = set()
+            with tqdm(total=n_rows, desc="Tranches", unit="docs") as progress:
+                def collect(done):
+                    nonlocal written
+                    for future in done:
+                        count, load_time = future.result()
+                        written += count
+                        progress.update(count)
+                        if load_time is not None:
+                            load_times.append(load_time)
+
+                for row, texts in _iter_shards(input_csv, shard_size, limit):
+                    if len(pending) >= 2 * workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(executor.submit(_encode_shard, partial_file, row, texts, batch_size))
+                done, _ = wait(pending)
+                collect(done)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+    seconds = time.time() - start
+
+    if written != n_rows:
+        raise ValueError(f"{written} lignes écrites, {n_rows} attendues")
+    os.replace(partial_file, output_file)
+
+    # Les processus chargent le modèle en parallèle: on retire le plus long chargement
+    load_seconds = max(load_times) if load_times else 0.0
+    stats = {
+        'shape': shape,
+        'seconds': seconds,
+        'load_seconds': load_seconds,
+        'docs_per_sec': n_rows / seconds,
+        'encode_docs_per_sec': n_rows / max(seconds - load_seconds, 1e-9)
+    }
+    print(f"   ✅ {n_rows} embeddings en {seconds:.1f}s ({stats['docs_per_sec']:.1f} docs/sec, "
+          f"{stats['encode_docs_per_sec']:.1f} hors chargement) → {output_file}")
+    return stats
+
+
+def generate_all_parallel(model_configs: Iterable, input_csv: str, **kwargs) -> Dict[str, Dict]:
+    """Génère les embeddings de plusieurs modèles, l'un après l'autre, chacun sur N processus"""
+    return {
+        model_config.NAME: generate_embeddings_parallel(model_config, input_csv, **kwargs)
+        for model_config in model_configs
+    }
@@ -0,0 +1,361 @@
+"""
+Index par passages pour les réponses longues
+
+Les encodeurs tronquent à max_seq_length: la fin des longues réponses
+n'atteint jamais l'index. Ici chaque réponse trop longue est découpée en
+fenêtres de tokens qui se recouvrent (précédées de la question), chaque
+passage est encodé et stocké avec l'id de son document, et la recherche
+agrège les passages trouvés par document (max ou somme des top-n) dans
+la requête SQL.
+
+La table des passages reste étroite (doc_id, rang, catégorie, vecteur):
+le texte est relu depuis le document parent par son id.
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config, Model2Config
+from src.artifacts import has_embeddings, read_documents, read_embeddings
+from src.insert_dual_models import (
+    DOCUMENTS_TABLE, PGCOPY_HEADER, PGCOPY_TRAILER, _categories, _copy, _encode_int_field,
+    _encode_text_field, connect, document_ids
+)
+from src.vector_index import INDEX_METHODS, build_vector_index
+
+
+MODELS = {'minilm': Model1Config, 'pubmed': Model2Config}
+
+AGGREGATIONS = ('max', 'sum')
+
+PASSAGE_COLUMNS = ('doc_id', 'passage_idx', 'category', 'embedding')
+
+# Fenêtre minimale de tokens de réponse (question très longue)
+MIN_WINDOW_TOKENS = 32
+
+
+def passage_table_for(model_config) -> str:
+    """Table des passages d'un modèle"""
+    return f"{model_config.TABLE_NAME}_passages"
+
+
+def passage_hits_sql(table_name: str, aggregation: str = 'max', category_filter: bool = False) -> str:
+    """
+    Phase 1 de la recherche par passages: (doc_id, score) agrégés par document
+
+    L'index ANN ne lit que les passages les plus proches (LIMIT
+    %(candidates)s); ils sont ensuite regroupés par document:
+    'max' = meilleur passage, 'sum' = somme des %(top_n)s meilleurs.
+    Le vecteur de la requête n'apparaît qu'une fois (ORDER BY sur l'alias).
+
+    Paramètres nommés: query, candidates, top_n, min_similarity, top_k
+    (+ category si category_filter)
+    """
+    if aggregation not in AGGREGATIONS:
+        raise ValueError(f"Agrégation inconnue: {aggregation} (attendu: {AGGREGATIONS})")
+    score = 'max(similarity)' if aggregation == 'max' else 'sum(similarity)'
+    category_clause = "WHERE category = %(category)s" if category_filter else ""
+    return f"""
+        WITH hits AS (
+            SELECT doc_id, embedding <=> %(query)s::vector AS distance
+            FROM {table_name}
+            {category_clause}
+            ORDER BY distance
+            LIMIT %(candidates)s
+        ), ranked AS (
+            SELECT
+                doc_id,
+                1 - distance AS similarity,
+                row_number() OVER (PARTITION BY doc_id ORDER BY distance) AS passage_rank
+            FROM hits
+        )
+        SELECT doc_id, {score} AS score
+        FROM ranked
+        WHERE passage_rank <= %(top_n)s
+        GROUP BY doc_id
+        HAVING max(similarity) >= %(min_similarity)s
+        ORDER BY score DESC
+        LIMIT %(top_k)s
+    """
+
+
+def passage_hits_params(query_embedding, top_k: int, min_similarity: float = 0.0,
+                        top_n: Optional[int] = None, candidates: Optional[int] = None,
+                        category_filter: Optional[str] = None) -> Dict:
+    """Paramètres de passage_hits_sql"""
+    params = {
+        'query': np.asarray(query_embedding).tolist(),
+        'candidates': candidates or top_k * Config.PASSAGE_CANDIDATES_PER_RESULT,
+        'top_n': top_n or Config.PASSAGE_TOP_N,
+        'min_similarity': min_similarity,
+        'top_k': top_k
+    }
+    if category_filter:
+        params['category'] = category_filter
+    return params
+
+
+def passage_table_exists(conn, model_config) -> bool:
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (passage_table_for(model_config),))
+    exists = cursor.fetchone()[0]
+    cursor.close()
+    return exists
+
+
+def _offsets_function(model):
+    """
+    Découpeur texte -> offsets (début, fin) en caractères de chaque token,
+    sans tokens spéciaux ni troncature
+    """
+    tokenizer = model.tokenizer
+    if hasattr(tokenizer, 'encode_batch'):
+        # tokenizers (OnnxEncoder): copie sans troncature ni padding
+        from tokenizers import Tokenizer
+        tokenizer = Tokenizer.from_str(tokenizer.to_str())
+        tokenizer.no_truncation()
+        tokenizer.no_padding()
+        return lambda text: tokenizer.encode(text, add_special_tokens=False).offsets
+    return lambda text: tokenizer(
+        text, add_special_tokens=False, truncation=False, return_offsets_mapping=True, verbose=False
+    )['offset_mapping']
+
+
+def split_passages(offsets_of, question: str, answer: str, max_tokens: int,
+                   overlap: int) -> List[str]:
+    """
+    Découpe une réponse en fenêtres de tokens qui se recouvrent
+
+    Chaque passage garde le format de combined_text
+    ("Question: ... Answer: <fenêtre>"): la question accompagne chaque fenêtre.
+
+    Args:
+        offsets_of: Fonction texte -> offsets des tokens (_offsets_function)
+        question, answer: Textes nettoyés du document
+        max_tokens: Longueur maximale d'une entrée de l'encodeur
+        overlap: Tokens partagés par deux fenêtres consécutives
+
+    Returns:
+        Textes des passages ([] si la réponse tient en une fenêtre)
+    """
+    prefix = f"Question: {question} Answer: "
+    # Tokens disponibles pour la réponse: entrée - préfixe - [CLS]/[SEP]
+    window = max(MIN_WINDOW_TOKENS, max_tokens - len(offsets_of(prefix)) - 2)
+    offsets = offsets_of(answer)
+    if len(offsets) <= window:
+        return []
+
+    stride = max(1, window - min(overlap, window - 1))
+    passages = []
+    for start in range(0, len(offsets), stride):
+        end = min(start + window, len(offsets))
+        passages.append(prefix + answer[offsets[start][0]:offsets[end - 1][1]])
+        if end == len(offsets):
+            break
+    return passages
+
+
+def build_passages(df, model, max_tokens: Optional[int] = None,
+                   overlap: Optional[int] = None) -> Tuple[List[Tuple], Dict]:
+    """
+    Passages de tout le corpus
+
+    Un document court n'a qu'un passage, son combined_text (son embedding
+    existe déjà dans le .npy du modèle).
+
+    Returns:
+        ([(doc_id, rang, catégorie, texte ou None si document entier, ligne du CSV)],
+         statistiques)
+    """
+    max_tokens = max_tokens or model.max_seq_length
+    overlap = Config.PASSAGE_OVERLAP_TOKENS if overlap is None else overlap
+    offsets_of = _offsets_function(model)
+
+    passages = []
+    long_documents = 0
+    for row, (doc_id, question, answer, category) in enumerate(
+            zip(document_ids(df), df['question'].astype(str), df['answer'].astype(str), _categories(df))):
+        windows = split_passages(offsets_of, question, answer, max_tokens, overlap)
+        if not windows:
+            passages.append((doc_id, 0, category, None, row))
+            continue
+        long_documents += 1
+        passages.extend((doc_id, idx, category, text, row) for idx, text in enumerate(windows))
+
+    return passages, {
+        'documents': len(df),
+        'long_documents': long_documents,
+        'passages': len(passages),
+        'max_tokens': max_tokens,
+        'overlap': overlap
+    }
+
+
+def create_passage_table(conn, model_config):
+    """Table des passages d'un modèle (une ligne par fenêtre, clé = document + rang)"""
+    table_name = passage_table_for(model_config)
+    cursor = conn.cursor()
+
+    print(f"\n📊 Création table: {table_name}")
+    cursor.execute(f"DROP TABLE IF EXISTS {table_name} CASCADE;")
+    cursor.execute(f"""
+        CREATE TABLE {table_name} (
+            doc_id INTEGER NOT NULL
+                REFERENCES {DOCUMENTS_TABLE}(id) ON DELETE CASCADE,
+            passage_idx INTEGER NOT NULL,
+            category VARCHAR(100),
+            embedding VECTOR({model_config.DIMENSIONS}) NOT NULL,
+            PRIMARY KEY (doc_id, passage_idx)
+        );
+    """)
+    cursor.execute(f"""
+        CREATE INDEX idx_{table_name}_category
+        ON {table_name}(category);
+    """)
+    conn.commit()
+    cursor.close()
+
+    print(f"   ✅ Table créée!")
+
+
+def iter_passage_rows(passages, embeddings):
+    """Lignes de la table des passages au format binaire COPY (vecteurs pgvector)"""
+    vectors = np.ascontiguousarray(embeddings, dtype='>f4')
+    dim = vectors.shape[1]
+    vector_header = struct.pack('!ihh', 4 + 4 * dim, dim, 0)
+    field_count = struct.pack('!h', len(PASSAGE_COLUMNS))
+
+    yield PGCOPY_HEADER
+    for idx, (doc_id, passage_idx, category, _, _) in enumerate(passages):
+        yield b''.join((
+            field_count,
+            _encode_int_field(doc_id),
+            _encode_int_field(passage_idx),
+            _encode_text_field(category),
+            vector_header,
+            vectors[idx].tobytes()
+        ))
+    yield PGCOPY_TRAILER
+
+
+def encode_passages(model_config, model, df, passages, token_budget: Optional[int] = None) -> np.ndarray:
+    """
+    Embeddings des passages, dans l'ordre de la liste
+
+    Les documents entiers reprennent les embeddings du modèle (artefact
+    Arrow, sinon .npy) s'ils correspondent aux documents; seuls les
+    passages des réponses longues passent par l'encodeur (par lots triés
+    sous budget de tokens).
+    """
+    from src.length_batching import encode_length_bucketed, print_padding_stats
+
+    embeddings = np.empty((len(passages), model_config.DIMENSIONS), dtype=np.float32)
+    whole = [i for i, passage in enumerate(passages) if passage[3] is None]
+    windows = [i for i, passage in enumerate(passages) if passage[3] is not None]
+
+    stored = None
+    if has_embeddings(model_config):
+        stored = read_embeddings(model_config)
+    elif os.path.exists(model_config.EMBEDDINGS_FILE):
+        stored = np.load(model_config.EMBEDDINGS_FILE, mmap_mode='r')
+    if stored is not None and stored.shape != (len(df), model_config.DIMENSIONS):
+        print(f"   ⚠️  Embeddings {stored.shape} ne correspondant pas aux documents: documents ré-encodés")
+        stored = None
+    if stored is not None:
+        embeddings[whole] = stored[[passages[i][4] for i in whole]]
+    else:
+        windows = list(range(len(passages)))
+
+    if windows:
+        texts = [
+            passages[i][3] if passages[i][3] is not None else str(df['combined_text'].iloc[passages[i][4]])
+            for i in windows
+        ]
+        print(f"   🧠 {len(texts)} passages à encoder")
+        encoded, stats = encode_length_bucketed(model, texts, max_tokens=token_budget, show_progress_bar=True)
+        print_padding_stats(stats)
+        embeddings[windows] = encoded
+    return embeddings
+
+
+def build_passage_index(model_config, df, backend: Optional[str] = 'torch', overlap: Optional[int] = None,
+                        token_budget: Optional[int] = None, index_options: Optional[Dict] = None) -> Dict:
+    """
+    Découpe, encode et charge les passages d'un modèle, puis construit l'index ANN
+
+    Returns:
+        Statistiques (documents longs, passages, temps, index)
+    """
+    from src.onnx_encoder import load_encoder
+
+    print("\n" + "="*70)
+    print(f"🧩 PASSAGES: {model_config.NAME}")
+    print("="*70)
+
+    start = time.time()
+    model = load_encoder(model_config, backend)
+    passages, stats = build_passages(df, model, overlap=overlap)
+    print(f"\n1️⃣ {stats['long_documents']}/{stats['documents']} réponses découpées "
+          f"(fenêtres de {stats['max_tokens']} tokens, recouvrement {stats['overlap']}) "
+          f"→ {stats['passages']} passages")
+
+    print(f"\n2️⃣ Encodage...")
+    embeddings = encode_passages(model_config, model, df, passages, token_budget)
+
+    print(f"\n3️⃣ Chargement...")
+    table_name = passage_table_for(model_config)
+    conn = connect()
+    try:
+        create_passage_table(conn, model_config)
+        copy_start = time.time()
+        _copy(conn, table_name, PASSAGE_COLUMNS, iter_passage_rows(passages, embeddings))
+        print(f"   ✅ {len(passages)} passages copiés en {time.time() - copy_start:.1f}s")
+        stats['index'] = build_vector_index(conn, table_name, **(index_options or {}))
+    finally:
+        conn.close()
+
+    stats['seconds'] = time.time() - start
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index par passages (réponses longues)")
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=['minilm', 'pubmed'])
+    parser.add_argument('--backend', choices=['torch', 'onnx', 'onnx-int8'], default='torch')
+    parser.add_argument('--overlap', type=int, default=Config.PASSAGE_OVERLAP_TOKENS,
+                        help="Tokens partagés par deux fenêtres consécutives")
+    parser.add_argument('--token-budget', type=int, default=None,
+                        help=f"Tokens paddés par lot d'encodage (défaut: {Config.EMBEDDING_TOKEN_BUDGET})")
+    parser.add_argument('--index', choices=INDEX_METHODS, default=Config.VECTOR_INDEX_METHOD)
+    args = parser.parse_args()
+
+    input_csv = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    if os.path.exists(Config.ARTIFACT_FILE):
+        df = read_documents()
+    elif os.path.exists(input_csv):
+        df = pd.read_csv(input_csv)
+    else:
+        print(f"❌ CSV non trouvé: {input_csv}")
+        return
+    results = []
+    for name in args.models:
+        model_config = MODELS[name]
+        stats = build_passage_index(model_config, df, args.backend, args.overlap,
+                                    args.token_budget, {'method': args.index})
+        results.append((model_config, stats))
+
+    print("\n" + "="*70)
+    print("🎉 INDEX PAR PASSAGES PRÊTS")
+    print("="*70)
+    for model_config, stats in results:
+        print(f"   - {passage_table_for(model_config)}: {stats['passages']} passages "
+              f"({stats['passages'] / stats['documents']:.2f} par document), {stats['seconds']:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Vecteurs quantifiés (halfvec / bit) avec rerank en pleine précision
+
+Une table VECTOR(768) pèse ~3 Ko par ligne: quand le corpus grandit,
+l'index ANN ne tient plus dans shared_buffers. La table quantifiée d'un
+modèle garde, pour chaque document, deux copies compactes du vecteur:
+- 'halfvec': float16, moitié de la taille, distance cosinus
+- 'bit': binary_quantize (1 bit par dimension, 32x plus petit), distance de Hamming
+
+Le parcours ANN lit %(candidates)s candidats dans l'index quantifié
+(quelques centaines), puis leurs vecteurs float32 sont relus par clé
+primaire dans la table du modèle pour recalculer la similarité cosinus
+exacte: le classement final ne dépend pas de la quantification.
+
+Mode de stockage compact (--drop-float32-index): l'index ANN float32 de
+la table du modèle est supprimé. Les vecteurs float32 ne servent plus
+qu'au rerank par clé primaire; la recherche sémantique classique de ce
+modèle devient un parcours exact (à éviter sans quantification).
+
+La table est remplie par INSERT ... SELECT depuis la table du modèle
+(aucun ré-encodage); src/incremental_update.py recalcule les lignes des
+documents qu'il modifie.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Optional
+import numpy as np
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config, Model2Config
+from src.insert_dual_models import DOCUMENTS_TABLE, connect
+from src.vector_index import INDEX_METHODS, build_vector_index, index_name_for
+
+
+MODELS = {'minilm': Model1Config, 'pubmed': Model2Config}
+
+QUANTIZATIONS = ('halfvec', 'bit')
+
+# Colonne, classe d'opérateurs de l'index et distance de chaque quantification
+QUANTIZED_COLUMNS = {'halfvec': 'embedding_half', 'bit': 'embedding_bits'}
+QUANTIZED_OPCLASSES = {'halfvec': 'halfvec_cosine_ops', 'bit': 'bit_hamming_ops'}
+QUANTIZED_DISTANCES = {
+    'halfvec': "embedding_half <=> %(query)s::vector::halfvec",
+    'bit': "embedding_bits <~> binary_quantize(%(query)s::vector)"
+}
+
+
+def quantized_table_for(model_config) -> str:
+    """Table des vecteurs quantifiés d'un modèle"""
+    return f"{model_config.TABLE_NAME}_quantized"
+
+
+def quantized_index_for(model_config, quantization: str) -> str:
+    """Index ANN d'une quantification dans la table quantifiée"""
+    return index_name_for(quantized_table_for(model_config), QUANTIZED_COLUMNS[quantization])
+
+
+def rerank_hits_sql(candidates_sql: str, table_name: str) -> str:
+    """
+    Rerank en pleine précision: (doc_id, similarity) des candidats, recalculés
+    avec les vecteurs float32 de table_name (lus par clé primaire)
+
+    candidates_sql renvoie les doc_id candidats (au plus %(candidates)s).
+
+    Paramètres nommés: query, min_similarity, top_k (+ ceux de candidates_sql)
+    """
+    return f"""
+        WITH candidates AS ({candidates_sql}
+        ), reranked AS (
+            SELECT e.doc_id, e.embedding <=> %(query)s::vector AS distance
+            FROM candidates c
+            JOIN {table_name} e ON e.doc_id = c.doc_id
+        )
+        SELECT doc_id, 1 - distance AS similarity
+        FROM reranked
+        WHERE 1 - distance >= %(min_similarity)s
+        ORDER BY distance
+        LIMIT %(top_k)s
+    """
+
+
+def quantized_hits_sql(model_config, quantization: str = 'halfvec', category_filter: bool = False) -> str:
+    """
+    Phase 1 de la recherche quantifiée: (doc_id, similarity) après rerank
+
+    L'index quantifié ne fournit que %(candidates)s identifiants; la
+    similarité renvoyée est la similarité cosinus float32 de la table
+    du modèle (mêmes scores que semantic_hits_sql).
+
+    Paramètres nommés: query, candidates, min_similarity, top_k
+    (+ category si category_filter)
+    """
+    if quantization not in QUANTIZATIONS:
+        raise ValueError(f"Quantification inconnue: {quantization} (attendu: {QUANTIZATIONS})")
+    category_clause = "WHERE category = %(category)s" if category_filter else ""
+    return rerank_hits_sql(f"""
+            SELECT doc_id, {QUANTIZED_DISTANCES[quantization]} AS distance
+            FROM {quantized_table_for(model_config)}
+            {category_clause}
+            ORDER BY distance
+            LIMIT %(candidates)s""", model_config.TABLE_NAME)
+
+
+def quantized_hits_params(query_embedding, top_k: int, min_similarity: float = 0.0,
+                          candidates: Optional[int] = None, category_filter: Optional[str] = None) -> Dict:
+    """Paramètres de quantized_hits_sql"""
+    params = {
+        'query': np.asarray(query_embedding).tolist(),
+        'candidates': max(candidates or Config.QUANTIZED_RERANK_CANDIDATES, top_k),
+        'min_similarity': min_similarity,
+        'top_k': top_k
+    }
+    if category_filter:
+        params['category'] = category_filter
+    return params
+
+
+def create_quantized_table(conn, model_config):
+    """Table quantifiée d'un modèle (une ligne par document, halfvec + bit)"""
+    table_name = quantized_table_for(model_config)
+    cursor = conn.cursor()
+
+    print(f"\n📊 Création table: {table_name}")
+    cursor.execute(f"DROP TABLE IF EXISTS {table_name} CASCADE;")
+    cursor.execute(f"""
+        CREATE TABLE {table_name} (
+            doc_id INTEGER PRIMARY KEY
+                REFERENCES {DOCUMENTS_TABLE}(id) ON DELETE CASCADE,
+            category VARCHAR(100),
+            embedding_half HALFVEC({model_config.DIMENSIONS}) NOT NULL,
+            embedding_bits BIT({model_config.DIMENSIONS}) NOT NULL
+        );
+    """)
+    cursor.execute(f"""
+        CREATE INDEX idx_{table_name}_category
+        ON {table_name}(category);
+    """)
+    conn.commit()
+    cursor.close()
+
+    print(f"   ✅ Table créée!")
+
+
+def quantize_rows_sql(model_config, doc_filter: bool = False) -> str:
+    """
+    (Re)calcule les lignes quantifiées depuis la table du modèle
+
+    doc_filter: seulement les documents %(doc_ids)s (mise à jour incrémentale)
+    """
+    dim = model_config.DIMENSIONS
+    where = "WHERE doc_id = ANY(%(doc_ids)s)" if doc_filter else ""
+    return f"""
+        INSERT INTO {quantized_table_for(model_config)} (doc_id, category, embedding_half, embedding_bits)
+        SELECT
+            doc_id,
+            category,
+            embedding::halfvec({dim}),
+            binary_quantize(embedding)::bit({dim})
+        FROM {model_config.TABLE_NAME}
+        {where}
+        ON CONFLICT (doc_id) DO UPDATE SET
+            category = EXCLUDED.category,
+            embedding_half = EXCLUDED.embedding_half,
+            embedding_bits = EXCLUDED.embedding_bits
+    """
+
+
+def relation_sizes(conn, relations) -> Dict[str, int]:
+    """Taille sur disque (octets) des tables / index existants"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT name, pg_total_relation_size(to_regclass(name))
+        FROM unnest(%s::text[]) AS name
+        WHERE to_regclass(name) IS NOT NULL;
+    """, (list(relations),))
+    sizes = dict(cursor.fetchall())
+    cursor.close()
+    return sizes
+
+
+def storage_configurations(sizes: Dict[str, int], model_config) -> Dict[str, int]:
+    """
+    Taille totale (octets) de chaque configuration de stockage d'un modèle
+
+    - float32 + index ANN float32 + table quantifiée (recherche classique possible)
+    - float32 sans index ANN + table quantifiée (float32 relu par clé primaire)
+
+    Args:
+        sizes: relation_sizes() de la table du modèle, de son index ANN et
+            de la table quantifiée (pg_total_relation_size: index compris)
+    """
+    float32_total = sizes.get(model_config.TABLE_NAME, 0)
+    ann_index = sizes.get(index_name_for(model_config.TABLE_NAME), 0)
+    quantized_total = sizes.get(quantized_table_for(model_config), 0)
+    configurations = {}
+    if ann_index:
+        configurations['float32 + index ANN float32 + quantifié'] = float32_total + quantized_total
+    configurations['float32 (rerank) + quantifié'] = float32_total - ann_index + quantized_total
+    return configurations
+
+
+def drop_float32_index(conn, model_config):
+    """Supprime l'index ANN float32 de la table du modèle (stockage compact)"""
+    index_name = index_name_for(model_config.TABLE_NAME)
+    cursor = conn.cursor()
+    cursor.execute(f"DROP INDEX IF EXISTS {index_name};")
+    conn.commit()
+    cursor.close()
+    print(f"   🗑️  {index_name} supprimé: float32 gardé pour le rerank par clé primaire")
+
+
+def build_quantized_index(conn, model_config, quantizations=QUANTIZATIONS,
+                          index_options: Optional[Dict] = None, keep_float32_index: bool = True) -> Dict:
+    """
+    Remplit la table quantifiée depuis la table du modèle, puis construit
+    un index ANN par quantification demandée
+
+    Args:
+        keep_float32_index: False = supprimer l'index ANN float32 de la table
+            du modèle (mode de stockage compact)
+
+    Returns:
+        Statistiques (lignes, temps, index, tailles, tailles par configuration)
+    """
+    table_name = quantized_table_for(model_config)
+
+    print("\n" + "="*70)
+    print(f"🗜️  VECTEURS QUANTIFIÉS: {model_config.NAME}")
+    print("="*70)
+
+    start = time.time()
+    create_quantized_table(conn, model_config)
+    cursor = conn.cursor()
+    cursor.execute(quantize_rows_sql(model_config))
+    rows = cursor.rowcount
+    conn.commit()
+    cursor.close()
+    print(f"   ✅ {rows} lignes quantifiées en {time.time() - start:.1f}s")
+
+    indexes = [
+        build_vector_index(conn, table_name, column=QUANTIZED_COLUMNS[quantization],
+                           opclass=QUANTIZED_OPCLASSES[quantization], **(index_options or {}))
+        for quantization in quantizations
+    ]
+    if not keep_float32_index:
+        drop_float32_index(conn, model_config)
+
+    relations = [model_config.TABLE_NAME, index_name_for(model_config.TABLE_NAME), table_name]
+    relations += [index['index'] for index in indexes]
+    sizes = relation_sizes(conn, relations)
+    return {
+        'rows': rows,
+        'indexes': indexes,
+        'sizes': sizes,
+        'storage': storage_configurations(sizes, model_config),
+        'seconds': time.time() - start
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vecteurs quantifiés (halfvec / bit) pour la recherche avec rerank")
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=['pubmed'])
+    parser.add_argument('--quantizations', nargs='+', choices=QUANTIZATIONS, default=list(QUANTIZATIONS))
+    parser.add_argument('--index', choices=INDEX_METHODS, default=Config.VECTOR_INDEX_METHOD)
+    parser.add_argument('--drop-float32-index', action='store_true',
+                        help="Supprimer l'index ANN float32 de la table du modèle (float32 gardé pour le rerank)")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        results = [
+            (MODELS[name], build_quantized_index(conn, MODELS[name], args.quantizations, {'method': args.index},
+                                                 keep_float32_index=not args.drop_float32_index))
+            for name in args.models
+        ]
+    finally:
+        conn.close()
+
+    print("\n" + "="*70)
+    print("🎉 VECTEURS QUANTIFIÉS PRÊTS")
+    print("="*70)
+    for model_config, stats in results:
+        print(f"   - {quantized_table_for(model_config)}: {stats['rows']} lignes, {stats['seconds']:.1f}s")
+        for name, size in stats['sizes'].items():
+            print(f"     {name:<52} {size / 1024 / 1024:8.1f} Mo")
+        for name, size in stats['storage'].items():
+            print(f"     Total {name:<46} {size / 1024 / 1024:8.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,394 @@
+"""
+Réduction de dimension (ACP) des embeddings avec rerank en pleine dimension
+
+Les 768 dimensions de PubMedBERT doublent la taille de l'index et le coût
+de chaque distance par rapport à MiniLM. Étape hors ligne:
+- ACP ajustée sur les embeddings du corpus (matrice de covariance 768 x 768
+  accumulée par blocs, la matrice des embeddings peut rester mappée)
+- variantes 128 / 256-D (composantes principales, re-normalisées L2)
+  chargées chacune dans sa table {table}_pca{dim} avec son index ANN
+
+Les composantes sont emboîtées (les 128 premières sont celles de la
+variante 256-D): une seule projection est enregistrée par modèle.
+À la requête, le vecteur est projeté, l'index réduit fournit une liste
+courte de candidats, recalculés en pleine dimension (rerank_hits_sql).
+src/incremental_update.py projette les vecteurs des documents qu'il
+modifie avec la projection enregistrée (sans ré-ajuster l'ACP).
+
+Le rapport recall / dimension (commande report) est calculé en mémoire
+sur les questions MedQuAD: il sépare l'effet de la dimension de celui
+de l'index approximatif.
+"""
+import argparse
+import os
+import sys
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config, Model2Config
+from src.artifacts import has_embeddings, read_documents, read_embeddings
+from src.insert_dual_models import DOCUMENTS_TABLE, EMBEDDING_COLUMNS, _copy, connect, iter_embedding_rows
+from src.quantized_index import relation_sizes, rerank_hits_sql
+from src.vector_index import INDEX_METHODS, build_vector_index, index_name_for
+
+
+MODELS = {'minilm': Model1Config, 'pubmed': Model2Config}
+
+# Lignes lues à la fois pour l'ajustement et la projection
+FIT_CHUNK_ROWS = 8192
+
+
+def projection_path_for(model_config) -> str:
+    """Fichier de la projection ACP d'un modèle (à côté de son .npy)"""
+    return os.path.splitext(model_config.EMBEDDINGS_FILE)[0] + '.pca.npz'
+
+
+def reduced_table_for(model_config, dimensions: int) -> str:
+    """Table de la variante réduite d'un modèle"""
+    return f"{model_config.TABLE_NAME}_pca{dimensions}"
+
+
+def reduced_tables(conn, model_config) -> Dict[int, str]:
+    """Variantes réduites existantes d'un modèle: {dimensions: table}"""
+    prefix = f"{model_config.TABLE_NAME}_pca"
+    cursor = conn.cursor()
+    cursor.execute("SELECT tablename FROM pg_tables WHERE tablename LIKE %s;",
+                   (prefix.replace('_', r'\_') + '%',))
+    tables = {int(name[len(prefix):]): name for (name,) in cursor if name[len(prefix):].isdigit()}
+    cursor.close()
+    return tables
+
+
+class PCAProjection:
+    """
+    Projection sur les premières composantes principales
+
+    Les vecteurs projetés sont re-normalisés L2: la distance cosinus
+    (<=>, vector_cosine_ops) reste celle de l'index réduit.
+    """
+
+    def __init__(self, mean: np.ndarray, components: np.ndarray, explained_variance: np.ndarray):
+        self.mean = mean.astype(np.float32)
+        self.components = components.astype(np.float32)  # (composantes, dimension d'origine)
+        self.explained_variance = explained_variance.astype(np.float64)
+
+    @classmethod
+    def fit(cls, embeddings: np.ndarray, max_dimensions: int) -> 'PCAProjection':
+        """
+        Ajuste l'ACP sur une matrice (n, d), lue par blocs de FIT_CHUNK_ROWS lignes
+
+        Args:
+            embeddings: Embeddings du corpus (tableau mappé accepté)
+            max_dimensions: Nombre de composantes gardées
+        """
+        n, dim = embeddings.shape
+        if not 0 < max_dimensions <= dim:
+            raise ValueError(f"Dimension réduite invalide: {max_dimensions} (1..{dim})")
+
+        total = np.zeros(dim, dtype=np.float64)
+        scatter = np.zeros((dim, dim), dtype=np.float64)
+        for start in range(0, n, FIT_CHUNK_ROWS):
+            chunk = np.asarray(embeddings[start:start + FIT_CHUNK_ROWS], dtype=np.float64)
+            total += chunk.sum(axis=0)
+            scatter += chunk.T @ chunk
+        mean = total / n
+        covariance = scatter / n - np.outer(mean, mean)
+
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        order = np.argsort(eigenvalues)[::-1]
+        eigenvalues = np.clip(eigenvalues[order], 0, None)
+        components = eigenvectors[:, order[:max_dimensions]].T
+        return cls(mean, components, eigenvalues[:max_dimensions] / eigenvalues.sum())
+
+    @property
+    def max_dimensions(self) -> int:
+        return len(self.components)
+
+    def transform(self, embeddings: np.ndarray, dimensions: int) -> np.ndarray:
+        """Projette (n, d) ou (d,) sur les dimensions premières composantes, normalisé L2"""
+        if dimensions > self.max_dimensions:
+            raise ValueError(f"Projection limitée à {self.max_dimensions} dimensions (demandé: {dimensions})")
+        reduced = (np.asarray(embeddings, dtype=np.float32) - self.mean) @ self.components[:dimensions].T
+        norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+        return reduced / np.maximum(norms, 1e-12)
+
+    def explained(self, dimensions: int) -> float:
+        """Part de la variance conservée par les dimensions premières composantes"""
+        return float(self.explained_variance[:dimensions].sum())
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez(path, mean=self.mean, components=self.components, explained_variance=self.explained_variance)
+
+    @classmethod
+    def load(cls, path: str) -> 'PCAProjection':
+        with np.load(path) as data:
+            return cls(data['mean'], data['components'], data['explained_variance'])
+
+
+@lru_cache(maxsize=None)
+def _load_projection(path: str, mtime: float) -> PCAProjection:
+    return PCAProjection.load(path)
+
+
+def get_projection(model_config) -> PCAProjection:
+    """Projection d'un modèle, gardée en mémoire (rechargée si le fichier change)"""
+    path = projection_path_for(model_config)
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Projection absente: {path} (python src/reduced_index.py build)")
+    return _load_projection(path, os.path.getmtime(path))
+
+
+def reduced_hits_sql(model_config, dimensions: int, category_filter: bool = False) -> str:
+    """
+    Phase 1 de la recherche réduite: (doc_id, similarity) après rerank
+
+    L'index de la variante réduite fournit %(candidates)s identifiants
+    (vecteur projeté %(reduced)s); la similarité renvoyée est celle des
+    vecteurs complets de la table du modèle.
+
+    Paramètres nommés: query, reduced, candidates, min_similarity, top_k
+    (+ category si category_filter)
+    """
+    category_clause = "WHERE category = %(category)s" if category_filter else ""
+    return rerank_hits_sql(f"""
+            SELECT doc_id, embedding <=> %(reduced)s::vector AS distance
+            FROM {reduced_table_for(model_config, dimensions)}
+            {category_clause}
+            ORDER BY distance
+            LIMIT %(candidates)s""", model_config.TABLE_NAME)
+
+
+def reduced_hits_params(model_config, query_embedding, dimensions: int, top_k: int,
+                        min_similarity: float = 0.0, candidates: Optional[int] = None,
+                        category_filter: Optional[str] = None) -> Dict:
+    """Paramètres de reduced_hits_sql (le vecteur de la requête est projeté ici)"""
+    params = {
+        'query': np.asarray(query_embedding).tolist(),
+        'reduced': get_projection(model_config).transform(query_embedding, dimensions).tolist(),
+        'candidates': max(candidates or Config.REDUCED_RERANK_CANDIDATES, top_k),
+        'min_similarity': min_similarity,
+        'top_k': top_k
+    }
+    if category_filter:
+        params['category'] = category_filter
+    return params
+
+
+def load_corpus(model_config):
+    """
+    (documents, embeddings) du corpus: artefact Arrow s'il contient le
+    modèle, sinon CSV prétraité + .npy (mappé)
+    """
+    if has_embeddings(model_config):
+        return read_documents(), read_embeddings(model_config)
+    input_csv = os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')
+    if not os.path.exists(input_csv) or not os.path.exists(model_config.EMBEDDINGS_FILE):
+        raise FileNotFoundError(f"Corpus absent: {input_csv} / {model_config.EMBEDDINGS_FILE}")
+    df = pd.read_csv(input_csv)
+    embeddings = np.load(model_config.EMBEDDINGS_FILE, mmap_mode='r')
+    if len(df) != len(embeddings):
+        raise ValueError(f"Documents ({len(df)}) et embeddings ({len(embeddings)}) non alignés")
+    return df, embeddings
+
+
+def project_all(projection: PCAProjection, embeddings: np.ndarray, dimensions: int) -> np.ndarray:
+    """Projection du corpus, par blocs"""
+    reduced = np.empty((len(embeddings), dimensions), dtype=np.float32)
+    for start in range(0, len(embeddings), FIT_CHUNK_ROWS):
+        reduced[start:start + FIT_CHUNK_ROWS] = projection.transform(
+            embeddings[start:start + FIT_CHUNK_ROWS], dimensions
+        )
+    return reduced
+
+
+def create_reduced_table(conn, model_config, dimensions: int):
+    """Table d'une variante réduite (même schéma que la table du modèle)"""
+    table_name = reduced_table_for(model_config, dimensions)
+    cursor = conn.cursor()
+
+    print(f"\n📊 Création table: {table_name}")
+    cursor.execute(f"DROP TABLE IF EXISTS {table_name} CASCADE;")
+    cursor.execute(f"""
+        CREATE TABLE {table_name} (
+            doc_id INTEGER PRIMARY KEY
+                REFERENCES {DOCUMENTS_TABLE}(id) ON DELETE CASCADE,
+            category VARCHAR(100),
+            embedding VECTOR({dimensions}) NOT NULL
+        );
+    """)
+    cursor.execute(f"""
+        CREATE INDEX idx_{table_name}_category
+        ON {table_name}(category);
+    """)
+    conn.commit()
+    cursor.close()
+
+    print(f"   ✅ Table créée!")
+
+
+def build_reduced_index(model_config, dimensions: Sequence[int], index_options: Optional[Dict] = None) -> Dict:
+    """
+    Ajuste l'ACP sur les embeddings du modèle, enregistre la projection,
+    puis charge et indexe une table par dimension
+
+    Returns:
+        Statistiques (variance conservée, tables, index, tailles)
+    """
+    print("\n" + "="*70)
+    print(f"📉 RÉDUCTION ACP: {model_config.NAME} ({model_config.DIMENSIONS}D → {list(dimensions)})")
+    print("="*70)
+
+    start = time.time()
+    df, embeddings = load_corpus(model_config)
+    projection = PCAProjection.fit(embeddings, max(dimensions))
+    projection.save(projection_path_for(model_config))
+    print(f"\n1️⃣ ACP ajustée sur {len(embeddings)} embeddings en {time.time() - start:.1f}s "
+          f"→ {projection_path_for(model_config)}")
+    for dim in dimensions:
+        print(f"   {dim:>4}D: {projection.explained(dim) * 100:.1f}% de la variance")
+
+    stats = {'documents': len(df), 'variants': []}
+    conn = connect()
+    try:
+        for dim in dimensions:
+            table_name = reduced_table_for(model_config, dim)
+            print(f"\n2️⃣ Variante {dim}D")
+            create_reduced_table(conn, model_config, dim)
+            copy_start = time.time()
+            reduced = project_all(projection, embeddings, dim)
+            _copy(conn, table_name, EMBEDDING_COLUMNS, iter_embedding_rows(df, reduced))
+            print(f"   ✅ {len(df)} vecteurs copiés en {time.time() - copy_start:.1f}s")
+            stats['variants'].append({
+                'dimensions': dim,
+                'table': table_name,
+                'explained_variance': projection.explained(dim),
+                'index': build_vector_index(conn, table_name, **(index_options or {}))
+            })
+        relations = [index_name_for(model_config.TABLE_NAME)]
+        relations += [index_name_for(variant['table']) for variant in stats['variants']]
+        stats['sizes'] = relation_sizes(conn, relations)
+    finally:
+        conn.close()
+
+    stats['seconds'] = time.time() - start
+    return stats
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices des k meilleurs scores de chaque ligne (non triés)"""
+    k = min(k, scores.shape[1])
+    return np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+
+def _recall(exact: np.ndarray, found: np.ndarray) -> float:
+    """Part des voisins exacts retrouvés (moyenne sur les requêtes)"""
+    return sum(len(set(a) & set(b)) for a, b in zip(exact, found)) / exact.size
+
+
+def recall_report(model_config, dimensions: Sequence[int], n_queries: int = 500, top_k: int = 10,
+                  candidates: Optional[int] = None) -> List[Dict]:
+    """
+    Recall@k des variantes réduites par rapport à la recherche exacte en
+    pleine dimension, en mémoire (ni base ni index approximatif)
+
+    Requêtes = questions MedQuAD (échantillon fixe) encodées par le modèle.
+    Pour chaque dimension: recall de la recherche réduite seule, et après
+    rerank en pleine dimension des candidates premiers.
+
+    Returns:
+        Une ligne par dimension (dont la dimension complète en référence)
+    """
+    from src.model_registry import get_model_registry
+
+    candidates = candidates or Config.REDUCED_RERANK_CANDIDATES
+    df, embeddings = load_corpus(model_config)
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    questions = df['question'].astype(str)
+    questions = questions.sample(n=min(n_queries, len(questions)), random_state=42).tolist()
+    queries = get_model_registry().get(model_config).encode(
+        questions, batch_size=Config.EMBEDDING_BATCH_SIZE, convert_to_numpy=True, normalize_embeddings=True
+    )
+
+    start = time.time()
+    exact = _top_k(queries @ embeddings.T, top_k)
+    rows = [{
+        'dimensions': model_config.DIMENSIONS, 'explained_variance': 1.0, 'recall': 1.0,
+        'recall_rerank': 1.0, 'ms_per_query': (time.time() - start) * 1000 / len(queries),
+        'bytes_per_vector': 4 * model_config.DIMENSIONS
+    }]
+
+    projection = PCAProjection.fit(embeddings, max(dimensions))
+    for dim in sorted(dimensions):
+        corpus = project_all(projection, embeddings, dim)
+        start = time.time()
+        scores = projection.transform(queries, dim) @ corpus.T
+        reduced = _top_k(scores, top_k)
+        elapsed = time.time() - start
+
+        # Rerank: similarité complète des seuls candidats de chaque requête
+        reranked = np.empty_like(reduced)
+        for idx, shortlist in enumerate(_top_k(scores, candidates)):
+            full = embeddings[shortlist] @ queries[idx]
+            reranked[idx] = shortlist[_top_k(full[None, :], top_k)[0]]
+
+        rows.append({
+            'dimensions': dim,
+            'explained_variance': projection.explained(dim),
+            'recall': _recall(exact, reduced),
+            'recall_rerank': _recall(exact, reranked),
+            'ms_per_query': elapsed * 1000 / len(queries),
+            'bytes_per_vector': 4 * dim
+        })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Variantes ACP réduites des embeddings (recherche + rerank)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Ajuster l'ACP, charger et indexer les variantes réduites")
+    build.add_argument('--models', nargs='+', choices=sorted(MODELS), default=['pubmed'])
+    build.add_argument('--dims', nargs='+', type=int, default=list(Config.REDUCED_DIMENSIONS))
+    build.add_argument('--index', choices=INDEX_METHODS, default=Config.VECTOR_INDEX_METHOD)
+
+    report = subparsers.add_parser('report', help="Recall@k selon la dimension (questions MedQuAD, en mémoire)")
+    report.add_argument('--model', choices=sorted(MODELS), default='pubmed')
+    report.add_argument('--dims', nargs='+', type=int, default=[64, 128, 192, 256, 384])
+    report.add_argument('--queries', type=int, default=500)
+    report.add_argument('--top-k', type=int, default=10)
+    report.add_argument('--candidates', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        model_config = MODELS[args.model]
+        candidates = args.candidates or Config.REDUCED_RERANK_CANDIDATES
+        rows = recall_report(model_config, args.dims, args.queries, args.top_k, candidates)
+        print("\n" + "="*70)
+        print(f"📉 RECALL@{args.top_k} / DIMENSION: {model_config.NAME} "
+              f"({args.queries} questions, rerank des {candidates} premiers)")
+        print("="*70)
+        print(f"\n{'dim':>5} {'variance':>9} {'recall':>8} {'+rerank':>8} {'ms/requête':>11} {'octets':>7}")
+        for row in rows:
+            print(f"{row['dimensions']:>5} {row['explained_variance'] * 100:>8.1f}% {row['recall']:>8.3f} "
+                  f"{row['recall_rerank']:>8.3f} {row['ms_per_query']:>11.2f} {row['bytes_per_vector']:>7}")
+        return
+
+    results = [(MODELS[name], build_reduced_index(MODELS[name], args.dims, {'method': args.index}))
+               for name in args.models]
+
+    print("\n" + "="*70)
+    print("🎉 VARIANTES RÉDUITES PRÊTES")
+    print("="*70)
+    for model_config, stats in results:
+        for variant in stats['variants']:
+            print(f"   - {variant['table']}: {variant['explained_variance'] * 100:.1f}% de la variance")
+        for name, size in stats['sizes'].items():
+            print(f"     {name:<52} {size / 1024 / 1024:8.1f} Mo")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,75 @@
 Moteur de Recherche Sémantique pour Questions Médicales
 Phase 3 du TP: Implémentation du moteur de recherche
 """
+import os
+import sys
 import time
 import numpy as np
-import psycopg2
-from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Tuple, Optional
-from config import Config
+from typing import List, Dict, Sequence, Tuple, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config
+from src.category_index import CategoryPlanner, filtered_nearest, filtered_nearest_many
+from src.embedding_cache import get_embedding_cache
+from src.hybrid_search import components, hybrid_hits_params, hybrid_hits_sql
+from src.db_pool import ConnectionPool
+from src.vector_index import apply_search_params, index_name_for, shortlist_search_params
+from src.model_registry import get_model_registry
+from src.passage_index import passage_hits_params, passage_hits_sql, passage_table_for
+from src.quantized_index import quantized_hits_params, quantized_hits_sql, quantized_index_for
+from src.reduced_index import reduced_hits_params, reduced_hits_sql, reduced_table_for
+
+
+def semantic_hits_sql(table_name: str, query: str = '%(query)s::vector') -> str:
+    """
+    Phase 1 de la recherche sémantique: (doc_id, similarity) des top_k voisins
+
+    Distance cosinus (<=>), l'opérateur de l'index vectoriel
+    (vector_cosine_ops): le vecteur n'apparaît qu'une fois (ORDER BY sur
+    l'alias) et le seuil filtre la sortie du ORDER BY / LIMIT, ce qui
+    laisse le parcours à l'index. Les vecteurs étant normalisés, le
+    classement est le même qu'au produit scalaire.
+
+    Paramètres nommés: query (sauf si query est une expression SQL),
+    min_similarity, top_k
+    """
+    return f"""
+        SELECT doc_id, 1 - distance AS similarity
+        FROM (
+            SELECT doc_id, embedding <=> {query} AS distance
+            FROM {table_name}
+            ORDER BY distance
+            LIMIT %(top_k)s
+        ) nearest
+        WHERE 1 - distance >= %(min_similarity)s
+    """
+
+
+def semantic_hits_params(query_embedding, top_k: int, min_similarity: float = 0.0) -> Dict:
+    """Paramètres de semantic_hits_sql"""
+    return {
+        'query': np.asarray(query_embedding).tolist(),
+        'min_similarity': min_similarity,
+        'top_k': top_k
+    }
+
+
+# Colonnes du document renvoyées avec la similarité (format de _format_row)
+RESULT_COLUMNS = ('id', 'question', 'answer', 'category', 'qtype')
+
+
+def semantic_documents_sql(table_name: str, columns: Sequence[str] = RESULT_COLUMNS) -> str:
+    """
+    Recherche sémantique complète: (colonnes du document..., similarity),
+    semantic_hits_sql joint à la table des documents pour les seuls top_k ids
+
+    Paramètres: ceux de semantic_hits_params
+    """
+    return f"""
+        SELECT {', '.join(f'd.{column}' for column in columns)}, n.similarity
+        FROM ({semantic_hits_sql(table_name)}) n
+        JOIN {Config.DOCUMENTS_TABLE} d ON d.id = n.doc_id
+        ORDER BY n.similarity DESC
+    """
 
 
 class SemanticSearchEngine:
@@ -16,23 +79,34 @@ class SemanticSearchEngine:
     Moteur de recherche sémantique utilisant des embeddings vectoriels
     """
     
-    def __init__(self):
-        """Initialise le moteur de recherche"""
+    def __init__(self, backend=None, pool: Optional[ConnectionPool] = None, model_config=Model1Config):
+        """
+        Initialise le moteur de recherche
+        
+        Args:
+            backend: Backend vectoriel alternatif (ex: NumpyBackend).
+                     Par défaut, la recherche sémantique passe par pgvector.
+            pool: Pool de connexions partagé (par défaut, le moteur crée le sien)
+            model_config: Modèle dont la table d'embeddings est interrogée
+        """
         print("🔧 Initialisation du moteur de recherche...")
+        self.backend = backend
+        self.model_config = model_config
+        self.embeddings_table = model_config.TABLE_NAME
+        # Chemin des recherches filtrées par catégorie (exact / index partiel / global)
+        self.category_planner = CategoryPlanner(self.embeddings_table)
         
-        # Charger le modèle d'embeddings
-        print(f"   📦 Chargement du modèle: {Config.EMBEDDING_MODEL}")
-        self.model = SentenceTransformer(Config.EMBEDDING_MODEL)
+        # Modèle d'embeddings (partagé via le registre s'il est déjà chargé),
+        # derrière l'encodeur à micro-lots: les requêtes concurrentes sont regroupées
+        self.model = get_model_registry().get_batcher(model_config)
         
-        # Connexion à PostgreSQL
+        # Pool de connexions PostgreSQL
         print(f"   🔌 Connexion à PostgreSQL...")
-        self.conn = psycopg2.connect(
-            host=Config.DB_HOST,
-            port=Config.DB_PORT,
-            dbname=Config.DB_NAME,
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD
-        )
+        self._owns_pool = pool is None
+        self.pool = pool if pool is not None else ConnectionPool()
+        
+        if self.backend is not None:
+            print(f"   🧮 Backend vectoriel: {type(self.backend).__name__} ({len(self.backend)} documents)")
         
         print("   ✅ Moteur de recherche prêt!\n")
     
@@ -44,19 +118,93 @@ class SemanticSearchEngine:
             query: Requête textuelle de l'utilisateur
             
         Returns:
-            Vecteur numpy de dimension 384
+            Vecteur numpy (dimension du modèle, 384 pour MiniLM)
         """
-        embedding = self.model.encode(query, convert_to_numpy=True)
-        # Normaliser pour cosine similarity
-        embedding = embedding / np.linalg.norm(embedding)
-        return embedding
+        # Normalisé pour cosine similarity, mis en cache par le cache partagé
+        return get_embedding_cache().encode(self.model, self.model_config.NAME, query)
+    
+    def _fetchall(self, sql: str, params=None, search_params: Optional[Dict] = None,
+                  shortlist: Optional[Tuple[str, int]] = None) -> List[Tuple]:
+        """
+        Exécute une requête avec une connexion empruntée au pool
+        
+        Args:
+            search_params: probes / ef_search de l'index vectoriel (recherches sémantiques)
+            shortlist: (index, candidats) d'une liste courte avec rerank: search_params
+                       élargis par shortlist_search_params
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            if shortlist is not None:
+                search_params = shortlist_search_params(cursor, *shortlist, **(search_params or {}))
+            if search_params is not None:
+                apply_search_params(cursor, **search_params)
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+    
+    @staticmethod
+    def _documents_by_id(cursor, doc_ids: List[int]) -> Dict[int, Tuple]:
+        """(id, question, answer, category, qtype) des documents demandés"""
+        if not doc_ids:
+            return {}
+        cursor.execute(f"""
+            SELECT id, question, answer, category, qtype
+            FROM {Config.DOCUMENTS_TABLE}
+            WHERE id = ANY(%s);
+        """, (list(doc_ids),))
+        return {row[0]: row for row in cursor.fetchall()}
+    
+    def _filtered_search(self, embeddings, top_k: int, category_filter: str, min_similarity: float,
+                         probes: Optional[int], ef_search: Optional[int]) -> Tuple[List[List[Tuple]], Dict]:
+        """
+        Recherche sémantique filtrée par catégorie (src/category_index.py):
+        toujours min(top_k, documents de la catégorie) voisins avant le seuil
+        
+        Returns:
+            (lignes (id, question, answer, category, qtype, similarity) par requête, plan utilisé)
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            if len(embeddings) == 1:
+                hits, plan = filtered_nearest(cursor, self.category_planner, embeddings[0],
+                                              category_filter, top_k, probes, ef_search)
+                hits = [hits]
+            else:
+                hits, plan = filtered_nearest_many(cursor, self.category_planner, embeddings,
+                                                   category_filter, top_k, probes, ef_search)
+            # Seuil appliqué après le LIMIT: il ne doit pas empêcher l'usage de l'index
+            hits = [[hit for hit in query_hits if hit[1] >= min_similarity] for query_hits in hits]
+            documents = self._documents_by_id(cursor, {doc_id for query_hits in hits for doc_id, _ in query_hits})
+            cursor.close()
+        rows = [
+            [documents[doc_id] + (similarity,) for doc_id, similarity in query_hits if doc_id in documents]
+            for query_hits in hits
+        ]
+        return rows, plan
+    
+    @staticmethod
+    def _format_row(row: Tuple, search_type: str) -> Dict:
+        """Convertit une ligne (id, question, answer, category, qtype, score) en dictionnaire"""
+        return {
+            'id': row[0],
+            'question': row[1],
+            'answer': row[2],
+            'category': row[3],
+            'qtype': row[4],
+            'similarity': float(row[5]),
+            'search_type': search_type
+        }
     
     def semantic_search(
         self,
         query: str,
         top_k: int = 5,
         category_filter: Optional[str] = None,
-        min_similarity: float = 0.0
+        min_similarity: float = 0.0,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None
     ) -> Tuple[List[Dict], float]:
         """
         Recherche sémantique basée sur les embeddings vectoriels
@@ -66,6 +214,8 @@ class SemanticSearchEngine:
             top_k: Nombre de résultats à retourner
             category_filter: Filtrer par catégorie (optionnel)
             min_similarity: Seuil minimum de similarité
+            probes: ivfflat.probes pour cette requête (optionnel)
+            ef_search: hnsw.ef_search pour cette requête (optionnel)
             
         Returns:
             (liste de résultats, temps d'exécution)
@@ -75,77 +225,315 @@ class SemanticSearchEngine:
         # 1. Encoder la requête
         query_embedding = self.encode_query(query)
         
-        # 2. Préparer la requête SQL
-        cursor = self.conn.cursor()
+        if self.backend is not None:
+            rows = self.backend.search(query_embedding, top_k, category_filter, min_similarity)
+            formatted_results = [self._format_row(row, 'semantic') for row in rows]
+            return formatted_results, time.time() - start_time
         
-        # Use cosine distance operator from pgvector (<#>) and convert to similarity
         if category_filter:
-            sql = """
-                SELECT 
-                    id,
-                    question,
-                    answer,
-                    category,
-                    qtype,
-                    1 - (embedding <#> %s::vector) as similarity
-                FROM medical_documents
-                WHERE category = %s
-                    AND (1 - (embedding <#> %s::vector)) >= %s
-                ORDER BY embedding <#> %s::vector
-                LIMIT %s;
-            """
-            params = (
-                query_embedding.tolist(),
-                category_filter,
-                query_embedding.tolist(),
-                min_similarity,
-                query_embedding.tolist(),
-                top_k
-            )
-        else:
-            sql = """
-                SELECT 
-                    id,
-                    question,
-                    answer,
-                    category,
-                    qtype,
-                    1 - (embedding <#> %s::vector) as similarity
-                FROM medical_documents
-                WHERE (1 - (embedding <#> %s::vector)) >= %s
-                ORDER BY embedding <#> %s::vector
-                LIMIT %s;
-            """
-            params = (
-                query_embedding.tolist(),
-                query_embedding.tolist(),
-                min_similarity,
-                query_embedding.tolist(),
-                top_k
-            )
+            rows, _ = self._filtered_search([query_embedding], top_k, category_filter,
+                                            min_similarity, probes, ef_search)
+            formatted_results = [self._format_row(row, 'semantic') for row in rows[0]]
+            return formatted_results, time.time() - start_time
+        
+        # 2. Préparer la requête SQL (distance cosinus, comme l'index vectoriel)
+        # Le scan ANN ne lit que la table d'embeddings (étroite); le texte
+        # n'est joint que pour les top_k identifiants retenus
+        sql = semantic_documents_sql(self.embeddings_table)
+        params = semantic_hits_params(query_embedding, top_k, min_similarity)
         
         # 3. Exécuter la recherche
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
+        results = self._fetchall(sql, params, {'probes': probes, 'ef_search': ef_search})
         
         # 4. Formater les résultats
-        formatted_results = []
-        for row in results:
-            formatted_results.append({
-                'id': row[0],
-                'question': row[1],
-                'answer': row[2],
-                'category': row[3],
-                'qtype': row[4],
-                'similarity': float(row[5]),
-                'search_type': 'semantic'
-            })
-        
-        cursor.close()
+        formatted_results = [self._format_row(row, 'semantic') for row in results]
         
         search_time = time.time() - start_time
         return formatted_results, search_time
     
+    def passage_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        category_filter: Optional[str] = None,
+        min_similarity: float = 0.0,
+        aggregation: Optional[str] = None,
+        top_n: Optional[int] = None,
+        candidates: Optional[int] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> Tuple[List[Dict], float]:
+        """
+        Recherche sémantique sur l'index par passages (src/passage_index.py)
+        
+        Les passages les plus proches sont agrégés par document dans la
+        requête: 'max' = meilleur passage, 'sum' = somme des top_n meilleurs.
+        
+        Args:
+            query: Question de l'utilisateur
+            top_k: Nombre de documents à retourner
+            category_filter: Filtrer par catégorie (optionnel)
+            min_similarity: Seuil sur le meilleur passage d'un document
+            aggregation: 'max' ou 'sum' (défaut: Config.PASSAGE_AGGREGATION)
+            top_n: Passages sommés par document (défaut: Config.PASSAGE_TOP_N)
+            candidates: Passages lus par l'index (défaut: top_k × Config.PASSAGE_CANDIDATES_PER_RESULT)
+            probes: ivfflat.probes pour cette requête (optionnel)
+            ef_search: hnsw.ef_search pour cette requête (optionnel)
+            
+        Returns:
+            (liste de résultats, temps d'exécution)
+        """
+        start_time = time.time()
+        query_embedding = self.encode_query(query)
+        
+        hits_sql = passage_hits_sql(
+            passage_table_for(self.model_config),
+            aggregation or Config.PASSAGE_AGGREGATION,
+            category_filter is not None
+        )
+        sql = f"""
+            SELECT 
+                d.id,
+                d.question,
+                d.answer,
+                d.category,
+                d.qtype,
+                p.score
+            FROM ({hits_sql}) p
+            JOIN {Config.DOCUMENTS_TABLE} d ON d.id = p.doc_id
+            ORDER BY p.score DESC;
+        """
+        params = passage_hits_params(query_embedding, top_k, min_similarity, top_n,
+                                     candidates, category_filter)
+        
+        results = self._fetchall(sql, params, {'probes': probes, 'ef_search': ef_search})
+        formatted_results = [self._format_row(row, 'passage') for row in results]
+        
+        return formatted_results, time.time() - start_time
+    
+    def quantized_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        category_filter: Optional[str] = None,
+        min_similarity: float = 0.0,
+        quantization: Optional[str] = None,
+        candidates: Optional[int] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> Tuple[List[Dict], float]:
+        """
+        Recherche sémantique sur les vecteurs quantifiés (src/quantized_index.py)
+        
+        L'index halfvec / bit fournit les candidats, recalculés en float32:
+        les scores sont ceux de semantic_search.
+        
+        Args:
+            query: Question de l'utilisateur
+            top_k: Nombre de résultats à retourner
+            category_filter: Filtrer par catégorie (optionnel)
+            min_similarity: Seuil minimum de similarité (après rerank)
+            quantization: 'halfvec' ou 'bit' (défaut: Config.VECTOR_QUANTIZATION)
+            candidates: Candidats relus en float32 (défaut: Config.QUANTIZED_RERANK_CANDIDATES)
+            probes: ivfflat.probes pour cette requête (optionnel)
+            ef_search: hnsw.ef_search pour cette requête (optionnel)
+            
+        Returns:
+            (liste de résultats, temps d'exécution)
+        """
+        start_time = time.time()
+        query_embedding = self.encode_query(query)
+        
+        quantization = quantization or Config.VECTOR_QUANTIZATION
+        hits_sql = quantized_hits_sql(self.model_config, quantization, category_filter is not None)
+        sql = f"""
+            SELECT 
+                d.id,
+                d.question,
+                d.answer,
+                d.category,
+                d.qtype,
+                q.similarity
+            FROM ({hits_sql}) q
+            JOIN {Config.DOCUMENTS_TABLE} d ON d.id = q.doc_id
+            ORDER BY q.similarity DESC;
+        """
+        params = quantized_hits_params(query_embedding, top_k, min_similarity, candidates, category_filter)
+        # probes / ef_search élargis: l'index doit fournir tous les candidats
+        shortlist = (quantized_index_for(self.model_config, quantization), params['candidates'])
+        
+        results = self._fetchall(sql, params, {'probes': probes, 'ef_search': ef_search}, shortlist)
+        formatted_results = [self._format_row(row, 'quantized') for row in results]
+        
+        return formatted_results, time.time() - start_time
+    
+    def reduced_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        category_filter: Optional[str] = None,
+        min_similarity: float = 0.0,
+        dimensions: Optional[int] = None,
+        candidates: Optional[int] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> Tuple[List[Dict], float]:
+        """
+        Recherche sémantique dans une variante ACP réduite (src/reduced_index.py)
+        
+        La requête est projetée, l'index réduit fournit une liste courte,
+        recalculée en pleine dimension: les scores sont ceux de semantic_search.
+        
+        Args:
+            query: Question de l'utilisateur
+            top_k: Nombre de résultats à retourner
+            category_filter: Filtrer par catégorie (optionnel)
+            min_similarity: Seuil minimum de similarité (après rerank)
+            dimensions: Variante interrogée (défaut: Config.REDUCED_SEARCH_DIMENSIONS)
+            candidates: Candidats recalculés (défaut: Config.REDUCED_RERANK_CANDIDATES)
+            probes: ivfflat.probes pour cette requête (optionnel)
+            ef_search: hnsw.ef_search pour cette requête (optionnel)
+            
+        Returns:
+            (liste de résultats, temps d'exécution)
+        """
+        start_time = time.time()
+        query_embedding = self.encode_query(query)
+        dimensions = dimensions or Config.REDUCED_SEARCH_DIMENSIONS
+        
+        hits_sql = reduced_hits_sql(self.model_config, dimensions, category_filter is not None)
+        sql = f"""
+            SELECT 
+                d.id,
+                d.question,
+                d.answer,
+                d.category,
+                d.qtype,
+                r.similarity
+            FROM ({hits_sql}) r
+            JOIN {Config.DOCUMENTS_TABLE} d ON d.id = r.doc_id
+            ORDER BY r.similarity DESC;
+        """
+        params = reduced_hits_params(self.model_config, query_embedding, dimensions, top_k,
+                                     min_similarity, candidates, category_filter)
+        # probes / ef_search élargis: l'index doit fournir tous les candidats
+        shortlist = (index_name_for(reduced_table_for(self.model_config, dimensions)), params['candidates'])
+        
+        results = self._fetchall(sql, params, {'probes': probes, 'ef_search': ef_search}, shortlist)
+        formatted_results = [self._format_row(row, 'reduced') for row in results]
+        
+        return formatted_results, time.time() - start_time
+    
+    def semantic_search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        category_filter: Optional[str] = None,
+        min_similarity: float = 0.0,
+        batch_size: int = 64,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> Tuple[List[List[Dict]], Dict[str, float]]:
+        """
+        Recherche sémantique par lot: un seul appel à model.encode et
+        un seul aller-retour SQL pour toutes les requêtes
+        
+        Args:
+            queries: Liste de questions
+            top_k: Nombre de résultats par question
+            category_filter: Filtrer par catégorie (optionnel)
+            min_similarity: Seuil minimum de similarité
+            batch_size: Taille de batch pour l'encodage
+            probes: ivfflat.probes pour ces requêtes (optionnel)
+            ef_search: hnsw.ef_search pour ces requêtes (optionnel)
+            
+        Returns:
+            (liste de résultats par requête, temps d'exécution)
+            Les temps contiennent 'encode', 'search', 'total' et 'per_query'
+        """
+        if not queries:
+            return [], {'encode': 0.0, 'search': 0.0, 'total': 0.0, 'per_query': 0.0}
+        
+        start_time = time.time()
+        
+        # 1. Encoder toutes les requêtes absentes du cache en un seul appel
+        embeddings = get_embedding_cache().encode_many(
+            self.model, self.model_config.NAME, queries, batch_size=batch_size
+        )
+        encode_time = time.time() - start_time
+        
+        if self.backend is not None:
+            search_start = time.time()
+            all_rows = self.backend.search_many(embeddings, top_k, category_filter, min_similarity)
+            all_results = [
+                [self._format_row(row, 'semantic') for row in rows]
+                for rows in all_rows
+            ]
+            search_time = time.time() - search_start
+            total_time = time.time() - start_time
+            return all_results, {
+                'encode': encode_time,
+                'search': search_time,
+                'total': total_time,
+                'per_query': total_time / len(queries)
+            }
+        
+        if category_filter:
+            search_start = time.time()
+            all_rows, _ = self._filtered_search(embeddings, top_k, category_filter,
+                                                min_similarity, probes, ef_search)
+            all_results = [
+                [self._format_row(row, 'semantic') for row in rows]
+                for rows in all_rows
+            ]
+            search_time = time.time() - search_start
+            total_time = time.time() - start_time
+            return all_results, {
+                'encode': encode_time,
+                'search': search_time,
+                'total': total_time,
+                'per_query': total_time / len(queries)
+            }
+        
+        # 2. Une seule requête: LATERAL join sur les vecteurs "dépliés"
+        vectors = [
+            '[' + ','.join(map(repr, emb.tolist())) + ']'
+            for emb in embeddings
+        ]
+        sql = f"""
+            SELECT 
+                q.query_idx,
+                d.id,
+                d.question,
+                d.answer,
+                d.category,
+                d.qtype,
+                n.similarity
+            FROM unnest(%(queries)s::text[]) WITH ORDINALITY AS q(vec, query_idx)
+            CROSS JOIN LATERAL ({semantic_hits_sql(self.embeddings_table, 'q.vec::vector')}) n
+            JOIN {Config.DOCUMENTS_TABLE} d ON d.id = n.doc_id
+            ORDER BY q.query_idx, n.similarity DESC;
+        """
+        params = {'queries': vectors, 'min_similarity': min_similarity, 'top_k': top_k}
+        
+        search_start = time.time()
+        rows = self._fetchall(sql, params, {'probes': probes, 'ef_search': ef_search})
+        search_time = time.time() - search_start
+        
+        # 3. Regrouper par requête (query_idx commence à 1)
+        all_results = [[] for _ in queries]
+        for row in rows:
+            all_results[row[0] - 1].append(self._format_row(row[1:], 'semantic'))
+        
+        total_time = time.time() - start_time
+        timings = {
+            'encode': encode_time,
+            'search': search_time,
+            'total': total_time,
+            'per_query': total_time / len(queries)
+        }
+        return all_results, timings
+    
     def keyword_search(
         self,
         query: str,
@@ -164,93 +552,127 @@ class SemanticSearchEngine:
             (liste de résultats, temps d'exécution)
         """
         start_time = time.time()
-        cursor = self.conn.cursor()
         
-        # Utiliser PostgreSQL full-text search
+        # PostgreSQL full-text search sur la colonne tsvector stockée (index GIN)
         if category_filter:
-            sql = """
+            sql = f"""
                 SELECT 
                     id,
                     question,
                     answer,
                     category,
                     qtype,
-                    ts_rank(to_tsvector('english', combined_text), 
-                           plainto_tsquery('english', %s)) as rank
-                FROM medical_documents
+                    ts_rank(search_vector, tsquery) as rank
+                FROM {Config.DOCUMENTS_TABLE}, plainto_tsquery('english', %s) tsquery
                 WHERE category = %s
-                    AND to_tsvector('english', combined_text) @@ 
-                        plainto_tsquery('english', %s)
+                    AND search_vector @@ tsquery
                 ORDER BY rank DESC
                 LIMIT %s;
             """
-            params = (query, category_filter, query, top_k)
+            params = (query, category_filter, top_k)
         else:
-            sql = """
+            sql = f"""
                 SELECT 
                     id,
                     question,
                     answer,
                     category,
                     qtype,
-                    ts_rank(to_tsvector('english', combined_text), 
-                           plainto_tsquery('english', %s)) as rank
-                FROM medical_documents
-                WHERE to_tsvector('english', combined_text) @@ 
-                      plainto_tsquery('english', %s)
+                    ts_rank(search_vector, tsquery) as rank
+                FROM {Config.DOCUMENTS_TABLE}, plainto_tsquery('english', %s) tsquery
+                WHERE search_vector @@ tsquery
                 ORDER BY rank DESC
                 LIMIT %s;
             """
-            params = (query, query, top_k)
+            params = (query, top_k)
         
-        cursor.execute(sql, params)
-        results = cursor.fetchall()
+        results = self._fetchall(sql, params)
         
-        formatted_results = []
-        for row in results:
-            formatted_results.append({
-                'id': row[0],
-                'question': row[1],
-                'answer': row[2],
-                'category': row[3],
-                'qtype': row[4],
-                'similarity': float(row[5]),  # rank score
-                'search_type': 'keyword'
-            })
-        
-        cursor.close()
+        # similarity = score ts_rank
+        formatted_results = [self._format_row(row, 'keyword') for row in results]
         
         search_time = time.time() - start_time
         return formatted_results, search_time
     
-    # Hybrid search removed per user request. Use semantic_search and keyword_search separately.
+    def hybrid_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        category_filter: Optional[str] = None,
+        fusion: Optional[str] = None,
+        semantic_weight: Optional[float] = None,
+        candidates: Optional[int] = None,
+        probes: Optional[int] = None,
+        ef_search: Optional[int] = None
+    ) -> Tuple[List[Dict], float]:
+        """
+        Recherche hybride: scan ANN et scan plein texte dans la même
+        requête SQL, fusionnés par rang (RRF) ou par scores pondérés
+        (src/hybrid_search.py)
+        
+        Args:
+            query: Question de l'utilisateur
+            top_k: Nombre de résultats fusionnés
+            category_filter: Filtrer par catégorie (optionnel)
+            fusion: 'rrf' ou 'weighted' (défaut: Config.HYBRID_FUSION)
+            semantic_weight: Poids de la branche sémantique, entre 0 et 1
+                             (défaut: Config.HYBRID_SEMANTIC_WEIGHT)
+            candidates: Lignes lues par chaque branche
+                        (défaut: top_k × Config.HYBRID_CANDIDATES_PER_RESULT)
+            probes: ivfflat.probes pour cette requête (optionnel)
+            ef_search: hnsw.ef_search pour cette requête (optionnel)
+            
+        Returns:
+            (liste de résultats avec leurs composantes, temps d'exécution)
+        """
+        start_time = time.time()
+        query_embedding = self.encode_query(query)
+        
+        hits_sql = hybrid_hits_sql(self.embeddings_table, fusion or Config.HYBRID_FUSION,
+                                   category_filter is not None)
+        sql = f"""
+            SELECT 
+                d.id,
+                d.question,
+                d.answer,
+                d.category,
+                d.qtype,
+                h.*
+            FROM ({hits_sql}) h
+            JOIN {Config.DOCUMENTS_TABLE} d ON d.id = h.doc_id
+            ORDER BY h.score DESC, d.id;
+        """
+        params = hybrid_hits_params(query_embedding, query, top_k, semantic_weight,
+                                    candidates, category_filter=category_filter)
+        
+        results = self._fetchall(sql, params, {'probes': probes, 'ef_search': ef_search})
+        formatted_results = []
+        for row in results:
+            result = self._format_row(row[:5] + row[6:7], 'hybrid')
+            result.update(components(row[5:]))
+            formatted_results.append(result)
+        
+        return formatted_results, time.time() - start_time
     
     def get_categories(self) -> List[str]:
         """Récupère la liste des catégories disponibles"""
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT DISTINCT category FROM medical_documents ORDER BY category;")
-        categories = [row[0] for row in cursor.fetchall()]
-        cursor.close()
-        return categories
+        rows = self._fetchall(
+            f"SELECT DISTINCT category FROM {Config.DOCUMENTS_TABLE} ORDER BY category;"
+        )
+        return [row[0] for row in rows]
     
     def get_statistics(self) -> Dict:
         """Récupère les statistiques de la base"""
-        cursor = self.conn.cursor()
-        
         # Nombre total de documents
-        cursor.execute("SELECT COUNT(*) FROM medical_documents;")
-        total_docs = cursor.fetchone()[0]
+        total_docs = self._fetchall(f"SELECT COUNT(*) FROM {Config.DOCUMENTS_TABLE};")[0][0]
         
         # Distribution par catégorie
-        cursor.execute("""
+        category_dist = dict(self._fetchall(f"""
             SELECT category, COUNT(*) 
-            FROM medical_documents 
+            FROM {Config.DOCUMENTS_TABLE} 
             GROUP BY category 
             ORDER BY COUNT(*) DESC;
-        """)
-        category_dist = dict(cursor.fetchall())
-        
-        cursor.close()
+        """))
         
         return {
             'total_documents': total_docs,
@@ -258,8 +680,9 @@ class SemanticSearchEngine:
         }
     
     def close(self):
-        """Ferme la connexion à la base de données"""
-        self.conn.close()
+        """Ferme les connexions à la base de données (si le pool appartient au moteur)"""
+        if self._owns_pool:
+            self.pool.close()
 
 
 def format_result(result: Dict, index: int, show_answer: bool = False) -> str:
@@ -0,0 +1,245 @@
+"""
+Gestion des index vectoriels pgvector (IVFFlat / HNSW)
+- construction APRÈS le chargement des données (centroïdes entraînés sur les vraies données)
+- paramètres dimensionnés selon le nombre de lignes
+- réglage des paramètres de recherche (probes / ef_search) par requête,
+  élargis pour les listes courtes des recherches avec rerank
+"""
+import argparse
+import hashlib
+import math
+import os
+import re
+import sys
+import time
+import psycopg2
+from typing import Dict, Optional, Tuple
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import Config, Model1Config, Model2Config
+
+
+INDEX_METHODS = ('ivfflat', 'hnsw')
+
+# Listes IVFFlat par défaut de pgvector (index construit sans WITH lists)
+DEFAULT_IVFFLAT_LISTS = 100
+
+# Lignes lues par candidat d'une liste courte IVFFlat (rerank): les vrais
+# voisins sont répartis sur plus de listes que le strict nécessaire
+SHORTLIST_PROBE_MARGIN = 4
+
+# {index: (lu à, (listes, lignes de la table) ou None si pas IVFFlat)}
+_ivfflat_layouts: Dict[str, Tuple[float, Optional[Tuple[int, float]]]] = {}
+
+
+def ivfflat_lists_for(row_count: int) -> int:
+    """Nombre de listes recommandé par pgvector: rows/1000 (<1M lignes), sqrt(rows) au-delà"""
+    if row_count <= 1_000_000:
+        return max(1, row_count // 1000)
+    return int(math.sqrt(row_count))
+
+
+def hnsw_params_for(row_count: int) -> Dict[str, int]:
+    """Paramètres HNSW (m, ef_construction) selon la taille de la table"""
+    if row_count < 100_000:
+        return {'m': 16, 'ef_construction': 64}
+    if row_count < 1_000_000:
+        return {'m': 16, 'ef_construction': 128}
+    return {'m': 24, 'ef_construction': 200}
+
+
+def index_name_for(table_name: str, column: str = 'embedding') -> str:
+    return f"idx_{table_name}_{column}"
+
+
+def category_index_name(table_name: str, category: str) -> str:
+    """Index partiel d'une catégorie (nom stable, tronqué à 63 caractères)"""
+    slug = re.sub(r'[^a-z0-9]+', '_', category.lower()).strip('_')
+    digest = hashlib.md5(category.encode('utf-8')).hexdigest()[:6]
+    return f"idx_{table_name}_cat_{slug}"[:56] + f"_{digest}"
+
+
+def build_vector_index(
+    conn,
+    table_name: str,
+    method: str = 'ivfflat',
+    lists: Optional[int] = None,
+    m: Optional[int] = None,
+    ef_construction: Optional[int] = None,
+    opclass: str = 'vector_cosine_ops',
+    category: Optional[str] = None,
+    column: str = 'embedding'
+) -> Dict:
+    """
+    (Re)construit l'index vectoriel d'une table déjà remplie, puis lance ANALYZE
+
+    Args:
+        conn: Connexion psycopg2
+        table_name: Table contenant la colonne embedding
+        method: 'ivfflat' ou 'hnsw'
+        lists: Listes IVFFlat (défaut: dimensionné selon le nombre de lignes)
+        m, ef_construction: Paramètres HNSW (défaut: dimensionnés selon le nombre de lignes)
+        opclass: Classe d'opérateurs (doit correspondre à l'opérateur des requêtes)
+        category: Index partiel sur les seules lignes de cette catégorie
+                  (listes / paramètres dimensionnés sur ces lignes)
+        column: Colonne indexée (ex: vecteurs quantifiés halfvec / bit)
+
+    Returns:
+        Dictionnaire décrivant l'index construit (méthode, paramètres, temps)
+    """
+    if method not in INDEX_METHODS:
+        raise ValueError(f"Méthode d'index inconnue: {method} (attendu: {INDEX_METHODS})")
+
+    cursor = conn.cursor()
+    where = ''
+    if category is not None:
+        where = cursor.mogrify(" WHERE category = %s", (category,)).decode('utf-8')
+    cursor.execute(f"SELECT COUNT(*) FROM {table_name}{where};")
+    row_count = cursor.fetchone()[0]
+
+    if method == 'ivfflat':
+        params = {'lists': lists or ivfflat_lists_for(row_count)}
+    else:
+        params = hnsw_params_for(row_count)
+        if m:
+            params['m'] = m
+        if ef_construction:
+            params['ef_construction'] = ef_construction
+
+    with_clause = ', '.join(f"{key} = {int(value)}" for key, value in params.items())
+    index_name = index_name_for(table_name, column) if category is None else category_index_name(table_name, category)
+
+    print(f"\n📌 Index {method} sur {table_name}{where} ({row_count} lignes, {with_clause})")
+    start = time.time()
+    cursor.execute(f"DROP INDEX IF EXISTS {index_name};")
+    cursor.execute(f"""
+        CREATE INDEX {index_name}
+        ON {table_name}
+        USING {method} ({column} {opclass})
+        WITH ({with_clause}){where};
+    """)
+    build_time = time.time() - start
+
+    # Garder une trace de la construction sur l'index lui-même
+    cursor.execute(
+        f"COMMENT ON INDEX {index_name} IS %s;",
+        (f"{method} {with_clause} rows={row_count} build_time={build_time:.1f}s",)
+    )
+    conn.commit()
+
+    start = time.time()
+    cursor.execute(f"ANALYZE {table_name};")
+    conn.commit()
+    analyze_time = time.time() - start
+    cursor.close()
+
+    print(f"   ✅ Index construit en {build_time:.1f}s (ANALYZE: {analyze_time:.1f}s)")
+
+    return {
+        'table': table_name,
+        'index': index_name,
+        'category': category,
+        'method': method,
+        'params': params,
+        'rows': row_count,
+        'build_time': build_time,
+        'analyze_time': analyze_time
+    }
+
+
+def apply_search_params(cursor, probes: Optional[int] = None, ef_search: Optional[int] = None):
+    """
+    Règle ivfflat.probes / hnsw.ef_search pour la transaction en cours
+
+    Les valeurs sont locales à la transaction (set_config(..., true)):
+    la connexion rendue au pool retrouve les valeurs par défaut.
+    """
+    probes = probes if probes is not None else Config.IVFFLAT_PROBES
+    ef_search = ef_search if ef_search is not None else Config.HNSW_EF_SEARCH
+
+    if probes is not None:
+        cursor.execute("SELECT set_config('ivfflat.probes', %s, true);", (str(int(probes)),))
+    if ef_search is not None:
+        cursor.execute("SELECT set_config('hnsw.ef_search', %s, true);", (str(int(ef_search)),))
+
+
+def ivfflat_layout(cursor, index_name: str) -> Optional[Tuple[int, float]]:
+    """
+    (listes, lignes estimées de la table) d'un index IVFFlat, None pour un
+    index HNSW ou absent (catalogue relu après Config.CATEGORY_PLANNER_TTL)
+    """
+    cached = _ivfflat_layouts.get(index_name)
+    if cached is not None and time.time() - cached[0] <= Config.CATEGORY_PLANNER_TTL:
+        return cached[1]
+
+    cursor.execute("""
+        SELECT c.reloptions, t.reltuples
+        FROM pg_class c
+        JOIN pg_am am ON am.oid = c.relam
+        JOIN pg_index i ON i.indexrelid = c.oid
+        JOIN pg_class t ON t.oid = i.indrelid
+        WHERE c.oid = to_regclass(%s) AND am.amname = 'ivfflat';
+    """, (index_name,))
+    row = cursor.fetchone()
+    layout = None
+    if row is not None:
+        options = dict(option.split('=', 1) for option in row[0] or [])
+        layout = (int(options.get('lists', DEFAULT_IVFFLAT_LISTS)), float(row[1]))
+    _ivfflat_layouts[index_name] = (time.time(), layout)
+    return layout
+
+
+def shortlist_search_params(cursor, index_name: str, candidates: int,
+                            probes: Optional[int] = None, ef_search: Optional[int] = None) -> Dict:
+    """
+    probes / ef_search d'un parcours ANN qui fournit candidates lignes à un rerank
+
+    - HNSW ne renvoie pas plus de ef_search lignes: ef_search >= candidates
+    - IVFFlat ne lit que les probes listes les plus proches (1 par défaut
+      dans pgvector, ~lignes/listes lignes chacune): probes couvre au moins
+      SHORTLIST_PROBE_MARGIN x candidates lignes, et sqrt(listes)
+
+    Les valeurs demandées (sinon celles de Config) servent de plancher.
+
+    Returns:
+        {'probes', 'ef_search'} pour apply_search_params
+    """
+    probes = probes if probes is not None else Config.IVFFLAT_PROBES
+    ef_search = max(ef_search if ef_search is not None else (Config.HNSW_EF_SEARCH or 0), candidates)
+
+    layout = ivfflat_layout(cursor, index_name)
+    if layout is not None:
+        lists, rows = layout
+        # reltuples < 0: table jamais analysée, sonder toutes les listes
+        needed = math.ceil(SHORTLIST_PROBE_MARGIN * candidates * lists / rows) if rows > 0 else lists
+        probes = min(lists, max(probes or 1, math.ceil(math.sqrt(lists)), needed))
+    return {'probes': probes, 'ef_search': ef_search}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construction des index vectoriels")
+    parser.add_argument('--table', action='append',
+                        help="Table à indexer (défaut: les tables des 2 modèles)")
+    parser.add_argument('--method', choices=INDEX_METHODS, default=Config.VECTOR_INDEX_METHOD)
+    parser.add_argument('--lists', type=int)
+    parser.add_argument('--m', type=int)
+    parser.add_argument('--ef-construction', type=int)
+    args = parser.parse_args()
+
+    tables = args.table or [Model1Config.TABLE_NAME, Model2Config.TABLE_NAME]
+
+    conn = psycopg2.connect(
+        host=Config.DB_HOST,
+        port=Config.DB_PORT,
+        database=Config.DB_NAME,
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD
+    )
+    try:
+        for table_name in tables:
+            build_vector_index(conn, table_name, args.method, args.lists, args.m, args.ef_construction)
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
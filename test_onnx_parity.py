@@ -0,0 +1,31 @@
+"""
+Parité des scores cosinus PyTorch vs ONNX (src/onnx_encoder.py)
+
+Même vérification que `python src/onnx_encoder.py parity`, sur un
+échantillon réduit. Ignoré sans onnxruntime / sentence_transformers,
+sans export ONNX ou sans CSV prétraité.
+"""
+import os
+import pytest
+
+pytest.importorskip('onnxruntime')
+pytest.importorskip('sentence_transformers')
+
+from config import Config, Model1Config, Model2Config
+from src.onnx_encoder import (
+    ONNX_FILE, ONNX_INT8_FILE, PARITY_TOLERANCE, PARITY_TOLERANCE_INT8, check_parity, model_dir_for
+)
+
+
+@pytest.mark.parametrize('quantized', [False, True], ids=['fp32', 'int8'])
+@pytest.mark.parametrize('model_config', [Model1Config, Model2Config], ids=['minilm', 'pubmed'])
+def test_onnx_cosine_parity(model_config, quantized):
+    onnx_path = os.path.join(model_dir_for(model_config), ONNX_INT8_FILE if quantized else ONNX_FILE)
+    if not os.path.exists(onnx_path):
+        pytest.skip(f"Export ONNX absent: {onnx_path}")
+    if not os.path.exists(os.path.join(Config.PROCESSED_DATA_DIR, 'medquad_processed.csv')):
+        pytest.skip("CSV prétraité absent (python src/data_preprocessing.py)")
+
+    report = check_parity(model_config, quantized, n_queries=10, n_documents=50)
+
+    assert report['max_abs_diff'] <= (PARITY_TOLERANCE_INT8 if quantized else PARITY_TOLERANCE)
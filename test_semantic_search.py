@@ -0,0 +1,92 @@
+"""
+Chemin sémantique de SemanticSearchEngine (src/search_engine.py)
+
+Mêmes vérifications que `python src/benchmarks.py similarity`:
+- semantic_hits_sql (<=>) peut passer par l'index vectoriel (EXPLAIN)
+- semantic_search renvoie les mêmes documents et scores que app.semantic_search
+
+Ignoré sans base PostgreSQL accessible, sans index vectoriel ou sans modèle.
+"""
+import pytest
+
+np = pytest.importorskip('numpy')
+psycopg2 = pytest.importorskip('psycopg2')
+
+from config import Config, Model1Config
+from src.search_engine import semantic_hits_params, semantic_hits_sql
+from src.vector_index import index_name_for
+
+
+TABLE = Model1Config.TABLE_NAME
+TOP_K = 5
+
+
+@pytest.fixture(scope='module')
+def conn():
+    try:
+        conn = psycopg2.connect(
+            host=Config.DB_HOST,
+            port=Config.DB_PORT,
+            database=Config.DB_NAME,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD
+        )
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Base inaccessible: {e}")
+
+    cursor = conn.cursor()
+    cursor.execute("SELECT to_regclass(%s) IS NOT NULL;", (index_name_for(TABLE),))
+    has_index = cursor.fetchone()[0]
+    cursor.close()
+    if not has_index:
+        conn.close()
+        pytest.skip(f"Index {index_name_for(TABLE)} absent (python src/vector_index.py)")
+    yield conn
+    conn.close()
+
+
+def test_semantic_hits_sql_uses_vector_index(conn):
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT embedding::text FROM {TABLE} LIMIT 1;")
+    row = cursor.fetchone()
+    if row is None:
+        pytest.skip(f"{TABLE} est vide")
+
+    # Sur un petit corpus le planificateur peut préférer le parcours
+    # séquentiel: on vérifie que l'opérateur correspond à l'index
+    cursor.execute("SET LOCAL enable_seqscan = off;")
+    cursor.execute(f"EXPLAIN {semantic_hits_sql(TABLE)}", semantic_hits_params([], TOP_K) | {'query': row[0]})
+    plan = "\n".join(line for (line,) in cursor.fetchall())
+    conn.rollback()
+    cursor.close()
+
+    assert index_name_for(TABLE) in plan
+
+
+def test_semantic_search_matches_app(conn):
+    pytest.importorskip('streamlit')
+    pytest.importorskip('sentence_transformers')
+    import app
+    from src.model_registry import get_model_registry
+    from src.search_engine import SemanticSearchEngine
+
+    try:
+        model = get_model_registry().get(Model1Config)
+    except OSError as e:
+        pytest.skip(f"Modèle indisponible: {e}")
+
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT question FROM {Config.DOCUMENTS_TABLE} ORDER BY id LIMIT 5;")
+    queries = [question for (question,) in cursor.fetchall()]
+    cursor.close()
+
+    engine = SemanticSearchEngine(model_config=Model1Config)
+    try:
+        for query in queries:
+            results, _ = engine.semantic_search(query, top_k=TOP_K)
+            expected, _ = app.semantic_search(query, model, Model1Config, top_k=TOP_K)
+            assert [result['id'] for result in results] == [row[0] for row in expected]
+            assert np.allclose([result['similarity'] for result in results],
+                               [row[5] for row in expected], atol=1e-6)
+    finally:
+        engine.close()